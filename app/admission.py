@@ -0,0 +1,231 @@
+"""
+Contrôle d'admission des routes de prédiction.
+
+Chaque famille de routes a sa limite de requêtes simultanées et sa file d'attente
+bornée. Au-delà, la requête est refusée tout de suite (503 + Retry-After) au lieu de
+s'empiler dans uvicorn : une requête qui attend plus de ADMISSION_MAX_WAIT secondes,
+ou qui trouve la file pleine, échoue vite plutôt que d'allonger le p99 de tout le monde.
+
+La limite s'adapte à la latence observée (augmentation additive, diminution
+multiplicative) : elle monte d'une unité tant que la latence reste proche de la
+latence de base et que la limite est atteinte, et baisse de 10 % dès que la latence
+lissée dépasse ADMISSION_LATENCY_TOLERANCE fois la latence de base.
+
+Les autres routes (/health, /ready, /metrics, historique...) ne passent jamais par ici.
+"""
+import asyncio
+import math
+import os
+import re
+import time
+from collections import deque
+import orjson
+from app import metrics
+
+# Activation (désactiver par exemple derrière un répartiteur qui limite déjà)
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+
+# Requêtes en attente par famille de routes, au-delà : 503 immédiat
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+
+# Attente maximale d'une place (secondes), au-delà : 503
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", "1.0"))
+
+# Latence lissée tolérée, en multiple de la latence de base, avant de réduire la limite
+ADMISSION_LATENCY_TOLERANCE = float(os.getenv("ADMISSION_LATENCY_TOLERANCE", "2.0"))
+
+# Familles de routes : (motif du chemin, méthodes, nom, limite initiale, minimale, maximale)
+ADMISSION_ROUTES = (
+    (r"/predict_employee(/\d+)?", {"GET", "POST"}, "predict_employee", 16, 2, 40),
+    (r"/predict_employee(/\d+)?/explain", {"GET", "POST"}, "explain", 8, 1, 20),
+    (r"/predict_employee/\d+/what-if", {"POST"}, "whatif", 4, 1, 10),
+    (r"/predict", {"POST"}, "predict", 8, 1, 20),
+    (r"/score/(csv|columnar)", {"POST"}, "score", 2, 1, 4),
+    (r"/score/segment", {"GET"}, "segment", 2, 1, 4),
+)
+
+# Nombre de requêtes terminées entre deux ajustements de la limite
+ADJUST_EVERY = 20
+
+# Lissage exponentiel de la latence observée
+LATENCY_SMOOTHING = 0.1
+
+# Dérive de la latence de base vers la latence lissée à chaque ajustement : la base
+# suit un changement durable (modèle plus lourd, autre machine) sans oublier le minimum
+BASELINE_DRIFT = 0.05
+
+
+class AdaptiveLimiter:
+    """
+    Limite de concurrence adaptative avec file d'attente FIFO bornée.
+
+    Utilisée uniquement depuis la boucle asyncio : pas de verrou.
+    """
+
+    def __init__(self, name: str, limit: int, min_limit: int, max_limit: int,
+                 max_queue: int = ADMISSION_MAX_QUEUE, max_wait: float = ADMISSION_MAX_WAIT,
+                 tolerance: float = ADMISSION_LATENCY_TOLERANCE):
+        self.name = name
+        self.limit = limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.tolerance = tolerance
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.baseline = None
+        self.smoothed = None
+        self.wait = metrics.Histogram()
+        self._waiters = deque()
+        self._completed = 0
+        self._saturated = False
+
+    async def acquire(self) -> bool:
+        """Prend une place ; False si la file est pleine ou l'attente trop longue."""
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            self._saturated |= self.in_flight >= self.limit
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            return False
+
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except asyncio.TimeoutError:
+            pass
+        except BaseException:
+            # Client parti pendant l'attente : rendre la place si elle venait d'être accordée
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                self._forget(future)
+            raise
+
+        # La place peut avoir été accordée au moment même de l'expiration
+        if not future.done() or future.cancelled():
+            self._forget(future)
+            self.timed_out += 1
+            return False
+        self.wait.observe(time.perf_counter() - start)
+        self.admitted += 1
+        return True
+
+    def release(self, latency: float | None = None):
+        """Libère une place, ajuste la limite avec la latence de la requête, réveille la file."""
+        self.in_flight -= 1
+        if latency is not None:
+            self._observe(latency)
+        while self._waiters and self.in_flight < self.limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                self._saturated |= self.in_flight >= self.limit
+                future.set_result(None)
+
+    def _forget(self, future):
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+
+    def _observe(self, latency: float):
+        if self.smoothed is None:
+            self.smoothed = self.baseline = latency
+        self.smoothed += LATENCY_SMOOTHING * (latency - self.smoothed)
+        self.baseline = min(self.baseline, latency)
+
+        self._completed += 1
+        if self._completed < ADJUST_EVERY:
+            return
+        self._completed = 0
+        if self.smoothed > self.tolerance * self.baseline:
+            self.limit = max(self.min_limit, math.floor(self.limit * 0.9))
+        elif self._saturated:
+            self.limit = min(self.max_limit, self.limit + 1)
+        self._saturated = False
+        self.baseline += BASELINE_DRIFT * (self.smoothed - self.baseline)
+
+    def retry_after(self) -> int:
+        """Estimation (secondes, au moins 1) du temps pour écouler la file actuelle."""
+        if not self.smoothed:
+            return 1
+        return max(1, math.ceil(len(self._waiters) * self.smoothed / max(self.limit, 1)))
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "latency_smoothed_ms": self.smoothed * 1000 if self.smoothed else None,
+            "latency_baseline_ms": self.baseline * 1000 if self.baseline else None,
+            "wait_seconds": self.wait.snapshot(),
+        }
+
+
+def build_limiters(routes=ADMISSION_ROUTES) -> list[tuple]:
+    """(motif compilé, méthodes, limiteur) pour chaque famille de routes."""
+    return [
+        (re.compile(pattern), methods, AdaptiveLimiter(name, limit, min_limit, max_limit))
+        for pattern, methods, name, limit, min_limit, max_limit in routes
+    ]
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI : applique le limiteur de la famille de routes de la requête."""
+
+    def __init__(self, app, limiters: list[tuple] | None = None):
+        self.app = app
+        if limiters is None:
+            limiters = build_limiters()
+            metrics.register("admission", self.snapshot)
+        self.limiters = limiters
+
+    def limiter_for(self, method: str, path: str):
+        for pattern, methods, limiter in self.limiters:
+            if method in methods and pattern.fullmatch(path):
+                return limiter
+        return None
+
+    async def __call__(self, scope, receive, send):
+        limiter = self.limiter_for(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            await self.reject(limiter, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start)
+
+    @staticmethod
+    async def reject(limiter: AdaptiveLimiter, send):
+        body = orjson.dumps({"detail": f"Capacité atteinte ({limiter.name}), réessayez plus tard"})
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(limiter.retry_after()).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def snapshot(self) -> dict:
+        return {limiter.name: limiter.snapshot() for _, _, limiter in self.limiters}
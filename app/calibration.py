@@ -0,0 +1,134 @@
+"""
+Rapport de calibration des paliers d'inférence (model_manager.tiers) : précision et
+latence de chaque palier sur un CSV étiqueté au format data_merge.csv.
+
+Pour chaque palier (nombre de premiers arbres évalués) :
+- précision : exactitude, AUC et log loss par rapport à `a_quitte_l_entreprise`,
+  accord des classes prédites avec le modèle complet et écart moyen des probabilités ;
+- latence : une ligne déjà encodée (p50), une ligne avec le préprocesseur (p50), et
+  coût par ligne d'un lot de BATCH_ROWS lignes encodées.
+
+data_merge.csv a servi à l'entraînement : les scores absolus sont optimistes, la
+comparaison entre paliers reste valable.
+
+Usage :
+    python -m app.calibration
+    python -m app.calibration --rounds 5,10,50 --output calibration.json
+"""
+import argparse
+import json
+import logging
+import statistics
+import time
+from pathlib import Path
+import numpy as np
+from app.lazy import lazy_import
+from app.models import model_manager
+from app.routes import prepare_features_batch
+
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CSV = Path(__file__).parent.parent / "data_merge.csv"
+
+# Répétitions des mesures de latence sur une ligne
+LATENCY_REPEATS = 200
+
+# Lignes du lot de la mesure de débit
+BATCH_ROWS = 10_000
+
+
+def load_labeled(csv_path=DEFAULT_CSV) -> tuple[list[dict], np.ndarray]:
+    """Employés d'un CSV nettoyés comme par le seeder, et étiquette de départ (1 : a quitté)."""
+    from app.seed import clean_csv_row
+    records = [clean_csv_row(row) for row in pd.read_csv(csv_path).to_dict(orient="records")]
+    labels = np.array([str(record.get("a_quitte_l_entreprise")).strip().lower() in ("oui", "yes") for record in records], dtype=int)
+    return records, labels
+
+
+def median_seconds(func, repeats: int = LATENCY_REPEATS) -> float:
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def calibration_report(records: list[dict], labels: np.ndarray, tiers: dict[str, int] | None = None) -> dict:
+    """
+    Précision et latence de chaque palier.
+
+    Args:
+        tiers: Paliers à évaluer, nom -> nombre d'arbres (0 : tous) ; par défaut model_manager.tiers
+    """
+    from sklearn.metrics import log_loss, roc_auc_score
+
+    if model_manager.pipeline is None:
+        model_manager.load()
+    tiers = model_manager.tiers if tiers is None else tiers
+
+    df = prepare_features_batch(records)
+    encoded = model_manager.pipeline[:-1].transform(df)
+    batch = np.resize(encoded, (BATCH_ROWS, encoded.shape[1]))
+    classifier = model_manager.pipeline[-1]
+    total_rounds = classifier.get_booster().num_boosted_rounds()
+    full = classifier.predict_proba(encoded)[:, 1]
+
+    report = {"rows": len(records), "positive_rate": float(labels.mean()), "total_rounds": total_rounds, "tiers": {}}
+    for name, rounds in sorted(tiers.items(), key=lambda item: item[1] or total_rounds):
+        params = {"iteration_range": (0, rounds)} if rounds else {}
+        probabilities = classifier.predict_proba(encoded, **params)[:, 1]
+        predictions = (probabilities > 0.5).astype(int)
+        batch_seconds = median_seconds(lambda: classifier.predict_proba(batch, **params), repeats=5)
+        report["tiers"][name] = {
+            "rounds": rounds or total_rounds,
+            "accuracy": float((predictions == labels).mean()),
+            "auc": float(roc_auc_score(labels, probabilities)),
+            "log_loss": float(log_loss(labels, probabilities)),
+            "agreement_with_full": float((predictions == (full > 0.5)).mean()),
+            "mean_abs_probability_diff": float(np.abs(probabilities - full).mean()),
+            "latency_encoded_row_ms": median_seconds(lambda: classifier.predict_proba(encoded[:1], **params)) * 1000,
+            "latency_row_ms": median_seconds(lambda: model_manager.pipeline.predict_proba(df.iloc[:1], **params)) * 1000,
+            "batch_row_us": batch_seconds / BATCH_ROWS * 1e6,
+        }
+    return report
+
+
+def format_report(report: dict) -> str:
+    """Tableau lisible du rapport."""
+    header = f"{'palier':<10}{'arbres':>7}{'exact.':>8}{'AUC':>7}{'logloss':>9}{'accord':>8}{'|Δp|':>7}{'1 ligne enc.':>14}{'1 ligne':>10}{'lot/ligne':>11}"
+    lines = [f"{report['rows']} lignes, {report['positive_rate']:.1%} de départs, {report['total_rounds']} arbres", header]
+    for name, tier in report["tiers"].items():
+        lines.append(
+            f"{name:<10}{tier['rounds']:>7}{tier['accuracy']:>8.3f}{tier['auc']:>7.3f}{tier['log_loss']:>9.3f}"
+            f"{tier['agreement_with_full']:>8.3f}{tier['mean_abs_probability_diff']:>7.3f}"
+            f"{tier['latency_encoded_row_ms']:>11.3f} ms{tier['latency_row_ms']:>7.2f} ms{tier['batch_row_us']:>8.2f} µs"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Précision et latence des paliers d'inférence")
+    parser.add_argument("--csv", default=str(DEFAULT_CSV), help="CSV étiqueté au format data_merge.csv")
+    parser.add_argument("--rounds", help="Nombres d'arbres supplémentaires à évaluer (ex. 5,10,50)")
+    parser.add_argument("--output", help="Écrit aussi le rapport en JSON")
+
+    args = parser.parse_args()
+
+    tiers = dict(model_manager.tiers)
+    if args.rounds:
+        tiers.update({f"rounds_{n}": int(n) for n in args.rounds.split(",") if n.strip()})
+
+    records, labels = load_labeled(args.csv)
+    report = calibration_report(records, labels, tiers)
+    logger.info("Paliers d'inférence :\n%s", format_report(report))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
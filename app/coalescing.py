@@ -0,0 +1,58 @@
+"""
+Regroupement (single-flight) des requêtes identiques simultanées.
+
+Les relances et les appels en éventail des clients envoient souvent au même moment
+la même demande de prédiction : la première exécute le calcul (prédiction et
+enregistrement), les suivantes attendent et reçoivent le même résultat, au lieu
+de déclencher chacune une inférence et une écriture en base.
+"""
+import asyncio
+import functools
+import threading
+from fastapi.concurrency import run_in_threadpool
+from app import metrics
+
+
+class SingleFlight:
+    """Un seul calcul en cours par clé ; les appels concurrents de même clé le partagent."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    async def run(self, key, func, *args):
+        """
+        Exécute `func(*args)` dans le threadpool, ou attend l'exécution déjà en cours
+        pour `key`. Le résultat (ou l'exception) est partagé par tous les appelants.
+
+        Le calcul est une tâche à part, indépendante de l'appelant qui l'a lancé : si
+        celui-ci est annulé (client déconnecté), les autres reçoivent quand même le résultat.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._calls.get((loop, key))
+            if task is None:
+                task = loop.create_task(run_in_threadpool(func, *args))
+                task.add_done_callback(functools.partial(self._done, (loop, key)))
+                self._calls[(loop, key)] = task
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def _done(self, call_key, task):
+        with self._lock:
+            del self._calls[call_key]
+        if not task.cancelled():
+            task.exception()  # évite l'avertissement si plus personne n'attendait
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+prediction_flights = SingleFlight()
+metrics.register("single_flight", prediction_flights.snapshot)
@@ -0,0 +1,264 @@
+"""
+Entrées/sorties colonnaires (Apache Parquet et Arrow IPC) pour les employés et les prédictions.
+
+Les schémas Arrow reprennent les colonnes et les types des tables SQLAlchemy
+`employees` et `predictions` : les fichiers échangés sont typés (plus de `%` ni de
+`Y/N` à analyser) et lus/écrits par lots (record batches), avec projection de colonnes.
+
+Usage (conversion d'un CSV au format data_merge.csv) :
+    python -m app.columnar convert data_merge.csv employees.parquet
+"""
+import argparse
+import logging
+from pathlib import Path
+from app.lazy import lazy_import
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from sqlalchemy import Boolean, DateTime, Float, Integer, String
+from app.models import Employee, Prediction
+from app.schemas import EmployeeInput
+
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Nombre de lignes par record batch
+DEFAULT_BATCH_SIZE = 10_000
+
+MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# Formats texte proposés à côté des formats colonnaires (exports)
+TEXT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+SUFFIXES = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".arrows": "arrow",
+    ".ipc": "arrow",
+    ".feather": "arrow",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".csv": "csv",
+}
+
+ARROW_TYPES = [
+    (Boolean, pa.bool_()),
+    (Integer, pa.int32()),
+    (Float, pa.float64()),
+    (String, pa.string()),
+    (DateTime, pa.timestamp("us")),
+]
+
+
+def arrow_type(column_type) -> pa.DataType:
+    """Type Arrow correspondant à un type de colonne SQLAlchemy."""
+    for sql_type, pa_type in ARROW_TYPES:
+        if isinstance(column_type, sql_type):
+            return pa_type
+    raise TypeError(f"Type de colonne non supporté : {column_type!r}")
+
+
+def arrow_schema(table) -> pa.Schema:
+    """Schéma Arrow reprenant les colonnes d'une table SQLAlchemy."""
+    return pa.schema([pa.field(col.name, arrow_type(col.type)) for col in table.columns])
+
+
+EMPLOYEE_SCHEMA = arrow_schema(Employee.__table__)
+PREDICTION_SCHEMA = arrow_schema(Prediction.__table__)
+
+# Résultats du scoring en masse (POST /score/...)
+SCORE_RESULT_SCHEMA = pa.schema([
+    pa.field("line", pa.int64()),
+    pa.field("id_employee", pa.int32()),
+    pa.field("prediction", pa.int32()),
+    pa.field("confidence", pa.float64()),
+    pa.field("probability_quitte", pa.float64()),
+    pa.field("risk_level", pa.string()),
+    pa.field("error", pa.string()),
+])
+
+# Colonnes utiles à la validation d'un employé (projection à la lecture)
+EMPLOYEE_INPUT_COLUMNS = list(EmployeeInput.model_fields)
+
+
+def detect_format(path) -> str:
+    """Format d'un fichier d'après son extension : parquet, arrow, ndjson ou csv (par défaut)."""
+    return SUFFIXES.get(Path(path).suffix.lower(), "csv")
+
+
+def project_schema(schema: pa.Schema, columns) -> list[str]:
+    """Colonnes demandées effectivement présentes dans le schéma (dans l'ordre du fichier)."""
+    if columns is None:
+        return schema.names
+    wanted = set(columns)
+    return [name for name in schema.names if name in wanted]
+
+
+def iter_record_batches(source, format: str, columns=None, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Lit un fichier Parquet ou Arrow IPC par record batches.
+
+    Args:
+        source: Chemin ou fichier binaire (seekable pour Parquet et Arrow « file »)
+        format: "parquet" ou "arrow"
+        columns: Colonnes à lire (les colonnes absentes du fichier sont ignorées)
+        batch_size: Nombre maximal de lignes par batch (Parquet)
+    """
+    if format == "parquet":
+        parquet_file = pq.ParquetFile(source)
+        names = project_schema(parquet_file.schema_arrow, columns)
+        yield from parquet_file.iter_batches(batch_size=batch_size, columns=names)
+        return
+
+    if format != "arrow":
+        raise ValueError(f"Format colonnaire inconnu : {format}")
+
+    # Arrow IPC : format « stream » (lecture séquentielle) ou « file » (accès aléatoire)
+    try:
+        reader = ipc.open_stream(source)
+        batches = iter(reader)
+    except pa.ArrowInvalid:
+        if hasattr(source, "seek"):
+            source.seek(0)
+        reader = ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+
+    names = project_schema(reader.schema, columns)
+    for batch in batches:
+        yield batch.select(names)
+
+
+def iter_frames(source, format: str, columns=None, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Comme iter_record_batches, mais produit des DataFrames pandas."""
+    for batch in iter_record_batches(source, format, columns, batch_size):
+        yield batch.to_pandas()
+
+
+def rows_to_batch(rows, schema: pa.Schema) -> pa.RecordBatch:
+    """Construit un record batch à partir de tuples dans l'ordre des colonnes du schéma."""
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema
+    )
+
+
+class _ChunkSink:
+    """Fichier en écriture seule dont on récupère le contenu au fur et à mesure."""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def encode_batches(batches, schema: pa.Schema, format: str):
+    """
+    Encode des record batches en Parquet, Arrow IPC (stream) ou CSV (avec en-tête) et
+    produit les octets au fur et à mesure : seul le batch courant est gardé en mémoire.
+    """
+    sink = _ChunkSink()
+    if format == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    elif format == "arrow":
+        writer = ipc.new_stream(sink, schema, options=ipc.IpcWriteOptions(compression="zstd"))
+    elif format == "csv":
+        writer = pacsv.CSVWriter(sink, schema, write_options=pacsv.WriteOptions(quoting_style="needed"))
+    else:
+        raise ValueError(f"Format colonnaire inconnu : {format}")
+
+    for batch in batches:
+        writer.write_batch(batch)
+        data = sink.drain()
+        if data:
+            yield data
+
+    writer.close()
+    yield sink.drain()
+
+
+def convert_csv(csv_path, output_path, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Convertit un CSV au format data_merge.csv en fichier Parquet/Arrow typé
+    (schéma EMPLOYEE_SCHEMA), en appliquant les règles de nettoyage du seeder.
+
+    Returns:
+        Nombre de lignes écrites
+    """
+    from app.seed import clean_csv_row
+
+    format = detect_format(output_path)
+    if format not in MEDIA_TYPES:
+        raise ValueError(f"Extension de sortie non colonnaire : {output_path}")
+
+    header = pd.read_csv(csv_path, nrows=0).columns
+    schema = pa.schema([field for field in EMPLOYEE_SCHEMA if field.name in header])
+    total = 0
+
+    def batches():
+        nonlocal total
+        for chunk in pd.read_csv(csv_path, chunksize=batch_size):
+            df = pd.DataFrame([clean_csv_row(row) for row in chunk.to_dict(orient="records")])
+            total += len(df)
+            yield pa.RecordBatch.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+    with open(output_path, "wb") as f:
+        for data in encode_batches(batches(), schema, format):
+            f.write(data)
+
+    return total
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Outils d'import/export colonnaire (Parquet, Arrow IPC)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert = subparsers.add_parser("convert", help="Convertit un CSV employés en Parquet/Arrow typé")
+    convert.add_argument("csv_file", help="CSV au format data_merge.csv")
+    convert.add_argument("output_file", help="Fichier de sortie (.parquet ou .arrow)")
+    convert.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Lignes par record batch")
+
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        total = convert_csv(args.csv_file, args.output_file, args.batch_size)
+        csv_size = Path(args.csv_file).stat().st_size
+        output_size = Path(args.output_file).stat().st_size
+        logger.info(
+            "%d lignes converties : %s (%d octets) -> %s (%d octets)",
+            total, args.csv_file, csv_size, args.output_file, output_size
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
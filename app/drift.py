@@ -0,0 +1,312 @@
+"""
+Dérive des données d'entrée par rapport aux données d'entraînement.
+
+Chaque employé prédit à partir de ses variables brutes (POST /predict_employee,
+GET /predict_employee/{id} lu en base, /score/*) met à jour des statistiques par
+variable, en mémoire constante :
+- variables numériques : effectif, moyenne et variance (algorithme de Welford, fusion
+  par lots de Chan), min/max, et histogramme sur les déciles de la référence, qui sert
+  d'esquisse de quantiles (médiane interpolée) ; les valeurs absentes (None, lues en
+  base dans des colonnes nullables) sont comptées à part (`missing`) et n'entrent pas
+  dans ces statistiques ;
+- variables catégorielles : fréquences des modalités de la référence, plus une
+  modalité « autre » pour les valeurs inconnues (mémoire bornée).
+
+La requête ne fait qu'ajouter le tuple de ses valeurs à un tampon borné ; le tampon
+est replié par lots avec numpy (DRIFT_FLUSH_SIZE lignes, ou à la lecture de /drift).
+
+Ne sont pas observés : POST /predict et GET /predict_employee/{id} servi par le magasin
+de variables (seules les variables déjà encodées sont disponibles, pas les valeurs
+brutes), ni /what-if (variantes hypothétiques) et /explain (explication d'un employé,
+pas du trafic de prédiction), qui fausseraient la distribution observée. Les lignes
+prédites sans être observées (POST /predict, magasin de variables) sont comptées dans
+`unobserved` : la part du trafic couverte par /drift reste visible.
+
+GET /drift compare ces statistiques au profil de référence calculé sur data_merge.csv :
+PSI (indice de stabilité de population) par variable, et pour les numériques la
+statistique KS entre les fonctions de répartition aux bornes des déciles.
+"""
+import math
+import os
+import threading
+from operator import itemgetter
+from pathlib import Path
+from typing import get_args
+import numpy as np
+from fastapi import APIRouter, HTTPException
+from app.lazy import lazy_import
+from app.schemas import EmployeeInput
+
+pd = lazy_import("pandas")
+
+router = APIRouter(tags=["monitoring"])
+
+# Données d'entraînement servant de référence
+DRIFT_REFERENCE_CSV = os.getenv("DRIFT_REFERENCE_CSV", str(Path(__file__).parent.parent / "data_merge.csv"))
+
+# Lignes accumulées avant repli dans les statistiques
+DRIFT_FLUSH_SIZE = int(os.getenv("DRIFT_FLUSH_SIZE", "256"))
+
+# Observations minimales avant de signaler une dérive
+DRIFT_MIN_OBSERVATIONS = int(os.getenv("DRIFT_MIN_OBSERVATIONS", "100"))
+
+# Seuils usuels du PSI : < 0,1 stable, 0,1-0,25 dérive modérée, > 0,25 dérive forte
+DRIFT_PSI_WARNING = float(os.getenv("DRIFT_PSI_WARNING", "0.1"))
+DRIFT_PSI_ALERT = float(os.getenv("DRIFT_PSI_ALERT", "0.25"))
+
+# Intervalles de l'histogramme des variables numériques (déciles de la référence)
+DRIFT_BINS = 10
+
+# Modalité regroupant les valeurs absentes de la référence
+OTHER_CATEGORY = "__autre__"
+
+# Lissage des proportions nulles dans le PSI
+PSI_EPSILON = 1e-4
+
+EXCLUDED_FIELDS = {"id_employee", "a_quitte_l_entreprise"}
+
+
+def field_kind(annotation) -> str:
+    types = get_args(annotation) or (annotation,)
+    return "numeric" if any(t in (int, float) for t in types) and bool not in types else "categorical"
+
+
+NUMERIC_FEATURES = [
+    name for name, field in EmployeeInput.model_fields.items()
+    if name not in EXCLUDED_FIELDS and field_kind(field.annotation) == "numeric"
+]
+CATEGORICAL_FEATURES = [
+    name for name, field in EmployeeInput.model_fields.items()
+    if name not in EXCLUDED_FIELDS and field_kind(field.annotation) == "categorical"
+]
+FEATURES = NUMERIC_FEATURES + CATEGORICAL_FEATURES
+
+_feature_values = itemgetter(*FEATURES)
+
+
+def psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Indice de stabilité de population entre deux distributions (proportions)."""
+    expected = np.clip(expected, PSI_EPSILON, None)
+    actual = np.clip(actual, PSI_EPSILON, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def drift_status(score: float) -> str:
+    if score >= DRIFT_PSI_ALERT:
+        return "drift"
+    if score >= DRIFT_PSI_WARNING:
+        return "warning"
+    return "stable"
+
+
+def bin_index(edges: np.ndarray, values: np.ndarray) -> np.ndarray:
+    return np.searchsorted(edges, values, side="right")
+
+
+def binned_quantile(edges: np.ndarray, proportions: np.ndarray, low: float, high: float, q: float) -> float:
+    """Quantile estimé depuis l'histogramme, par interpolation linéaire dans l'intervalle."""
+    bounds = np.concatenate(([low], edges, [high]))
+    cumulative = np.cumsum(proportions)
+    i = min(int(np.searchsorted(cumulative, q)), len(proportions) - 1)
+    before = cumulative[i - 1] if i else 0.0
+    share = (q - before) / proportions[i] if proportions[i] else 0.0
+    start, end = max(bounds[i], low), min(bounds[i + 1], high)
+    return float(start + share * (end - start))
+
+
+class ReferenceProfile:
+    """Distribution de chaque variable dans les données d'entraînement."""
+
+    def __init__(self, frame: "pd.DataFrame"):
+        self.rows = len(frame)
+        self.numeric = {}
+        for name in NUMERIC_FEATURES:
+            values = frame[name].astype(float).to_numpy()
+            edges = np.unique(np.quantile(values, np.linspace(0, 1, DRIFT_BINS + 1)[1:-1]))
+            counts = np.bincount(bin_index(edges, values), minlength=len(edges) + 1)
+            self.numeric[name] = {
+                "edges": edges,
+                "proportions": counts / counts.sum(),
+                "mean": float(values.mean()),
+                "std": float(values.std()),
+                "p50": float(np.median(values)),
+            }
+        self.categorical = {}
+        for name in CATEGORICAL_FEATURES:
+            frequencies = frame[name].map(str).value_counts(normalize=True)
+            self.categorical[name] = {str(key): float(value) for key, value in frequencies.items()}
+
+    @classmethod
+    def from_csv(cls, path) -> "ReferenceProfile":
+        """Profil d'un CSV au format data_merge.csv, nettoyé comme par le seeder."""
+        from app.seed import clean_csv_row
+        rows = [clean_csv_row(row) for row in pd.read_csv(path).to_dict(orient="records")]
+        return cls(pd.DataFrame(rows))
+
+
+class DriftMonitor:
+    """Statistiques en ligne des entrées, comparées au profil de référence."""
+
+    def __init__(self, reference_path=DRIFT_REFERENCE_CSV, flush_size: int = DRIFT_FLUSH_SIZE):
+        self.reference_path = reference_path
+        self.flush_size = flush_size
+        self._reference = None
+        self._reference_error = None
+        self._lock = threading.Lock()
+        self._pending = []
+        self.reset()
+
+    def reset(self):
+        """Repart d'une fenêtre vide (par exemple après un réentraînement)."""
+        with self._lock:
+            self._pending = []
+            self.count = 0
+            self.unobserved = 0
+            self._counts = np.zeros(len(NUMERIC_FEATURES), dtype=np.int64)
+            self._mean = np.zeros(len(NUMERIC_FEATURES))
+            self._m2 = np.zeros(len(NUMERIC_FEATURES))
+            self._min = np.full(len(NUMERIC_FEATURES), np.inf)
+            self._max = np.full(len(NUMERIC_FEATURES), -np.inf)
+            self._bins = None
+            self._categories = None
+
+    @property
+    def reference(self) -> ReferenceProfile | None:
+        if self._reference is None and self._reference_error is None:
+            try:
+                self._reference = ReferenceProfile.from_csv(self.reference_path)
+            except Exception as e:
+                self._reference_error = str(e)
+        return self._reference
+
+    def observe(self, record: dict):
+        """Ajoute un employé prédit (dict au format EmployeeInput)."""
+        with self._lock:
+            self._pending.append(_feature_values(record))
+            full = len(self._pending) >= self.flush_size
+        if full:
+            self.flush()
+
+    def observe_many(self, records: list[dict]):
+        with self._lock:
+            self._pending.extend(map(_feature_values, records))
+            full = len(self._pending) >= self.flush_size
+        if full:
+            self.flush()
+
+    def skip(self, count: int = 1):
+        """Compte des lignes prédites sans valeurs brutes à observer."""
+        with self._lock:
+            self.unobserved += count
+
+    def flush(self):
+        """Replie le tampon dans les statistiques."""
+        reference = self.reference
+        with self._lock:
+            rows, self._pending = self._pending, []
+            if not rows or reference is None:
+                return
+            if self._bins is None:
+                self._bins = [np.zeros(len(reference.numeric[name]["edges"]) + 1, dtype=np.int64) for name in NUMERIC_FEATURES]
+                self._categories = [dict.fromkeys([*reference.categorical[name], OTHER_CATEGORY], 0) for name in CATEGORICAL_FEATURES]
+
+            columns = list(zip(*rows))
+            # None -> NaN : valeurs absentes, exclues variable par variable
+            numeric = np.array(columns[:len(NUMERIC_FEATURES)], dtype=float)
+            present = ~np.isnan(numeric)
+
+            # Fusion (Chan) des moments du lot avec les moments courants, par variable
+            n_batch = present.sum(axis=1)
+            total = self._counts + n_batch
+            batch_mean = np.divide(np.where(present, numeric, 0.0).sum(axis=1), n_batch,
+                                   out=np.zeros(len(n_batch)), where=n_batch > 0)
+            batch_m2 = (np.where(present, numeric - batch_mean[:, None], 0.0) ** 2).sum(axis=1)
+            delta = batch_mean - self._mean
+            merged = total > 0
+            self._mean += np.divide(delta * n_batch, total, out=np.zeros(len(total)), where=merged)
+            self._m2 += batch_m2 + np.divide(delta ** 2 * self._counts * n_batch, total, out=np.zeros(len(total)), where=merged)
+            self._counts = total
+            self.count += len(rows)
+            np.fmin(self._min, np.fmin.reduce(numeric, axis=1), out=self._min)
+            np.fmax(self._max, np.fmax.reduce(numeric, axis=1), out=self._max)
+
+            for i, name in enumerate(NUMERIC_FEATURES):
+                edges = reference.numeric[name]["edges"]
+                self._bins[i] += np.bincount(bin_index(edges, numeric[i][present[i]]), minlength=len(edges) + 1)
+
+            for counts, values in zip(self._categories, columns[len(NUMERIC_FEATURES):]):
+                for value in values:
+                    value = str(value)
+                    counts[value if value in counts else OTHER_CATEGORY] += 1
+
+    def report(self) -> dict:
+        """Scores de dérive par variable."""
+        self.flush()
+        reference = self.reference
+        if reference is None:
+            raise RuntimeError(f"Profil de référence indisponible : {self._reference_error}")
+
+        features = {}
+        with self._lock:
+            observed = dict(zip(NUMERIC_FEATURES, self._counts.tolist()))
+            for i, name in enumerate(NUMERIC_FEATURES):
+                ref = reference.numeric[name]
+                entry = {
+                    "type": "numeric",
+                    "reference_mean": ref["mean"],
+                    "reference_std": ref["std"],
+                    "reference_p50": ref["p50"],
+                }
+                count = int(self._counts[i])
+                if self.count:
+                    entry["missing"] = self.count - count
+                if count:
+                    proportions = self._bins[i] / count
+                    entry.update({
+                        "mean": float(self._mean[i]),
+                        "std": math.sqrt(self._m2[i] / count),
+                        "min": float(self._min[i]),
+                        "max": float(self._max[i]),
+                        "p50": binned_quantile(ref["edges"], proportions, self._min[i], self._max[i], 0.5),
+                        "psi": psi(ref["proportions"], proportions),
+                        "ks": float(np.max(np.abs(np.cumsum(proportions) - np.cumsum(ref["proportions"])))),
+                    })
+                features[name] = entry
+
+            for i, name in enumerate(CATEGORICAL_FEATURES):
+                ref = reference.categorical[name]
+                entry = {"type": "categorical", "reference_frequencies": ref}
+                if self.count:
+                    counts = self._categories[i]
+                    frequencies = {key: value / self.count for key, value in counts.items() if value}
+                    expected = np.array([ref.get(key, 0.0) for key in counts])
+                    actual = np.array([counts[key] / self.count for key in counts])
+                    entry.update({"frequencies": frequencies, "psi": psi(expected, actual)})
+                features[name] = entry
+
+        for name, entry in features.items():
+            if "psi" not in entry or observed.get(name, self.count) < DRIFT_MIN_OBSERVATIONS:
+                entry["status"] = "insufficient_data"
+            else:
+                entry["status"] = drift_status(entry["psi"])
+
+        return {
+            "observations": self.count,
+            "unobserved": self.unobserved,
+            "min_observations": DRIFT_MIN_OBSERVATIONS,
+            "reference_rows": reference.rows,
+            "drifted_features": sorted(name for name, entry in features.items() if entry["status"] == "drift"),
+            "features": features,
+        }
+
+
+drift_monitor = DriftMonitor()
+
+
+@router.get("/drift")
+def get_drift():
+    """Dérive des entrées prédites par rapport aux données d'entraînement (PSI, KS)."""
+    try:
+        return drift_monitor.report()
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
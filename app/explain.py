@@ -0,0 +1,169 @@
+"""
+Explications des prédictions : contribution de chaque champ de EmployeeInput,
+calculée par XGBoost (TreeSHAP natif) sur le modèle déjà chargé.
+
+Les explications sont mises en cache par empreinte des variables préparées : un
+employé inchangé n'est expliqué qu'une fois par version de modèle.
+"""
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from app.lazy import lazy_import
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app import metrics
+from app.models import model_manager, Employee, EMPLOYEE_DATA_COLUMNS
+from app.routes import prepare_features_batch
+from app.schemas import ExplanationOutput, ExplainBatchRequest
+from app.database import get_db
+
+pd = lazy_import("pandas")
+
+router = APIRouter(tags=["explications"])
+
+# Nombre maximal d'explications gardées en mémoire
+EXPLAIN_CACHE_SIZE = int(os.getenv("EXPLAIN_CACHE_SIZE", "10000"))
+
+# Colonnes de Employee lues pour expliquer une prédiction
+EMPLOYEE_COLUMNS = [Employee.__table__.c[name] for name in EMPLOYEE_DATA_COLUMNS]
+
+
+class ExplanationCache:
+    """Cache LRU borné des explications, indexé par empreinte des variables."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+explanation_cache = ExplanationCache(EXPLAIN_CACHE_SIZE)
+metrics.register("explain_cache", explanation_cache.snapshot)
+
+
+def feature_fingerprints(df: "pd.DataFrame") -> list[int]:
+    """Empreinte (hash 64 bits) de chaque ligne de variables préparées, indépendante de l'ordre des colonnes."""
+    return pd.util.hash_pandas_object(df[sorted(df.columns)], index=False).tolist()
+
+
+def explain_records(records: list[dict], approximate: bool = False) -> list[dict]:
+    """
+    Explique un lot d'employés : les lignes absentes du cache sont expliquées
+    ensemble, en un seul appel au modèle.
+
+    Returns:
+        Pour chaque employé : probabilité de départ, valeur de base et contributions
+        par champ (non triées)
+    """
+    df = prepare_features_batch(records)
+    # Le cache est propre à la version du modèle (et non à l'objet pipeline, dont l'id()
+    # peut être réutilisé après un rechargement) et à la méthode de calcul
+    keys = [(model_manager.version, approximate, fp) for fp in feature_fingerprints(df)]
+    entries = [explanation_cache.get(key) for key in keys]
+
+    missing = [i for i, entry in enumerate(entries) if entry is None]
+    if missing:
+        contributions, base_values = model_manager.explain(df.iloc[missing], approximate)
+        # La somme des contributions et de la valeur de base donne le logit de predict_proba
+        logits = contributions.to_numpy().sum(axis=1) + base_values
+        probabilities = 1.0 / (1.0 + np.exp(-logits))
+        for row, i in enumerate(missing):
+            entries[i] = {
+                "probability_quitte": float(probabilities[row]),
+                "base_value": float(base_values[row]),
+                "contributions": dict(zip(contributions.columns, contributions.iloc[row].tolist())),
+            }
+            explanation_cache.put(keys[i], entries[i])
+
+    return entries
+
+
+def build_explanation(record: dict, entry: dict, top: int | None) -> ExplanationOutput:
+    """Réponse triée par contribution décroissante (valeur absolue), limitée aux `top` premières."""
+    ranked = sorted(entry["contributions"].items(), key=lambda item: abs(item[1]), reverse=True)
+    return ExplanationOutput(
+        id_employee=record["id_employee"],
+        prediction=int(entry["probability_quitte"] > 0.5),
+        probability_quitte=entry["probability_quitte"],
+        base_value=entry["base_value"],
+        contributions=[
+            {"feature": feature, "value": record.get(feature), "contribution": contribution}
+            for feature, contribution in ranked[:top]
+        ],
+    )
+
+
+def load_employee_records(db: Session, ids: list[int]) -> dict[int, dict]:
+    """Lit les employés demandés en une seule requête."""
+    rows = db.execute(select(*EMPLOYEE_COLUMNS).where(Employee.id_employee.in_(set(ids)))).all()
+    return {row.id_employee: dict(row._mapping) for row in rows}
+
+
+def explain_employees(db: Session, ids: list[int], approximate: bool, top: int | None) -> list[ExplanationOutput]:
+    """Explique les employés `ids` (dans l'ordre demandé) ; 404 si l'un d'eux n'existe pas."""
+    if model_manager.pipeline is None:
+        raise HTTPException(status_code=503, detail="Modèle non chargé")
+
+    employees = load_employee_records(db, ids)
+    unknown = [id_employee for id_employee in ids if id_employee not in employees]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Employé(s) non trouvé(s) : {unknown}")
+
+    records = [employees[id_employee] for id_employee in ids]
+    try:
+        entries = explain_records(records, approximate)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return [build_explanation(record, entry, top) for record, entry in zip(records, entries)]
+
+
+@router.get("/predict_employee/{id_employee}/explain", response_model=ExplanationOutput)
+def explain_employee(
+    id_employee: int,
+    top: int | None = Query(None, ge=1, description="Nombre de contributions renvoyées (toutes par défaut)"),
+    approximate: bool = Query(False, description="Approximation de Saabas au lieu de TreeSHAP exact"),
+    db: Session = Depends(get_db),
+):
+    """Pourquoi cet employé est-il (ou non) considéré à risque ?"""
+    return explain_employees(db, [id_employee], approximate, top)[0]
+
+
+@router.post("/predict_employee/explain", response_model=list[ExplanationOutput])
+def explain_employees_batch(
+    request: ExplainBatchRequest,
+    top: int | None = Query(None, ge=1, description="Nombre de contributions renvoyées par employé"),
+    approximate: bool = Query(False, description="Approximation de Saabas au lieu de TreeSHAP exact"),
+    db: Session = Depends(get_db),
+):
+    """Explique un lot d'employés en un seul appel au modèle."""
+    return explain_employees(db, request.ids, approximate, top)
@@ -0,0 +1,260 @@
+"""
+Export complet des employés avec leur dernière prédiction (GET /export et CLI).
+
+La jointure `employees` ⟕ `current_risk` (dernière prédiction de chaque employé) est
+lue par un curseur serveur (stream_results) par lots de EXPORT_BATCH_SIZE lignes, et
+chaque lot est encodé puis envoyé avant de lire le suivant : la mémoire reste celle
+d'un lot, quelle que soit la taille de la table (pas d'objets ORM, pas de résultat
+complet en mémoire).
+
+Formats : CSV (avec en-tête), NDJSON, Parquet (un row group par lot, zstd).
+Chaque export mesure son débit (lignes/s, octets/s) : journalisé à la fin et cumulé
+dans la section « export » de GET /metrics.
+
+Usage :
+    python -m app.export employees.parquet
+    python -m app.export employees.csv --departement Commercial
+    python -m app.export - --format ndjson | gzip > employees.ndjson.gz
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+import pyarrow as pa
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+from app import metrics
+from app.columnar import MEDIA_TYPES, TEXT_MEDIA_TYPES, arrow_type, detect_format, encode_batches, rows_to_batch
+from app.database import engine, get_db
+from app.models import CurrentRisk, Employee, EMPLOYEE_DATA_COLUMNS
+from app.serialization import dumps_line, streaming_response
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["export"])
+
+# Lignes lues sur le curseur serveur, encodées et envoyées à la fois
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+EXPORT_MEDIA_TYPES = {**TEXT_MEDIA_TYPES, "parquet": MEDIA_TYPES["parquet"]}
+
+EXPORT_COLUMNS = [
+    *(Employee.__table__.c[name] for name in EMPLOYEE_DATA_COLUMNS),
+    Employee.updated_at,
+    CurrentRisk.prediction_id,
+    CurrentRisk.prediction,
+    CurrentRisk.confidence,
+    CurrentRisk.risk_level,
+    CurrentRisk.probability_quitte,
+    CurrentRisk.model_version,
+    CurrentRisk.created_at.label("predicted_at"),
+]
+
+EXPORT_SCHEMA = pa.schema([pa.field(column.name, arrow_type(column.type)) for column in EXPORT_COLUMNS])
+
+
+def build_export_query(departement: str | None = None, risk_level: str | None = None):
+    """Employés et dernière prédiction (colonnes vides si jamais prédits), par identifiant."""
+    stmt = select(*EXPORT_COLUMNS).outerjoin(CurrentRisk, CurrentRisk.id_employee == Employee.id_employee)
+    if departement is not None:
+        stmt = stmt.where(Employee.departement == departement)
+    if risk_level is not None:
+        stmt = stmt.where(CurrentRisk.risk_level == risk_level)
+    return stmt.order_by(Employee.id_employee)
+
+
+def iter_partitions(db: Session, stmt, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Lots de tuples lus par le curseur serveur, sur la connexion de la session (réplica
+    compris) mais sans la couche ORM, qui coûtait le quart du temps de lecture.
+    """
+    connection = db.connection(bind_arguments={"clause": stmt})
+    result = connection.execute(stmt.execution_options(stream_results=True, yield_per=batch_size))
+    yield from result.partitions()
+
+
+def encode_ndjson(partitions):
+    names = EXPORT_SCHEMA.names
+    for rows in partitions:
+        yield b"".join(dumps_line(dict(zip(names, row))) for row in rows)
+
+
+def encode_columnar(format: str):
+    """CSV et Parquet : chaque lot devient un record batch, encodé par Arrow."""
+    def encode(partitions):
+        yield from encode_batches((rows_to_batch(rows, EXPORT_SCHEMA) for rows in partitions), EXPORT_SCHEMA, format)
+    return encode
+
+
+ENCODERS = {"csv": encode_columnar("csv"), "ndjson": encode_ndjson, "parquet": encode_columnar("parquet")}
+
+
+class ExportStats:
+    """Lignes et octets produits par un export, et son débit."""
+
+    def __init__(self, format: str):
+        self.format = format
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.completed = False
+
+    def count_rows(self, partitions):
+        for rows in partitions:
+            self.rows += len(rows)
+            yield rows
+
+    def measure(self, chunks):
+        """Compte les octets produits et chronomètre le flux jusqu'à son dernier morceau."""
+        start = time.perf_counter()
+        try:
+            for chunk in chunks:
+                self.bytes += len(chunk)
+                yield chunk
+            self.completed = True
+        finally:
+            self.seconds = time.perf_counter() - start
+
+    def summary(self) -> dict:
+        seconds = self.seconds or 1e-9
+        return {
+            "format": self.format,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "seconds": self.seconds,
+            "rows_per_second": self.rows / seconds,
+            "bytes_per_second": self.bytes / seconds,
+            "completed": self.completed,
+        }
+
+
+def export_chunks(db: Session, format: str, stmt, stats: ExportStats, batch_size: int = EXPORT_BATCH_SIZE):
+    """Octets de l'export au format demandé, lot par lot."""
+    partitions = stats.count_rows(iter_partitions(db, stmt, batch_size))
+    return stats.measure(ENCODERS[format](partitions))
+
+
+class ExportMetrics:
+    """Cumul des exports servis par l'API, pour GET /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.exports = 0
+        self.interrupted = 0
+        self.rows = 0
+        self.bytes = 0
+        self.last = None
+        self.duration = metrics.Histogram(buckets=(0.1, 1.0, 10.0, 60.0, 300.0, 1800.0))
+
+    def record(self, stats: ExportStats):
+        summary = stats.summary()
+        with self._lock:
+            self.exports += 1
+            self.interrupted += not stats.completed
+            self.rows += stats.rows
+            self.bytes += stats.bytes
+            self.last = summary
+        self.duration.observe(stats.seconds)
+        logger.info(
+            "Export %s %s : %d lignes, %d octets en %.2f s (%.0f lignes/s, %.1f Mo/s)",
+            stats.format, "terminé" if stats.completed else "interrompu", stats.rows, stats.bytes,
+            stats.seconds, summary["rows_per_second"], summary["bytes_per_second"] / 1e6,
+        )
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "exports": self.exports,
+                "interrupted": self.interrupted,
+                "rows": self.rows,
+                "bytes": self.bytes,
+                "last": self.last,
+                "seconds": self.duration.snapshot(),
+            }
+
+
+export_metrics = ExportMetrics()
+metrics.register("export", export_metrics.snapshot)
+
+
+def recorded(chunks, stats: ExportStats):
+    """Enregistre le débit de l'export à la fin du flux (terminé ou client parti)."""
+    try:
+        yield from chunks
+    finally:
+        export_metrics.record(stats)
+
+
+@router.get("/export")
+def export_employees(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$", description="csv, ndjson ou parquet"),
+    departement: str | None = Query(None, description="Filtrer sur un département"),
+    risk_level: str | None = Query(None, description="Filtrer sur le niveau de risque de la dernière prédiction"),
+    db: Session = Depends(get_db),
+):
+    """
+    Tous les employés avec leur dernière prédiction, diffusés lot par lot.
+
+    CSV et NDJSON sont compressés à la volée selon Accept-Encoding ; Parquet est
+    compressé par colonne (zstd).
+    """
+    stats = ExportStats(format)
+    chunks = recorded(export_chunks(db, format, build_export_query(departement, risk_level), stats), stats)
+    headers = {"Content-Disposition": f'attachment; filename="employees.{format}"'}
+    if format == "parquet":
+        return StreamingResponse(chunks, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+    return streaming_response(request, chunks, EXPORT_MEDIA_TYPES[format], headers=headers)
+
+
+def export_to_file(output, format: str, departement: str | None = None, risk_level: str | None = None,
+                   batch_size: int = EXPORT_BATCH_SIZE, bind=engine) -> dict:
+    """
+    Écrit l'export dans `output` (fichier binaire ouvert en écriture).
+
+    Returns:
+        Lignes, octets, durée et débit de l'export
+    """
+    SessionLocal = sessionmaker(bind=bind)
+    stats = ExportStats(format)
+    with SessionLocal() as db:
+        for chunk in export_chunks(db, format, build_export_query(departement, risk_level), stats, batch_size):
+            output.write(chunk)
+    return stats.summary()
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Exporte les employés avec leur dernière prédiction")
+    parser.add_argument("output_file", help="Fichier de sortie (.csv, .ndjson, .parquet), ou - pour la sortie standard")
+    parser.add_argument("--format", choices=sorted(ENCODERS), help="Format (par défaut : d'après l'extension)")
+    parser.add_argument("--departement", help="Filtrer sur un département")
+    parser.add_argument("--risk-level", help="Filtrer sur le niveau de risque de la dernière prédiction")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE, help="Lignes lues et encodées par lot")
+
+    args = parser.parse_args()
+    format = args.format or detect_format(args.output_file)
+    if format not in ENCODERS:
+        parser.error(f"Format d'export non supporté : {format} (--format {', '.join(sorted(ENCODERS))})")
+
+    if args.output_file == "-":
+        summary = export_to_file(sys.stdout.buffer, format, args.departement, args.risk_level, args.batch_size)
+    else:
+        with open(args.output_file, "wb") as f:
+            summary = export_to_file(f, format, args.departement, args.risk_level, args.batch_size)
+
+    logger.info(
+        "%d lignes exportées (%s, %d octets) en %.2f s : %.0f lignes/s, %.1f Mo/s",
+        summary["rows"], format, summary["bytes"], summary["seconds"],
+        summary["rows_per_second"], summary["bytes_per_second"] / 1e6,
+    )
+
+
+if __name__ == "__main__":
+    # Journal sur la sortie d'erreur : la sortie standard peut porter l'export
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stderr)
+    main()
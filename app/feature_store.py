@@ -0,0 +1,350 @@
+"""
+Magasin de variables en mémoire : tous les employés, déjà encodés pour le modèle.
+
+Chaque employé y est une ligne de la matrice que le préprocesseur du pipeline
+produirait (one-hot compris), en float32 et rangée par colonnes (XGBoost convertit de
+toute façon ses entrées en float32 : les prédictions sont identiques). Sans lecture
+en base ni préprocesseur, prédire un employé revient à un appel au modèle encodé :
+- GET /predict_employee/{id} lit la ligne de l'employé (repli sur la base s'il est absent) ;
+- GET /score/segment prédit une population entière, ou un segment (département,
+  poste...), en une seule sélection de lignes et un seul appel au modèle.
+
+Index : les identifiants chargés au démarrage sont triés (recherche dichotomique,
+4 octets par employé) ; ceux ajoutés ensuite passent par un dictionnaire.
+
+Mise à jour :
+- les écritures d'employés de ce processus sont reprises après chaque commit (mises
+  en file, encodées par lot à la lecture suivante) ;
+- les écritures des autres processus (seeder, autres workers) sont relues toutes les
+  FEATURE_STORE_REFRESH_SECONDS secondes par l'index sur employees.updated_at.
+
+Activé par FEATURE_STORE_ENABLED=true, chargé au démarrage après le préchauffage du
+modèle ; la mémoire occupée par employé est exposée sur GET /metrics (feature_store).
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from app import metrics
+from app.database import engine
+from app.models import Employee, EMPLOYEE_DATA_COLUMNS, model_manager
+from app.routes import WRITTEN_EMPLOYEES, inference_tier, prepare_features_batch
+from app.serialization import fast_response
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["predictions"])
+
+FEATURE_STORE_ENABLED = os.getenv("FEATURE_STORE_ENABLED", "false").lower() == "true"
+
+# Intervalle de relecture des employés modifiés par d'autres processus (0 : jamais)
+FEATURE_STORE_REFRESH_SECONDS = float(os.getenv("FEATURE_STORE_REFRESH_SECONDS", "10"))
+
+# Employés lus et encodés à la fois au chargement
+FEATURE_STORE_BATCH_SIZE = int(os.getenv("FEATURE_STORE_BATCH_SIZE", "10000"))
+
+# Recouvrement de la relecture : écritures validées juste après la relecture précédente
+REFRESH_OVERLAP_SECONDS = 60
+
+# Seuil de probabilité de départ du niveau de risque "Haut" (voir compute_risk_level)
+HIGH_RISK_THRESHOLD = 0.7
+
+EMPLOYEE_COLUMNS = [Employee.__table__.c[name] for name in EMPLOYEE_DATA_COLUMNS]
+
+
+def category_columns(preprocessor) -> dict[tuple[str, str], int]:
+    """Colonne encodée de chaque modalité one-hot : (variable, valeur) -> indice."""
+    columns = {}
+    for name, transformer, selected in preprocessor.transformers_:
+        if not hasattr(transformer, "categories_") or name not in preprocessor.output_indices_:
+            continue
+        position = preprocessor.output_indices_[name].start
+        drop_idx = getattr(transformer, "drop_idx_", None)
+        for i, (field, categories) in enumerate(zip(selected, transformer.categories_)):
+            for j, value in enumerate(categories):
+                if drop_idx is not None and drop_idx[i] == j:
+                    continue
+                columns[(field, str(value))] = position
+                position += 1
+    return columns
+
+
+def encode_records(pipeline, records: list[dict]) -> np.ndarray:
+    """Variables encodées par le préprocesseur du pipeline, en float32."""
+    return np.asarray(pipeline[:-1].transform(prepare_features_batch(records)), dtype=np.float32)
+
+
+class FeatureStore:
+    """Matrice encodée des employés, indexée par id_employee."""
+
+    def __init__(self, bind=engine, enabled: bool = FEATURE_STORE_ENABLED, batch_size: int = FEATURE_STORE_BATCH_SIZE):
+        self.bind = bind
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        # Un seul encodage des écritures en file à la fois (appliquées dans l'ordre)
+        self._apply_lock = threading.Lock()
+        self._pending = []
+        self._pipeline = None
+        self._categories = {}
+        self._matrix = np.empty((0, 0), dtype=np.float32, order="F")
+        self._ids = np.empty(0, dtype=np.int32)
+        self._size = 0
+        self._sorted = 0
+        self._extra = {}
+        self._watermark = None
+        self._refresh_thread = None
+        self.load_seconds = None
+        self.refreshed_at = None
+
+    @property
+    def ready(self) -> bool:
+        """Chargé, et encodé par le modèle actuellement servi."""
+        return self.enabled and self._pipeline is not None and self._pipeline is model_manager.pipeline
+
+    def load(self):
+        """Charge et encode tous les employés (lecture par lots sur un curseur serveur)."""
+        if model_manager.pipeline is None:
+            raise RuntimeError("Modèle non chargé")
+        start = time.perf_counter()
+        started_at = datetime.utcnow()
+        pipeline = model_manager.pipeline
+        width = len(pipeline[:-1].get_feature_names_out())
+
+        with Session(self.bind) as db:
+            # Taille connue d'avance : une seule allocation, sans recopie en cours de chargement
+            capacity = db.scalar(select(func.count()).select_from(Employee))
+            matrix = np.zeros((capacity, width), dtype=np.float32, order="F")
+            ids = np.zeros(capacity, dtype=np.int32)
+            stmt = select(*EMPLOYEE_COLUMNS).order_by(Employee.id_employee)
+            result = db.connection().execute(stmt.execution_options(stream_results=True, yield_per=self.batch_size))
+            size = 0
+            for rows in result.mappings().partitions():
+                rows = rows[:capacity - size]  # employés insérés depuis le comptage : repris par refresh()
+                if not rows:
+                    break
+                matrix[size:size + len(rows)] = encode_records(pipeline, rows)
+                ids[size:size + len(rows)] = [row["id_employee"] for row in rows]
+                size += len(rows)
+
+        with self._lock:
+            self._pipeline = pipeline
+            self._categories = category_columns(pipeline[:-1][-1])
+            self._matrix, self._ids = matrix, ids
+            self._size = self._sorted = size
+            self._extra = {}
+            self._watermark = started_at
+        self.load_seconds = time.perf_counter() - start
+        # Écritures validées pendant le chargement
+        self.refresh()
+        logger.info(
+            "Magasin de variables chargé : %d employés, %d variables encodées, %.0f octets/employé en %.2f s",
+            size, width, self.bytes_per_employee(), self.load_seconds,
+        )
+
+    def refresh(self) -> int:
+        """Relit les employés modifiés depuis la relecture précédente ; nombre d'employés repris."""
+        if not self.ready:
+            return 0
+        started_at = datetime.utcnow()
+        since = self._watermark - timedelta(seconds=REFRESH_OVERLAP_SECONDS)
+        stmt = select(*EMPLOYEE_COLUMNS).where(Employee.updated_at > since)
+        with Session(self.bind) as db:
+            records = [dict(row) for row in db.execute(stmt).mappings()]
+        self.upsert(records)
+        self._apply_pending()
+        self._watermark = started_at
+        self.refreshed_at = started_at
+        return len(records)
+
+    def start_refresh(self, interval: float = FEATURE_STORE_REFRESH_SECONDS) -> threading.Thread | None:
+        """Relecture périodique dans un thread (écritures des autres processus)."""
+        if interval <= 0 or self._refresh_thread is not None:
+            return None
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.warning("Relecture du magasin de variables impossible : %s", e)
+
+        self._refresh_thread = threading.Thread(target=loop, name="feature-store-refresh", daemon=True)
+        self._refresh_thread.start()
+        return self._refresh_thread
+
+    def upsert(self, records: list[dict]):
+        """
+        Met en file des employés écrits ; encodés par lot à la prochaine lecture. Avant
+        la fin du chargement, rien n'est gardé : la relecture finale de load() les reprend.
+        """
+        if records and self.ready:
+            with self._lock:
+                self._pending.extend(records)
+
+    def _apply_pending(self, wait: bool = True):
+        """
+        Encode les écritures en file hors du verrou de lecture, puis les recopie dans la
+        matrice. Sans `wait`, rend la main si un autre thread est déjà en train d'encoder.
+        """
+        if not self._pending or not self.ready:
+            return
+        if not self._apply_lock.acquire(blocking=wait):
+            return
+        try:
+            with self._lock:
+                latest = {record["id_employee"]: record for record in self._pending}
+                self._pending = []
+                pipeline = self._pipeline
+            if not latest:
+                return
+            encoded = encode_records(pipeline, list(latest.values()))
+            with self._lock:
+                self._write_rows(latest, encoded)
+        finally:
+            self._apply_lock.release()
+
+    def _write_rows(self, latest: dict, encoded: np.ndarray):
+        """Recopie des lignes encodées (sous self._lock) : mise à jour en place ou ajout."""
+        positions = [self._position(id_employee) for id_employee in latest]
+        new = sum(position is None for position in positions)
+        if self._size + new > len(self._ids):
+            self._grow(self._size + new)
+        for id_employee, position, row in zip(latest, positions, encoded):
+            if position is None:
+                position = self._size
+                self._ids[position] = id_employee
+                self._extra[id_employee] = position
+                self._size += 1
+            self._matrix[position] = row
+
+    def _grow(self, needed: int):
+        capacity = max(needed, len(self._ids) + len(self._ids) // 2, 1024)
+        matrix = np.zeros((capacity, self._matrix.shape[1]), dtype=np.float32, order="F")
+        matrix[:self._size] = self._matrix[:self._size]
+        ids = np.zeros(capacity, dtype=np.int32)
+        ids[:self._size] = self._ids[:self._size]
+        self._matrix, self._ids = matrix, ids
+
+    def _position(self, id_employee: int) -> int | None:
+        i = int(np.searchsorted(self._ids[:self._sorted], id_employee))
+        if i < self._sorted and self._ids[i] == id_employee:
+            return i
+        return self._extra.get(id_employee)
+
+    def get(self, id_employee: int) -> np.ndarray | None:
+        """
+        Ligne encodée (1 x variables) d'un employé, ou None (absent, magasin non chargé).
+        N'attend pas l'encodage en cours dans un autre thread : la ligne lue est alors
+        celle d'avant les écritures qu'il traite.
+        """
+        if not self.ready:
+            return None
+        self._apply_pending(wait=False)
+        with self._lock:
+            position = self._position(id_employee)
+            return None if position is None else self._matrix[position:position + 1].copy()
+
+    def segment(self, filters: dict[str, str] | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Identifiants et lignes encodées des employés dont les variables catégorielles
+        valent `filters` (toute la population sans filtre).
+        """
+        if not self.ready:
+            raise RuntimeError("Magasin de variables non chargé")
+        self._apply_pending()
+        with self._lock:
+            matrix, ids = self._matrix[:self._size], self._ids[:self._size]
+            # Copies faites sous le verrou : les écritures suivantes modifient la matrice en place
+            if not filters:
+                return ids.copy(), matrix.copy()
+            mask = np.ones(self._size, dtype=bool)
+            for field, value in filters.items():
+                column = self._categories.get((field, str(value)))
+                if column is None:
+                    # Modalité inconnue du modèle : aucune ligne encodée ne la porte
+                    return ids[:0].copy(), matrix[:0].copy()
+                mask &= matrix[:, column] == 1
+            return ids[mask], matrix[mask]
+
+    def bytes_per_employee(self) -> float:
+        total = self._matrix.nbytes + self._ids.nbytes + len(self._extra) * 100  # entrée de dict et entiers
+        return total / self._size if self._size else 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "ready": self.ready,
+                "employees": self._size,
+                "encoded_features": self._matrix.shape[1],
+                "capacity": len(self._ids),
+                "bytes": self._matrix.nbytes + self._ids.nbytes,
+                "bytes_per_employee": self.bytes_per_employee(),
+                "pending": len(self._pending),
+                "load_seconds": self.load_seconds,
+                "refreshed_at": self.refreshed_at.isoformat() if self.refreshed_at else None,
+            }
+
+
+feature_store = FeatureStore()
+metrics.register("feature_store", feature_store.snapshot)
+
+
+@event.listens_for(Session, "after_commit")
+def _store_written_employees(session):
+    """Reporte dans le magasin les employés écrits par la transaction validée."""
+    written = session.info.pop(WRITTEN_EMPLOYEES, None)
+    if written:
+        feature_store.upsert(written)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_written_employees(session):
+    session.info.pop(WRITTEN_EMPLOYEES, None)
+
+
+@router.get("/score/segment")
+def score_segment(
+    request: Request,
+    departement: str | None = Query(None, description="Filtrer sur un département"),
+    poste: str | None = Query(None, description="Filtrer sur un poste"),
+    statut_marital: str | None = Query(None),
+    domaine_etude: str | None = Query(None),
+    frequence_deplacement: str | None = Query(None),
+    tier: str | None = Depends(inference_tier),
+):
+    """
+    Probabilité de départ de tous les employés d'un segment (toute la population sans
+    filtre), prédite depuis le magasin de variables en un seul appel au modèle. Les
+    prédictions ne sont pas archivées.
+    """
+    filters = {
+        field: value for field, value in {
+            "departement": departement,
+            "poste": poste,
+            "statut_marital": statut_marital,
+            "domaine_etude": domaine_etude,
+            "frequence_deplacement": frequence_deplacement,
+        }.items() if value is not None
+    }
+    try:
+        ids, matrix = feature_store.segment(filters)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    probabilities = model_manager.predict_encoded(matrix, tier)[:, 1] if len(ids) else np.empty(0)
+    return fast_response(request, {
+        "model_version": model_manager.version_for(tier),
+        "employees": len(ids),
+        "mean_probability_quitte": float(probabilities.mean()) if len(ids) else None,
+        "high_risk": int((probabilities > HIGH_RISK_THRESHOLD).sum()),
+        "id_employee": ids,
+        "probability_quitte": probabilities,
+    })
@@ -0,0 +1,18 @@
+"""
+Empreintes de contenu, sans dépendance vers l'API : regroupement des requêtes
+identiques (app/coalescing.py) et détection des mises à jour sans changement des
+employés (routes, seeder).
+"""
+import hashlib
+import orjson
+from app.models import EMPLOYEE_DATA_COLUMNS
+
+
+def payload_fingerprint(payload: dict) -> str:
+    """Empreinte d'un corps de requête, indépendante de l'ordre des champs."""
+    return hashlib.blake2b(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+
+
+def employee_content_hash(employee: dict) -> str:
+    """Empreinte des données d'un employé (colonnes de EMPLOYEE_DATA_COLUMNS)."""
+    return payload_fingerprint({col: employee.get(col) for col in EMPLOYEE_DATA_COLUMNS})
@@ -0,0 +1,23 @@
+"""
+Import différé des dépendances lourdes (pandas...) : le module est enregistré tout de
+suite mais n'est réellement exécuté qu'au premier accès à l'un de ses attributs.
+
+`import app.main` reste ainsi rapide (démarrage à froid du conteneur, processus de test).
+"""
+import importlib.util
+import sys
+
+
+def lazy_import(name: str):
+    """Module `name`, chargé au premier accès à un attribut (déjà importé : renvoyé tel quel)."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,273 @@
+"""
+Journalisation asynchrone et structurée de l'API.
+
+Les appels `logger.info(...)` des routes ne font aucune entrée/sortie : le
+QueueHandler installé sur le logger racine dépose l'enregistrement dans une file
+bornée, et un thread d'écoute (QueueListener) le met en forme (JSON, une ligne par
+enregistrement) et l'écrit sur la sortie d'erreur. File pleine : l'enregistrement
+est abandonné et compté, la requête n'attend jamais l'écriture du journal.
+
+Chaque enregistrement émis pendant une requête porte son identifiant (`request_id`,
+repris de l'en-tête X-Request-ID ou généré, et renvoyé dans la réponse) et les
+durées des étapes déjà mesurées (`stages`, voir `stage()`). Le journal d'accès
+(logger `app.access`) donne en fin de requête la méthode, le chemin, le statut, la
+durée et les étapes.
+
+Les journaux d'information à fort volume (accès, prédictions) sont échantillonnés :
+`logger.info(..., extra={"sample": True})` n'est gardé qu'avec la probabilité
+LOG_SAMPLE_RATE. Les avertissements et les erreurs sont toujours gardés.
+"""
+import atexit
+import contextvars
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import orjson
+from app import metrics
+
+# Niveau du logger racine
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Format de sortie : json (une ligne par enregistrement) ou text (lisible, développement)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+# Enregistrements en attente d'écriture, au-delà : abandonnés (et comptés)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Proportion gardée des journaux d'information marqués `sample`
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Attributs standard d'un LogRecord : le reste vient de `extra` et part dans le JSON
+RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id", "stages", "sample", "taskName",
+}
+
+request_id = contextvars.ContextVar("request_id", default=None)
+request_stages = contextvars.ContextVar("request_stages", default=None)
+
+access_logger = logging.getLogger("app.access")
+
+
+@contextmanager
+def stage(name: str):
+    """Mesure une étape de la requête en cours (durée en ms dans `stages`)."""
+    stages = request_stages.get()
+    if stages is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = round(stages.get(name, 0.0) + (time.perf_counter() - start) * 1000, 3)
+
+
+class SamplingFilter(logging.Filter):
+    """Ne garde qu'une proportion `rate` des enregistrements d'information marqués `sample`."""
+
+    def __init__(self, rate: float = LOG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+        self.sampled_out = 0
+
+    def filter(self, record) -> bool:
+        if record.levelno > logging.INFO or not getattr(record, "sample", False):
+            return True
+        if self.rate >= 1.0 or random.random() < self.rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """
+    Dépose l'enregistrement dans la file sans le mettre en forme : seuls le message
+    (%-formatage des arguments), la trace d'exception éventuelle et le contexte de la
+    requête sont figés dans le thread appelant. File pleine : abandon compté.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.queued = 0
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+            record.exc_info = None
+        record.request_id = request_id.get()
+        stages = request_stages.get()
+        record.stages = dict(stages) if stages else None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            self.queued += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objet JSON par ligne : horodatage, niveau, logger, message, requête et champs `extra`."""
+
+    def format(self, record) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "stages", None):
+            entry["stages"] = record.stages
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class StderrHandler(logging.StreamHandler):
+    """Écrit sur le sys.stderr courant (qui peut être remplacé après la configuration)."""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+
+class LogPipeline:
+    """File, filtre d'échantillonnage et thread d'écoute installés sur le logger racine."""
+
+    def __init__(self, handler: logging.Handler, queue_size: int = LOG_QUEUE_SIZE, sample_rate: float = LOG_SAMPLE_RATE):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.sampling = SamplingFilter(sample_rate)
+        self.handler = AsyncQueueHandler(self.queue)
+        self.handler.addFilter(self.sampling)
+        self.listener = logging.handlers.QueueListener(self.queue, handler, respect_handler_level=True)
+
+    def start(self):
+        self.listener.start()
+
+    def stop(self):
+        """Vide la file (écrit les enregistrements en attente) et arrête le thread."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def snapshot(self) -> dict:
+        return {
+            "queued": self.handler.queued,
+            "dropped": self.handler.dropped,
+            "sampled_out": self.sampling.sampled_out,
+            "pending": self.queue.qsize(),
+            "sample_rate": self.sampling.rate,
+        }
+
+
+_pipeline = None
+_lock = threading.Lock()
+
+
+def configure_logging(stream=None, format: str = LOG_FORMAT, level: str = LOG_LEVEL) -> LogPipeline:
+    """
+    Remplace les handlers du logger racine par la file asynchrone (une seule fois par
+    processus ; les appels suivants renvoient la même installation, relancée si
+    shutdown_logging l'avait arrêtée).
+    """
+    global _pipeline
+    with _lock:
+        if _pipeline is not None:
+            if _pipeline.listener._thread is None:
+                _pipeline.start()
+            return _pipeline
+
+        output = logging.StreamHandler(stream) if stream is not None else StderrHandler()
+        output.setFormatter(JsonFormatter() if format == "json" else logging.Formatter(TEXT_FORMAT))
+        pipeline = LogPipeline(output)
+
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(pipeline.handler)
+        root.setLevel(level)
+
+        pipeline.start()
+        atexit.register(pipeline.stop)
+        metrics.register("logging", pipeline.snapshot)
+        _pipeline = pipeline
+        return pipeline
+
+
+def shutdown_logging():
+    """Écrit les enregistrements en attente (arrêt de l'API)."""
+    if _pipeline is not None:
+        _pipeline.stop()
+
+
+class RequestLoggingMiddleware:
+    """
+    Middleware ASGI : identifiant et étapes de la requête dans le contexte de
+    journalisation, en-tête X-Request-ID dans la réponse, journal d'accès en fin de
+    requête (échantillonné, sauf erreurs serveur).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rid = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER.lower().encode():
+                rid = value.decode("latin-1")[:64]
+                break
+        rid = rid or uuid.uuid4().hex
+        id_token = request_id.set(rid)
+        stages_token = request_stages.set({})
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (REQUEST_ID_HEADER.lower().encode(), rid.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            duration_ms = round((time.perf_counter() - start) * 1000, 3)
+            access_logger.log(
+                logging.WARNING if status >= 500 else logging.INFO,
+                "%s %s %d %.1f ms", scope["method"], scope["path"], status, duration_ms,
+                extra={"method": scope["method"], "path": scope["path"], "status": status,
+                       "duration_ms": duration_ms, "sample": True},
+            )
+            request_stages.reset(stages_token)
+            request_id.reset(id_token)
@@ -1,27 +1,40 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import logging
 from app.models import model_manager
 from app.routes import router
-from app.database import init_db
+from app.api import router as api_router
+from app.scoring import router as scoring_router
+from app.explain import router as explain_router
+from app.whatif import router as whatif_router
+from app.metrics import router as metrics_router
+from app.drift import router as drift_router
+from app.export import router as export_router
+from app.feature_store import router as feature_store_router
+from app.readiness import readiness, start_background_startup
+from app.database import replicas
+from app.replicas import read_your_writes_middleware
+from app.admission import ADMISSION_ENABLED, AdmissionMiddleware
+from app.logs import RequestLoggingMiddleware, configure_logging, shutdown_logging
+
+logger = logging.getLogger(__name__)
 
 # Événement de démarrage
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Code au démarrage
-    print("🚀 Démarrage de l'API...")
-    
-    # Exécuter les migrations avant de charger le modèle
-    try:
-        from app.migrate import migrate_database
-        migrate_database()
-    except Exception as e:
-        print(f"⚠️  Erreur migration: {e}")
+    # Code au démarrage : journalisation asynchrone (file + thread d'écoute) au format
+    # JSON, voir app/logs.py ; au démarrage et non à l'import de app.main (tests, outils)
+    configure_logging()
+    logger.info("Démarrage de l'API")
     
-    model_manager.load()  # ← Charger le modèle une seule fois
-    init_db()
+    # Migrations, chargement et préchauffage du modèle en arrière-plan : /health répond
+    # tout de suite, /ready attend que le modèle soit prêt
+    start_background_startup()
     yield
     # Code à l'arrêt
-    print("🛑 Arrêt de l'API...")
+    logger.info("Arrêt de l'API")
+    shutdown_logging()
 
 # Créer l'app
 app = FastAPI(
@@ -33,6 +46,27 @@ app = FastAPI(
 
 # Inclure les routes
 app.include_router(router)
+app.include_router(api_router)
+app.include_router(scoring_router)
+app.include_router(explain_router)
+app.include_router(whatif_router)
+app.include_router(metrics_router)
+app.include_router(drift_router)
+app.include_router(export_router)
+app.include_router(feature_store_router)
+
+# Lecture de ses propres écritures, seulement quand des réplicas sont configurés
+if replicas:
+    app.middleware("http")(read_your_writes_middleware)
+
+# Limite de concurrence et file bornée devant les routes de prédiction (juste à l'intérieur
+# du journal d'accès : une requête refusée ne passe par aucun autre middleware ni route)
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
+# Identifiant de requête, étapes mesurées et journal d'accès (le plus à l'extérieur :
+# les requêtes refusées par l'admission sont aussi journalisées)
+app.add_middleware(RequestLoggingMiddleware)
 
 @app.get("/")
 async def root():
@@ -50,4 +84,13 @@ def health_check():
         "version": "1.0.0" 
     }
 
+@app.get("/ready")
+def readiness_check():
+    """Prêt à recevoir du trafic : modèle chargé et préchauffé, base joignable (503 sinon)."""
+    ready, details = readiness()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", **details}
+    )
+
 # Pour lancer : uvicorn app.main:app --reload
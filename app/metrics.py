@@ -0,0 +1,66 @@
+"""Métriques applicatives, exposées en JSON sur GET /metrics."""
+import threading
+from fastapi import APIRouter
+
+router = APIRouter(tags=["monitoring"])
+
+# Fournisseurs de métriques : nom de section -> fonction renvoyant un dict
+_providers = {}
+
+
+def register(name: str, provider):
+    """Enregistre une section de métriques, calculée à chaque appel de /metrics."""
+    _providers[name] = provider
+
+
+def snapshot() -> dict:
+    """Valeurs courantes de toutes les sections enregistrées."""
+    return {name: provider() for name, provider in _providers.items()}
+
+
+class Histogram:
+    """Distribution d'une durée (en secondes) : compteur, somme, max et seaux cumulés."""
+
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+            self._counts = [0] * len(self.buckets)
+
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+                    break
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets, self._counts):
+                cumulative += count
+                buckets[f"le_{bound}"] = cumulative
+            return {
+                "count": self.count,
+                "sum": self.total,
+                "mean": self.total / self.count if self.count else 0.0,
+                "max": self.max,
+                "buckets": buckets,
+            }
+
+
+@router.get("/metrics")
+def get_metrics():
+    """Métriques courantes (pool de connexions, etc.)."""
+    return snapshot()
@@ -1,18 +1,357 @@
-"""Script de migration pour mettre à jour le schéma de la base de données."""
-from sqlalchemy import text
-from app.database import engine
-
-def migrate_database():
-    """Ajoute les colonnes manquantes à la table employees."""
-    migrations = [
-        # Ajouter nombre_heures_travailless si elle n'existe pas
-        """
-        ALTER TABLE employees 
-        ADD COLUMN IF NOT EXISTS nombre_heures_travailless INTEGER;
+"""
+Migrations versionnées du schéma de la base de données.
+
+Les migrations sont appliquées une seule fois, dans l'ordre, et inscrites dans la
+table `schema_migrations` ; au démarrage, seule la version du schéma est lue.
+PostgreSQL et SQLite (mode embarqué) sont supportés.
+
+Usage :
+    python -m app.migrate
+"""
+import logging
+import os
+import time
+from datetime import date, datetime
+from sqlalchemy import inspect, text
+from app.database import Base, engine
+from app import models  # noqa: F401  (tables de Base.metadata, repli des autres dialectes)
+
+logger = logging.getLogger(__name__)
+
+# Nombre de partitions mensuelles de `predictions` créées à l'avance
+PARTITION_MONTHS_AHEAD = int(os.getenv("PREDICTIONS_PARTITION_MONTHS_AHEAD", "3"))
+
+# Partition par défaut : reçoit les lignes hors des mois déjà créés
+DEFAULT_PARTITION = "predictions_default"
+
+# Table `predictions` partitionnée par mois sur created_at. La clé primaire d'une
+# table partitionnée doit contenir la clé de partitionnement : (id, created_at).
+PARTITIONED_PREDICTIONS_DDL = """
+CREATE TABLE predictions (
+    id INTEGER NOT NULL DEFAULT nextval('predictions_id_seq'),
+    id_employee INTEGER REFERENCES employees (id_employee),
+    prediction INTEGER,
+    confidence FLOAT,
+    risk_level VARCHAR(20),
+    probability_reste FLOAT,
+    probability_quitte FLOAT,
+    model_version VARCHAR(50),
+    created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+) PARTITION BY RANGE (created_at)
+"""
+
+# Schéma de départ (migration 1), figé : ne pas le faire suivre les modèles, toute
+# évolution passe par une nouvelle migration. Types et index repris de ce que créait
+# Base.metadata.create_all avant le registre de migrations.
+BASELINE_EMPLOYEE_COLUMNS = """
+    age INTEGER,
+    genre VARCHAR(1),
+    statut_marital VARCHAR(50),
+    ayant_enfants BOOLEAN,
+    revenu_mensuel FLOAT,
+    departement VARCHAR(100),
+    poste VARCHAR(100),
+    niveau_hierarchique_poste INTEGER,
+    nombre_experiences_precedentes INTEGER,
+    annee_experience_totale FLOAT,
+    annees_dans_l_entreprise FLOAT,
+    annees_dans_le_poste_actuel FLOAT,
+    annees_depuis_la_derniere_promotion FLOAT,
+    annes_sous_responsable_actuel FLOAT,
+    satisfaction_employee_environnement INTEGER,
+    satisfaction_employee_nature_travail INTEGER,
+    satisfaction_employee_equipe INTEGER,
+    satisfaction_employee_equilibre_pro_perso INTEGER,
+    note_evaluation_precedente FLOAT,
+    note_evaluation_actuelle FLOAT,
+    heure_supplementaires VARCHAR(10),
+    nombre_heures_travailless INTEGER,
+    augementation_salaire_precedente FLOAT,
+    nombre_participation_pee INTEGER,
+    nb_formations_suivies INTEGER,
+    nombre_employee_sous_responsabilite INTEGER,
+    distance_domicile_travail FLOAT,
+    niveau_education INTEGER,
+    domaine_etude VARCHAR(100),
+    frequence_deplacement VARCHAR(50),
+    a_quitte_l_entreprise VARCHAR(10),
+"""
+
+BASELINE_PREDICTION_COLUMNS = """
+    id_employee INTEGER REFERENCES employees (id_employee),
+    prediction INTEGER,
+    confidence FLOAT,
+    risk_level VARCHAR(20),
+    probability_reste FLOAT,
+    probability_quitte FLOAT,
+    model_version VARCHAR(50),
+"""
+
+BASELINE_DDL = {
+    "postgresql": [
+        f"CREATE TABLE IF NOT EXISTS employees (id_employee SERIAL PRIMARY KEY, {BASELINE_EMPLOYEE_COLUMNS} created_at TIMESTAMP WITHOUT TIME ZONE)",
+        f"CREATE TABLE IF NOT EXISTS predictions (id SERIAL PRIMARY KEY, {BASELINE_PREDICTION_COLUMNS} created_at TIMESTAMP WITHOUT TIME ZONE)",
+    ],
+    "sqlite": [
+        f"CREATE TABLE IF NOT EXISTS employees (id_employee INTEGER PRIMARY KEY, {BASELINE_EMPLOYEE_COLUMNS} created_at DATETIME)",
+        f"CREATE TABLE IF NOT EXISTS predictions (id INTEGER PRIMARY KEY, {BASELINE_PREDICTION_COLUMNS} created_at DATETIME)",
+    ],
+}
+
+BASELINE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_employees_id_employee ON employees (id_employee)",
+    "CREATE INDEX IF NOT EXISTS ix_predictions_id ON predictions (id)",
+    "CREATE INDEX IF NOT EXISTS ix_predictions_id_employee ON predictions (id_employee)",
+    "CREATE INDEX IF NOT EXISTS ix_predictions_created_at ON predictions (created_at)",
+]
+
+# Index de `predictions` recréés sur la table partitionnée (migration 9) : ceux de la
+# migration 1 et de la migration 5
+PARTITIONED_PREDICTION_INDEXES = [
+    "CREATE INDEX ix_predictions_id ON predictions (id)",
+    "CREATE INDEX ix_predictions_id_employee ON predictions (id_employee)",
+    "CREATE INDEX ix_predictions_created_at ON predictions (created_at)",
+    "CREATE INDEX ix_predictions_created_at_id ON predictions (created_at, id)",
+    "CREATE INDEX ix_predictions_employee_created_at_id ON predictions (id_employee, created_at, id)",
+    "CREATE INDEX ix_predictions_model_version_created_at_id ON predictions (model_version, created_at, id)",
+    "CREATE INDEX ix_predictions_risk_level_created_at_id ON predictions (risk_level, created_at, id)",
+]
+
+PREDICTION_COLUMNS = (
+    "id, id_employee, prediction, confidence, risk_level, "
+    "probability_reste, probability_quitte, model_version, created_at"
+)
+
+
+def add_months(month: date, months: int) -> date:
+    """Premier jour du mois situé `months` mois après `month`."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_start(value) -> date:
+    """Premier jour du mois de `value` (date ou datetime)."""
+    return date(value.year, value.month, 1)
+
+
+def partition_name(month: date) -> str:
+    """Nom de la partition mensuelle : predictions_AAAA_MM."""
+    return f"predictions_{month.year}_{month.month:02d}"
+
+
+def is_partitioned(conn) -> bool:
+    """La table `predictions` est-elle déjà partitionnée ? (jamais sur SQLite)"""
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+        "WHERE partrelid = to_regclass('predictions'))"
+    )).scalar()
+
+
+def create_month_partition(conn, month: date) -> bool:
+    """
+    Crée la partition d'un mois si elle n'existe pas.
+
+    Les lignes de ce mois tombées entre-temps dans la partition par défaut y sont
+    déplacées avant l'attachement (sinon ATTACH PARTITION échoue).
+
+    Returns:
+        True si la partition a été créée
+    """
+    name = partition_name(month)
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+        return False
+
+    bounds = {"start": month, "end": add_months(month, 1)}
+    conn.execute(text(f"CREATE TABLE {name} (LIKE predictions INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(
+        f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} "
+        "WHERE created_at >= :start AND created_at < :end"
+    ), bounds)
+    conn.execute(text(
+        f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end"
+    ), bounds)
+    conn.execute(text(
+        f"ALTER TABLE predictions ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['start']}') TO ('{bounds['end']}')"
+    ))
+    return True
+
+
+def ensure_prediction_partitions(conn, first_month: date | None = None, months_ahead: int = PARTITION_MONTHS_AHEAD) -> list[str]:
+    """
+    Crée les partitions mensuelles manquantes, de `first_month` (par défaut le mois
+    courant) jusqu'à `months_ahead` mois dans le futur. Sans effet si `predictions`
+    n'est pas partitionnée.
+
+    Returns:
+        Les partitions créées
+    """
+    if not is_partitioned(conn):
+        return []
+
+    # Un seul processus à la fois crée des partitions (verrou libéré au commit)
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('predictions_partitions'))"))
+
+    current = month_start(datetime.utcnow())
+    month = first_month or current
+    created = []
+    while month <= add_months(current, months_ahead):
+        if create_month_partition(conn, month):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def partition_predictions(conn):
+    """
+    Convertit `predictions` en table partitionnée par mois sur created_at
+    (ou la crée directement si elle n'existe pas encore).
+
+    Les lignes existantes sont recopiées dans les partitions de leur mois ; les index
+    des migrations 1 et 5 sont recréés sur la table parente (et donc sur chaque partition).
+    """
+    conn.execute(text("LOCK TABLE employees IN SHARE MODE"))
+    conn.execute(text("CREATE SEQUENCE IF NOT EXISTS predictions_id_seq AS INTEGER"))
+
+    legacy = conn.execute(text("SELECT to_regclass('predictions')")).scalar() is not None
+    if legacy:
+        conn.execute(text("LOCK TABLE predictions IN ACCESS EXCLUSIVE MODE"))
+        conn.execute(text("ALTER TABLE predictions RENAME TO predictions_legacy"))
+
+    conn.execute(text(PARTITIONED_PREDICTIONS_DDL))
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF predictions DEFAULT"))
+
+    first_month = None
+    if legacy:
+        oldest = conn.execute(text("SELECT min(created_at) FROM predictions_legacy")).scalar()
+        first_month = month_start(oldest) if oldest else None
+    ensure_prediction_partitions(conn, first_month)
+
+    if legacy:
+        conn.execute(text(
+            f"INSERT INTO predictions ({PREDICTION_COLUMNS}) "
+            "SELECT id, id_employee, prediction, confidence, risk_level, probability_reste, "
+            "probability_quitte, model_version, COALESCE(created_at, now() AT TIME ZONE 'utc') "
+            "FROM predictions_legacy"
+        ))
+        conn.execute(text("ALTER SEQUENCE predictions_id_seq OWNED BY predictions.id"))
+        conn.execute(text("DROP TABLE predictions_legacy"))
+    else:
+        conn.execute(text("ALTER SEQUENCE predictions_id_seq OWNED BY predictions.id"))
+
+    # Index créés après la copie (plus rapide), avec les noms libérés par l'ancienne table
+    conn.execute(text("ALTER TABLE predictions ADD CONSTRAINT predictions_pkey PRIMARY KEY (id, created_at)"))
+    for statement in PARTITIONED_PREDICTION_INDEXES:
+        conn.execute(text(statement))
+
+
+class ConcurrentIndex:
+    """Index créé sans bloquer les écritures (CREATE INDEX CONCURRENTLY, hors transaction)."""
+
+    def __init__(self, name: str, table: str, columns: str):
+        self.name = name
+        self.table = table
+        self.columns = columns
+
+
+def index_is_valid(conn, name: str) -> bool | None:
+    """True/False selon que l'index est valide, None s'il n'existe pas."""
+    return conn.execute(text(
+        "SELECT i.indisvalid FROM pg_index i WHERE i.indexrelid = to_regclass(:name)"
+    ), {"name": name}).scalar()
+
+
+def create_index_concurrently(conn, index: ConcurrentIndex):
+    """
+    Crée un index sans verrou bloquant les écritures ; `conn` doit être en autocommit.
+
+    Un index laissé invalide par une tentative interrompue est supprimé puis recréé.
+    Sur une table partitionnée (où CONCURRENTLY n'est pas supporté), l'index est créé
+    sur la seule table parente, puis concurremment sur chaque partition et attaché.
+    """
+    valid = index_is_valid(conn, index.name)
+    if valid:
+        return
+    if valid is False:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+
+    partitions = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"
+    ), {"table": index.table}).scalars().all()
+    if not partitions:
+        conn.execute(text(f"CREATE INDEX CONCURRENTLY {index.name} ON {index.table} ({index.columns})"))
+        return
+
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index.name} ON ONLY {index.table} ({index.columns})"))
+    for partition in partitions:
+        child = f"{partition}_{index.name}"[:63]
+        if index_is_valid(conn, child) is False:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {child}"))
+        conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} ({index.columns})"))
+        attached = conn.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(:child))"
+        ), {"child": child}).scalar()
+        if not attached:
+            conn.execute(text(f"ALTER INDEX {index.name} ATTACH PARTITION {child}"))
+
+
+def create_base_tables(conn):
+    """Tables de départ (BASELINE_DDL) absentes de la base ; les tables existantes sont laissées telles quelles."""
+    for statement in [*BASELINE_DDL[conn.dialect.name], *BASELINE_INDEXES]:
+        conn.execute(text(statement))
+
+
+def partition_predictions_if_needed(conn):
+    if not is_partitioned(conn):
+        partition_predictions(conn)
+
+
+def add_column(table: str, column: str, column_type: str):
+    """Étape SQLite : ajoute une colonne si elle manque (pas de ADD COLUMN IF NOT EXISTS)."""
+    def step(conn):
+        if column not in {col["name"] for col in inspect(conn).get_columns(table)}:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+    return step
+
+
+def backfill_updated_at(conn):
+    """Étape SQLite de la migration 11 : colonne updated_at, initialisée à created_at."""
+    add_column("employees", "updated_at", "TIMESTAMP")(conn)
+    conn.execute(text(
+        "UPDATE employees SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL"
+    ))
+
+
+def dialect_step(step, dialect: str):
+    """Étape propre au dialecte (dict dialecte -> étape), ou None s'il n'y a rien à faire."""
+    if isinstance(step, dict):
+        return step.get(dialect)
+    return step
+
+
+# Migrations ordonnées : (version, description, étape). Une étape est une requête SQL
+# ou une fonction recevant la connexion (exécutées dans une transaction avec l'écriture
+# dans le registre), une liste de ConcurrentIndex (hors transaction), ou un dict
+# dialecte -> étape quand PostgreSQL et SQLite diffèrent (dialecte absent : rien à faire).
+# Toutes sont idempotentes : une base déjà à jour sans registre les rejoue sans effet.
+# Ne jamais modifier une migration publiée : en ajouter une nouvelle à la fin.
+MIGRATIONS = [
+    (1, "Tables initiales", create_base_tables),
+
+    (2, "employees.nombre_heures_travailless", {
+        "postgresql": """
+            ALTER TABLE employees 
+            ADD COLUMN IF NOT EXISTS nombre_heures_travailless INTEGER;
         """,
-        
-        # Modifier heure_supplementaires en VARCHAR si c'est un INTEGER
-        """
+        "sqlite": add_column("employees", "nombre_heures_travailless", "INTEGER"),
+    }),
+
+    # Modifier heure_supplementaires en VARCHAR si c'est un INTEGER (bases
+    # PostgreSQL antérieures ; les bases SQLite sont créées en VARCHAR)
+    (3, "employees.heure_supplementaires en VARCHAR", {"postgresql": """
         DO $$ 
         BEGIN
             IF EXISTS (
@@ -30,35 +369,287 @@ def migrate_database():
                 END;
             END IF;
         END $$;
+    """}),
+
+    (4, "employees.a_quitte_l_entreprise", {
+        "postgresql": """
+            ALTER TABLE employees 
+            ADD COLUMN IF NOT EXISTS a_quitte_l_entreprise VARCHAR(10);
         """,
-        
-        # Ajouter a_quitte_l_entreprise en VARCHAR si elle n'existe pas
-        """
-        DO $$ 
-        BEGIN
-            IF NOT EXISTS (
-                SELECT 1 FROM information_schema.columns 
-                WHERE table_name = 'employees' 
-                AND column_name = 'a_quitte_l_entreprise'
-            ) THEN
-                ALTER TABLE employees 
-                ADD COLUMN a_quitte_l_entreprise VARCHAR(10);
-            END IF;
-        END $$;
-        """
-    ]
-    
-    with engine.connect() as conn:
-        for migration in migrations:
-            try:
-                conn.execute(text(migration))
-                conn.commit()
-                print(f"✅ Migration exécutée avec succès")
-            except Exception as e:
-                print(f"⚠️  Erreur migration: {e}")
-                conn.rollback()
-    
-    print("✅ Migration terminée")
+        "sqlite": add_column("employees", "a_quitte_l_entreprise", "VARCHAR(10)"),
+    }),
+
+    # Index composites pour la pagination par curseur de l'historique
+    (5, "Index de pagination de predictions", [
+        ConcurrentIndex("ix_predictions_created_at_id", "predictions", "created_at, id"),
+        ConcurrentIndex("ix_predictions_employee_created_at_id", "predictions", "id_employee, created_at, id"),
+        ConcurrentIndex("ix_predictions_model_version_created_at_id", "predictions", "model_version, created_at, id"),
+        ConcurrentIndex("ix_predictions_risk_level_created_at_id", "predictions", "risk_level, created_at, id"),
+    ]),
+
+    # Table current_risk : dernière prédiction de chaque employé
+    (6, "Table current_risk", """
+        CREATE TABLE IF NOT EXISTS current_risk (
+            id_employee INTEGER PRIMARY KEY,
+            prediction_id INTEGER,
+            departement VARCHAR(100),
+            prediction INTEGER,
+            confidence FLOAT,
+            risk_level VARCHAR(20),
+            probability_quitte FLOAT,
+            model_version VARCHAR(50),
+            created_at TIMESTAMP
+        );
+    """),
+
+    (7, "Index de current_risk", [
+        ConcurrentIndex("ix_current_risk_probability_quitte", "current_risk", "probability_quitte"),
+        ConcurrentIndex("ix_current_risk_departement_probability_quitte", "current_risk", "departement, probability_quitte"),
+    ]),
+
+    # Remplissage initial depuis l'historique (seulement si la table est vide)
+    (8, "Remplissage de current_risk", {"postgresql": """
+        INSERT INTO current_risk (
+            id_employee, prediction_id, departement, prediction, confidence,
+            risk_level, probability_quitte, model_version, created_at
+        )
+        SELECT DISTINCT ON (p.id_employee)
+            p.id_employee, p.id, e.departement, p.prediction, p.confidence,
+            p.risk_level, p.probability_quitte, p.model_version, p.created_at
+        FROM predictions p
+        JOIN employees e ON e.id_employee = p.id_employee
+        WHERE NOT EXISTS (SELECT 1 FROM current_risk)
+        ORDER BY p.id_employee, p.created_at DESC, p.id DESC;
+    """, "sqlite": """
+        INSERT INTO current_risk (
+            id_employee, prediction_id, departement, prediction, confidence,
+            risk_level, probability_quitte, model_version, created_at
+        )
+        SELECT id_employee, id, departement, prediction, confidence,
+               risk_level, probability_quitte, model_version, created_at
+        FROM (
+            SELECT p.*, e.departement, row_number() OVER (
+                PARTITION BY p.id_employee ORDER BY p.created_at DESC, p.id DESC
+            ) AS rank
+            FROM predictions p
+            JOIN employees e ON e.id_employee = p.id_employee
+        )
+        WHERE rank = 1 AND NOT EXISTS (SELECT 1 FROM current_risk);
+    """}),
+
+    # Partitionnement mensuel de predictions
+    (9, "Partitionnement de predictions", {"postgresql": partition_predictions_if_needed}),
+
+    # Empreinte du contenu des employés (upsert sans écriture si rien n'a changé)
+    (10, "employees.content_hash", {
+        "postgresql": """
+            ALTER TABLE employees 
+            ADD COLUMN IF NOT EXISTS content_hash VARCHAR(32);
+        """,
+        "sqlite": add_column("employees", "content_hash", "VARCHAR(32)"),
+    }),
+
+    # Suivi des modifications des employés (rescoring incrémental)
+    (11, "employees.updated_at", {
+        "postgresql": """
+            ALTER TABLE employees
+            ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+            UPDATE employees SET updated_at = COALESCE(created_at, now() AT TIME ZONE 'utc')
+            WHERE updated_at IS NULL;
+        """,
+        "sqlite": backfill_updated_at,
+    }),
+
+    (12, "Index de suivi des modifications", [
+        ConcurrentIndex("ix_employees_updated_at", "employees", "updated_at"),
+        ConcurrentIndex("ix_current_risk_model_version", "current_risk", "model_version"),
+    ]),
+
+    (13, "Table job_watermarks", """
+        CREATE TABLE IF NOT EXISTS job_watermarks (
+            name VARCHAR(100) PRIMARY KEY,
+            watermark TIMESTAMP NOT NULL
+        );
+    """),
+
+    # Agrégats journaliers écrits par app/retention.py avant suppression des partitions
+    (14, "Table prediction_daily_rollups", """
+        CREATE TABLE IF NOT EXISTS prediction_daily_rollups (
+            day DATE NOT NULL,
+            departement VARCHAR(100) NOT NULL,
+            model_version VARCHAR(50) NOT NULL,
+            predictions INTEGER NOT NULL,
+            departures INTEGER NOT NULL,
+            high_risk INTEGER NOT NULL,
+            sum_probability_quitte FLOAT NOT NULL,
+            sum_confidence FLOAT NOT NULL,
+            PRIMARY KEY (day, departement, model_version)
+        );
+    """),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+SCHEMA_MIGRATIONS_DDL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description VARCHAR(200) NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+)
+"""
+
+SQLITE_SCHEMA_MIGRATIONS_DDL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description VARCHAR(200) NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+RECORD_MIGRATION_SQL = "INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"
+
+# Clé du verrou consultatif qui garantit qu'un seul processus applique les migrations
+MIGRATION_LOCK_KEY = "schema_migrations"
+
+# Intervalle entre deux tentatives de prise du verrou (secondes)
+LOCK_POLL_INTERVAL = 0.5
+
+
+def table_exists(conn, name: str) -> bool:
+    if conn.dialect.name == "sqlite":
+        query = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+    else:
+        query = "SELECT to_regclass(:name)"
+    return conn.execute(text(query), {"name": name}).scalar() is not None
+
+
+def schema_version(conn) -> int:
+    """Version du schéma (0 si le registre n'existe pas encore)."""
+    if not table_exists(conn, "schema_migrations"):
+        return 0
+    return conn.execute(text("SELECT COALESCE(max(version), 0) FROM schema_migrations")).scalar()
+
+
+def partitions_missing(conn) -> bool:
+    """La partition du dernier mois créé à l'avance manque-t-elle ?"""
+    horizon = partition_name(add_months(month_start(datetime.utcnow()), PARTITION_MONTHS_AHEAD))
+    return conn.execute(text("SELECT to_regclass(:name)"), {"name": horizon}).scalar() is None
+
+
+def apply_migration(version: int, description: str, step, bind=engine):
+    """Applique une migration (PostgreSQL) et l'inscrit au registre."""
+    step = dialect_step(step, "postgresql")
+    if isinstance(step, list):
+        # Hors transaction (CONCURRENTLY), puis inscription au registre
+        with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for index in step:
+                create_index_concurrently(conn, index)
+        step = None
+
+    with bind.begin() as conn:
+        if isinstance(step, str):
+            conn.execute(text(step))
+        elif step is not None:
+            step(conn)
+        conn.execute(text(RECORD_MIGRATION_SQL), {"version": version, "description": description})
+    logger.info("✅ Migration %d appliquée : %s", version, description)
+
+
+def acquire_migration_lock(conn) -> bool:
+    """
+    Prend le verrou consultatif de session, sans rester en attente dans une transaction
+    (un CREATE INDEX CONCURRENTLY attendrait sa fin) : nouvelle tentative tant qu'un
+    autre processus migre. Renvoie False si ce dernier a entre-temps mis le schéma à jour.
+    """
+    while True:
+        if conn.execute(text("SELECT pg_try_advisory_lock(hashtext(:key))"), {"key": MIGRATION_LOCK_KEY}).scalar():
+            return True
+        if schema_version(conn) >= LATEST_VERSION:
+            return False
+        time.sleep(LOCK_POLL_INTERVAL)
+
+
+def migrate_sqlite(bind) -> int:
+    """
+    SQLite : les migrations en attente sont appliquées dans une seule transaction,
+    ouverte par BEGIN IMMEDIATE (moteur de create_db_engine) dès la lecture de la
+    version ; le DDL est transactionnel. Un autre processus qui migre en même temps
+    attend le verrou d'écriture (busy_timeout), puis trouve le schéma à jour.
+    """
+    with bind.connect() as conn:
+        version = schema_version(conn)
+        if version >= LATEST_VERSION:
+            return version
+
+        conn.execute(text(SQLITE_SCHEMA_MIGRATIONS_DDL))
+        version = schema_version(conn)
+        for migration_version, description, step in MIGRATIONS:
+            if migration_version <= version:
+                continue
+            step = dialect_step(step, "sqlite")
+            if isinstance(step, list):
+                for index in step:
+                    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index.name} ON {index.table} ({index.columns})"))
+            elif isinstance(step, str):
+                conn.execute(text(step))
+            elif step is not None:
+                step(conn)
+            conn.execute(text(RECORD_MIGRATION_SQL), {"version": migration_version, "description": description})
+            logger.info("✅ Migration %d appliquée : %s", migration_version, description)
+        conn.commit()
+
+    logger.info("✅ Schéma à jour (version %d)", LATEST_VERSION)
+    return LATEST_VERSION
+
+
+def migrate_database(bind=engine) -> int:
+    """
+    Met le schéma à jour : applique une seule fois, dans l'ordre, les migrations
+    postérieures à la version inscrite dans `schema_migrations`.
+
+    Au démarrage d'une base à jour, seule la version est lue. Avec plusieurs workers,
+    un seul applique les migrations (verrou consultatif), les autres attendent qu'il ait
+    fini. Une migration en échec lève une exception (rien n'est inscrit au registre).
+
+    Returns:
+        La version du schéma
+    """
+    if bind.dialect.name == "sqlite":
+        return migrate_sqlite(bind)
+    if bind.dialect.name != "postgresql":
+        Base.metadata.create_all(bind)
+        return LATEST_VERSION
+
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        version = schema_version(conn)
+        if version >= LATEST_VERSION:
+            if partitions_missing(conn):
+                with bind.begin() as tx:
+                    created = ensure_prediction_partitions(tx)
+                if created:
+                    logger.info("✅ Partitions créées : %s", ", ".join(created))
+            return version
+
+        if not acquire_migration_lock(conn):
+            return schema_version(conn)
+        try:
+            conn.execute(text(SCHEMA_MIGRATIONS_DDL))
+            version = schema_version(conn)
+            for migration_version, description, step in MIGRATIONS:
+                if migration_version > version:
+                    apply_migration(migration_version, description, step, bind)
+
+            with bind.begin() as tx:
+                created = ensure_prediction_partitions(tx)
+            if created:
+                logger.info("✅ Partitions créées : %s", ", ".join(created))
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {"key": MIGRATION_LOCK_KEY})
+
+    logger.info("✅ Schéma à jour (version %d)", LATEST_VERSION)
+    return LATEST_VERSION
+
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     migrate_database()
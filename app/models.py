@@ -1,12 +1,74 @@
+import logging
 import pickle
-import joblib
 import os
 from pathlib import Path
-from huggingface_hub import hf_hub_download
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey
+import numpy as np
+from app.lazy import lazy_import
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, ForeignKey, Index
 from datetime import datetime
 from app.database import Base
 
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Paliers d'inférence : nom=nombre de premiers arbres évalués (0 : tous). Un palier
+# tronqué répond plus vite sur les gros lots, au prix d'un score moins précis
+# (rapport : python -m app.calibration)
+MODEL_TIERS = os.getenv("MODEL_TIERS", "fast=20,full=0")
+DEFAULT_TIER = "full"
+
+def parse_tiers(spec: str) -> dict[str, int]:
+    """ "fast=20,full=0" -> {"fast": 20, "full": 0} """
+    tiers = {}
+    for item in spec.split(","):
+        if item.strip():
+            name, _, rounds = item.partition("=")
+            tiers[name.strip()] = int(rounds or 0)
+    tiers.setdefault(DEFAULT_TIER, 0)
+    return tiers
+
+def contribution_mapping(preprocessor) -> tuple[np.ndarray, list[str]]:
+    """
+    Matrice (variables encodées x variables d'entrée) qui regroupe les colonnes
+    produites par le ColumnTransformer par colonne d'origine : toutes les colonnes
+    one-hot d'une variable catégorielle se rapportent à cette variable.
+    """
+    n_outputs = len(preprocessor.get_feature_names_out())
+    columns, owners = [], np.full(n_outputs, -1)
+
+    for name, transformer, selected in preprocessor.transformers_:
+        if transformer == "drop" or name not in preprocessor.output_indices_:
+            continue
+        selected = [
+            preprocessor.feature_names_in_[col] if isinstance(col, (int, np.integer)) else col
+            for col in selected
+        ]
+        if hasattr(transformer, "categories_"):
+            # Une colonne par catégorie (moins la catégorie éventuellement supprimée)
+            drop_idx = getattr(transformer, "drop_idx_", None)
+            sizes = [
+                len(categories) - (drop_idx is not None and drop_idx[i] is not None)
+                for i, categories in enumerate(transformer.categories_)
+            ]
+        else:
+            sizes = [1] * len(selected)
+
+        position = preprocessor.output_indices_[name].start
+        for col, size in zip(selected, sizes):
+            if col not in columns:
+                columns.append(col)
+            owners[position:position + size] = columns.index(col)
+            position += size
+
+    if (owners < 0).any():
+        raise RuntimeError("Impossible de relier les variables encodées aux variables d'entrée")
+
+    mapping = np.zeros((n_outputs, len(columns)))
+    mapping[np.arange(n_outputs), owners] = 1.0
+    return mapping, columns
+
+
 class ModelManager:
     """Gestionnaire du modèle ML."""
     
@@ -14,13 +76,23 @@ class ModelManager:
         self.model_path = Path(model_path)
         self.pipeline = None
         self.hf_repo = os.getenv("HF_MODEL_REPO")  # Format: username/repo-name
+        # Version inscrite dans chaque prédiction ; la changer fait rescorer tout le monde (app/rescore.py)
+        self.version = os.getenv("MODEL_VERSION", "1.0.0")
+        self.tiers = parse_tiers(MODEL_TIERS)
+        self._explainer = None
     
     def load(self):
         """Charge le modèle en mémoire (depuis HF Hub si configuré, sinon local)."""
+        import joblib
+        
+        self._explainer = None
         # Si HF_MODEL_REPO est configuré et non vide, télécharger depuis HF Hub
         if self.hf_repo and self.hf_repo.strip():
             try:
-                print(f"📥 Téléchargement du modèle depuis {self.hf_repo}...")
+                # Importé seulement si HF_MODEL_REPO est configuré
+                from huggingface_hub import hf_hub_download
+                
+                logger.info("Téléchargement du modèle depuis %s", self.hf_repo)
                 model_file = hf_hub_download(
                     repo_id=self.hf_repo,
                     filename="model",
@@ -37,11 +109,10 @@ class ModelManager:
                         )
                 
                 self.pipeline = joblib.load(model_file)
-                print(f"✅ Modèle chargé depuis HF Hub: {self.hf_repo}")
+                logger.info("Modèle chargé depuis HF Hub : %s", self.hf_repo)
                 return
             except Exception as e:
-                print(f"⚠️  Erreur téléchargement HF: {e}")
-                print(f"⚠️  Basculement vers chargement local...")
+                logger.warning("Erreur de téléchargement HF (%s), basculement vers le chargement local", e)
         
         # Charger depuis le fichier local
         if not self.model_path.exists():
@@ -66,21 +137,19 @@ class ModelManager:
         # Essayer de charger avec joblib (compatible avec scikit-learn)
         try:
             self.pipeline = joblib.load(self.model_path)
-            print(f"✅ Modèle chargé depuis {self.model_path}")
+            logger.info("Modèle chargé depuis %s", self.model_path)
         except (KeyError, ValueError, pickle.UnpicklingError) as e:
             # Fallback : essayer avec pickle si joblib échoue
-            print(f"⚠️  Erreur joblib: {e}")
-            print(f"⚠️  Tentative avec pickle...")
+            logger.warning("Erreur joblib (%s), tentative avec pickle", e)
             try:
                 with open(self.model_path, 'rb') as f:
                     self.pipeline = pickle.load(f)
-                print(f"✅ Modèle chargé depuis {self.model_path} (pickle)")
+                logger.info("Modèle chargé depuis %s (pickle)", self.model_path)
             except Exception as e2:
                 # Afficher les premiers octets pour le diagnostic
                 with open(self.model_path, 'rb') as f:
                     first_bytes = f.read(200)
-                    print(f"🔍 Premiers octets du fichier (hex): {first_bytes.hex()[:100]}")
-                    print(f"🔍 Premiers octets du fichier (texte): {first_bytes[:100]}")
+                    logger.error("Premiers octets du fichier : %s (hex), %r", first_bytes.hex()[:100], first_bytes[:100])
                 
                 raise RuntimeError(
                     f"Impossible de charger le modèle depuis {self.model_path}\n"
@@ -90,19 +159,85 @@ class ModelManager:
                     f"ou le fichier est corrompu/pointeur Git LFS."
                 ) from e2
     
-    def predict(self, features):
+    def tier_params(self, tier: str | None) -> dict:
+        """
+        Paramètres de prédiction d'un palier : `iteration_range` limité aux premiers
+        arbres, ou rien pour le modèle complet.
+        """
+        if tier is None:
+            return {}
+        if tier not in self.tiers:
+            raise ValueError(f"Palier d'inférence inconnu : {tier} (disponibles : {', '.join(self.tiers)})")
+        rounds = self.tiers[tier]
+        return {"iteration_range": (0, rounds)} if rounds else {}
+
+    def version_for(self, tier: str | None) -> str:
+        """Version inscrite dans les prédictions : suffixée du palier s'il est tronqué (ex. 1.0.0+fast)."""
+        return f"{self.version}+{tier}" if self.tier_params(tier) else self.version
+
+    def predict(self, features, tier: str | None = None):
         """Fait une prédiction."""
         if self.pipeline is None:
             raise RuntimeError("Modèle non chargé")
         
-        return self.pipeline.predict(features)
+        return self.pipeline.predict(features, **self.tier_params(tier))
     
-    def predict_proba(self, features):
+    def predict_proba(self, features, tier: str | None = None):
         """Retourne les probabilités pour chaque classe."""
         if self.pipeline is None:
             raise RuntimeError("Modèle non chargé")
         
-        return self.pipeline.predict_proba(features)
+        return self.pipeline.predict_proba(features, **self.tier_params(tier))
+    
+    def encoded_feature_names(self) -> list[str]:
+        """Noms des variables encodées (sortie du préprocesseur), dans l'ordre attendu par predict_encoded."""
+        if self.pipeline is None:
+            raise RuntimeError("Modèle non chargé")
+        
+        return list(self.pipeline[:-1].get_feature_names_out())
+    
+    def predict_encoded(self, matrix: np.ndarray, tier: str | None = None) -> np.ndarray:
+        """
+        Probabilités pour des variables déjà encodées (une ligne par employé, colonnes
+        dans l'ordre de encoded_feature_names) : le préprocesseur n'est pas appliqué.
+        """
+        if self.pipeline is None:
+            raise RuntimeError("Modèle non chargé")
+        
+        return self.pipeline[-1].predict_proba(matrix, **self.tier_params(tier))
+    
+    def explain(self, features, approximate: bool = False) -> tuple["pd.DataFrame", np.ndarray]:
+        """
+        Contributions de chaque variable d'entrée à la prédiction, calculées par
+        XGBoost (TreeSHAP natif, `pred_contribs`) pour tout le lot en un seul appel.
+        Avec `approximate`, XGBoost utilise l'approximation de Saabas (beaucoup plus rapide).
+
+        Returns:
+            (contributions, base_values) : une ligne par employé et une colonne par
+            variable d'entrée (en log-odds de « quitte »), et la valeur de base de
+            chaque ligne. Leur somme donne le logit de predict_proba.
+        """
+        if self.pipeline is None:
+            raise RuntimeError("Modèle non chargé")
+        
+        import xgboost
+        
+        if self._explainer is None:
+            steps = getattr(self.pipeline, "steps", None)
+            if not steps or not hasattr(steps[-1][1], "get_booster"):
+                raise RuntimeError("Explications disponibles uniquement pour un pipeline XGBoost")
+            preprocessor = self.pipeline[:-1]
+            booster = steps[-1][1].get_booster()
+            mapping, columns = contribution_mapping(preprocessor[-1])
+            self._explainer = (preprocessor, booster, mapping, columns)
+        
+        preprocessor, booster, mapping, columns = self._explainer
+        encoded = xgboost.DMatrix(preprocessor.transform(features), feature_names=booster.feature_names)
+        contributions = booster.predict(encoded, pred_contribs=True, approx_contribs=approximate)
+        return (
+            pd.DataFrame(contributions[:, :-1] @ mapping, columns=columns, index=features.index),
+            contributions[:, -1],
+        )
 
 # Instance globale
 model_manager = ModelManager()
@@ -144,7 +279,15 @@ class Employee(Base):
     domaine_etude = Column(String(100))
     frequence_deplacement = Column(String(50))
     a_quitte_l_entreprise = Column(String(10))
+    # Empreinte du contenu : une mise à jour identique n'écrit pas la ligne
+    content_hash = Column(String(32))
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Dernière modification du contenu (insertion comprise) : rescoring incrémental
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+# Colonnes techniques de Employee, absentes des données de l'employé
+EMPLOYEE_TECHNICAL_COLUMNS = ("content_hash", "created_at", "updated_at")
+EMPLOYEE_DATA_COLUMNS = [col.name for col in Employee.__table__.columns if col.name not in EMPLOYEE_TECHNICAL_COLUMNS]
 
 class Prediction(Base):
     __tablename__ = "predictions"
@@ -157,4 +300,61 @@ class Prediction(Base):
     probability_reste = Column(Float)
     probability_quitte = Column(Float)
     model_version = Column(String(50))
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    # Index composites pour la pagination par curseur sur (created_at, id)
+    __table_args__ = (
+        Index("ix_predictions_created_at_id", "created_at", "id"),
+        Index("ix_predictions_employee_created_at_id", "id_employee", "created_at", "id"),
+        Index("ix_predictions_model_version_created_at_id", "model_version", "created_at", "id"),
+        Index("ix_predictions_risk_level_created_at_id", "risk_level", "created_at", "id"),
+    )
+
+class CurrentRisk(Base):
+    """
+    Dernière prédiction de chaque employé, mise à jour à chaque écriture dans
+    `predictions` : les requêtes « top-K à risque » lisent cette table (une ligne
+    par employé, indexée) au lieu de chercher la dernière prédiction dans l'historique.
+    """
+    __tablename__ = "current_risk"
+
+    id_employee = Column(Integer, primary_key=True)
+    prediction_id = Column(Integer)
+    departement = Column(String(100))
+    prediction = Column(Integer)
+    confidence = Column(Float)
+    risk_level = Column(String(20))
+    probability_quitte = Column(Float, index=True)
+    model_version = Column(String(50), index=True)
+    created_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_current_risk_departement_probability_quitte", "departement", "probability_quitte"),
+    )
+
+
+class PredictionDailyRollup(Base):
+    """
+    Agrégats journaliers des prédictions par département et version de modèle,
+    calculés par app/retention.py avant la suppression des partitions anciennes.
+
+    Les sommes (plutôt que des moyennes) permettent de ré-agréger par mois ou par an.
+    """
+    __tablename__ = "prediction_daily_rollups"
+
+    day = Column(Date, primary_key=True)
+    departement = Column(String(100), primary_key=True)
+    model_version = Column(String(50), primary_key=True)
+    predictions = Column(Integer, nullable=False)
+    departures = Column(Integer, nullable=False)
+    high_risk = Column(Integer, nullable=False)
+    sum_probability_quitte = Column(Float, nullable=False)
+    sum_confidence = Column(Float, nullable=False)
+
+
+class JobWatermark(Base):
+    """Position atteinte par un traitement périodique (ex. dernier rescoring réussi)."""
+    __tablename__ = "job_watermarks"
+
+    name = Column(String(100), primary_key=True)
+    watermark = Column(DateTime, nullable=False)
@@ -0,0 +1,212 @@
+"""
+Démarrage en arrière-plan et disponibilité du service.
+
+Les migrations, le chargement du modèle (éventuellement téléchargé depuis HF Hub) et
+son préchauffage s'exécutent dans un thread lancé par le lifespan : l'API répond tout
+de suite à /health (vivacité), et /ready ne passe au vert qu'une fois le modèle
+préchauffé, les migrations appliquées et la base joignable.
+
+L'étape base de données (attente puis migrations) tourne en parallèle du chargement du
+modèle et est relancée avec un délai croissant ; après STARTUP_DB_ATTEMPTS échecs, le
+processus s'arrête (SIGTERM) pour que l'orchestrateur le redémarre, au lieu de rester
+vivant mais jamais prêt.
+
+Le préchauffage prédit des lignes synthétiques à plusieurs tailles de lot : les
+initialisations paresseuses de pandas, scikit-learn et XGBoost (allocation des
+threads, caches internes) sont payées avant la première vraie requête.
+"""
+import logging
+import os
+import signal
+import threading
+import time
+from sqlalchemy import text
+from app import metrics
+from app.database import engine, init_db, wait_for_db
+from app.drift import drift_monitor
+from app.feature_store import feature_store
+from app.models import model_manager
+from app.routes import prepare_features_batch
+from app.schemas import EmployeeInput
+
+logger = logging.getLogger(__name__)
+
+# Tailles de lot prédites au préchauffage
+WARMUP_BATCH_SIZES = [int(size) for size in os.getenv("MODEL_WARMUP_BATCH_SIZES", "1,32,1000").split(",") if size.strip()]
+
+# Nombre de passes par taille de lot (la première paie l'initialisation)
+WARMUP_ROUNDS = 2
+
+# Tentatives de l'étape base de données (attente + migrations) avant l'arrêt du processus
+STARTUP_DB_ATTEMPTS = int(os.getenv("STARTUP_DB_ATTEMPTS", "5"))
+
+# Délai avant la deuxième tentative, doublé ensuite (plafonné à STARTUP_DB_MAX_BACKOFF_SECONDS)
+STARTUP_DB_BACKOFF_SECONDS = float(os.getenv("STARTUP_DB_BACKOFF_SECONDS", "2"))
+STARTUP_DB_MAX_BACKOFF_SECONDS = float(os.getenv("STARTUP_DB_MAX_BACKOFF_SECONDS", "30"))
+
+
+class StartupState:
+    """Avancement du démarrage : durée de chaque étape, modèle préchauffé, erreur éventuelle."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.steps = {}
+            self.model_warm = False
+            self.error = None
+            self.started_at = time.monotonic()
+
+    def record(self, step: str, seconds: float):
+        with self._lock:
+            self.steps[step] = seconds
+
+    def fail(self, step: str, error: Exception):
+        with self._lock:
+            self.error = f"{step} : {error}"
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"model_warm": self.model_warm, "error": self.error, "steps_seconds": dict(self.steps)}
+
+
+startup_state = StartupState()
+metrics.register("startup", startup_state.snapshot)
+
+
+def synthetic_records(size: int) -> list[dict]:
+    """Lignes factices construites à partir de l'exemple de EmployeeInput."""
+    example = EmployeeInput.model_config["json_schema_extra"]["example"]
+    return [{**example, "id_employee": i} for i in range(size)]
+
+
+def warm_up_model(batch_sizes=WARMUP_BATCH_SIZES, rounds: int = WARMUP_ROUNDS) -> dict:
+    """
+    Prédit des lignes synthétiques à chaque taille de lot, par les mêmes chemins que
+    les endpoints (variables brutes, variables encodées, explications).
+
+    Returns:
+        Durée de la dernière passe par taille de lot (secondes)
+    """
+    timings = {}
+    for size in batch_sizes:
+        df = prepare_features_batch(synthetic_records(size))
+        for _ in range(rounds):
+            start = time.perf_counter()
+            model_manager.predict_proba(df)
+            timings[size] = time.perf_counter() - start
+        model_manager.predict_encoded(model_manager.pipeline[:-1].transform(df))
+
+    try:
+        model_manager.explain(prepare_features_batch(synthetic_records(1)))
+    except RuntimeError:
+        pass  # pipeline sans XGBoost : pas d'explications
+    return timings
+
+
+def database_reachable() -> bool:
+    """La base répond-elle à une requête triviale ?"""
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+
+
+def exit_process():
+    """Arrête le processus (comme un arrêt demandé) : l'orchestrateur le redémarre."""
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def run_database_step(migrate: bool = True, attempts: int = STARTUP_DB_ATTEMPTS) -> bool:
+    """
+    Attente de la base puis migrations (une seule lecture de version si la base est à
+    jour), relancées avec un délai croissant. Échec définitif : arrêt du processus.
+    """
+    step = init_db if migrate else wait_for_db
+    start = time.perf_counter()
+    delay = STARTUP_DB_BACKOFF_SECONDS
+    for attempt in range(1, attempts + 1):
+        try:
+            step()
+            startup_state.record("database", time.perf_counter() - start)
+            return True
+        except Exception as e:
+            if attempt == attempts:
+                logger.critical("❌ Base de données indisponible après %d tentatives : %s ; arrêt du processus", attempts, e)
+                startup_state.fail("database", e)
+                exit_process()
+                return False
+            logger.warning("⏳ Étape base de données en échec (tentative %d/%d) : %s ; nouvel essai dans %.0f s", attempt, attempts, e, delay)
+            time.sleep(delay)
+            delay = min(delay * 2, STARTUP_DB_MAX_BACKOFF_SECONDS)
+    return False
+
+
+def run_startup(migrate: bool = True):
+    """
+    Étape base de données (run_database_step, dans son propre thread), chargement puis
+    préchauffage du modèle ; le modèle est chargé quoi qu'il arrive à la base.
+    """
+    database_ready = []
+    database = threading.Thread(
+        target=lambda: database_ready.append(run_database_step(migrate)), name="startup-database", daemon=True
+    )
+    database.start()
+
+    for name, step in [("load_model", model_manager.load), ("warm_up", warm_up_model)]:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.error("❌ Démarrage interrompu (%s) : %s", name, e)
+            startup_state.fail(name, e)
+            return
+        startup_state.record(name, time.perf_counter() - start)
+
+    database.join()
+    if not database_ready[0]:
+        return
+
+    startup_state.model_warm = True
+    logger.info("✅ Modèle chargé et préchauffé en %.2f s", time.monotonic() - startup_state.started_at)
+
+    # Profil de référence de la dérive, après /ready : les premières requêtes ne le paient pas
+    start = time.perf_counter()
+    drift_monitor.reference
+    startup_state.record("drift_reference", time.perf_counter() - start)
+
+    # Magasin de variables : tant qu'il n'est pas chargé, les prédictions relisent la base
+    if feature_store.enabled:
+        start = time.perf_counter()
+        try:
+            feature_store.load()
+            feature_store.start_refresh()
+        except Exception as e:
+            logger.error("❌ Magasin de variables non chargé : %s", e)
+            return
+        startup_state.record("feature_store", time.perf_counter() - start)
+
+
+def start_background_startup(migrate: bool = True) -> threading.Thread:
+    """Lance run_startup dans un thread (le lifespan rend la main aussitôt)."""
+    startup_state.reset()
+    thread = threading.Thread(target=run_startup, args=(migrate,), name="startup", daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness() -> tuple[bool, dict]:
+    """Prêt si le modèle est préchauffé et la base joignable ; détail de chaque condition."""
+    state = startup_state.snapshot()
+    database = database_reachable()
+    details = {
+        "model": "warm" if state["model_warm"] else ("error" if state["error"] else "loading"),
+        "database": "ok" if database else "unreachable",
+    }
+    if state["error"]:
+        details["error"] = state["error"]
+    return state["model_warm"] and database, details
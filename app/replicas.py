@@ -0,0 +1,200 @@
+"""
+Routage des lectures vers des réplicas en lecture seule.
+
+Les SELECT simples (sans FOR UPDATE) sont envoyés à tour de rôle aux réplicas en bonne
+santé et suffisamment à jour ; tout le reste (écritures, SQL texte, flush) va au primaire.
+
+Lecture de ses propres écritures :
+- une session qui a écrit lit ensuite uniquement sur le primaire ;
+- une requête HTTP qui a écrit renvoie le cookie et l'en-tête `last_write` (horodatage) ;
+  le client qui les renvoie lit sur le primaire pendant READ_YOUR_WRITES_WINDOW secondes,
+  le temps qu'un réplica accepté (retard <= DB_REPLICA_MAX_LAG) ait rejoué l'écriture.
+"""
+import itertools
+import os
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import Select, event, text
+from sqlalchemy.orm import Session
+
+# Retard de réplication maximal accepté (secondes)
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+
+# Intervalle entre deux vérifications de l'état des réplicas (secondes)
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5"))
+
+# Après une écriture, durée pendant laquelle le client lit sur le primaire (secondes)
+READ_YOUR_WRITES_WINDOW = DB_REPLICA_MAX_LAG + DB_REPLICA_CHECK_INTERVAL
+
+LAST_WRITE_COOKIE = "last_write"
+LAST_WRITE_HEADER = "x-last-write"
+
+# Retard de rejeu d'un réplica PostgreSQL (0 sur un primaire, ou si tout le WAL reçu est rejoué)
+POSTGRES_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+class Replica:
+    """Un réplica : son moteur, son état à la dernière vérification et ses lectures servies."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.healthy = False
+        self.lag = None
+        self.error = None
+        self.reads = 0
+
+        # Une erreur de connexion en cours de requête l'écarte jusqu'à la prochaine vérification
+        @event.listens_for(engine, "handle_error")
+        def _on_error(context):
+            if context.is_disconnect:
+                self.healthy = False
+
+    def check(self):
+        try:
+            with self.engine.connect() as conn:
+                if self.engine.dialect.name == "postgresql":
+                    self.lag = float(conn.execute(text(POSTGRES_LAG_SQL)).scalar())
+                else:
+                    conn.execute(text("SELECT 1"))
+                    self.lag = 0.0
+            self.healthy, self.error = True, None
+        except Exception as e:
+            self.healthy, self.error = False, str(e)
+
+    def snapshot(self) -> dict:
+        return {
+            "url": self.engine.url.render_as_string(hide_password=True),
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "reads": self.reads,
+            "error": self.error,
+        }
+
+
+class ReplicaSet:
+    """Réplicas servis à tour de rôle ; l'état de chacun est revérifié toutes les `check_interval` secondes."""
+
+    def __init__(self, engines, max_lag: float = DB_REPLICA_MAX_LAG, check_interval: float = DB_REPLICA_CHECK_INTERVAL):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.checked_at = None
+        self.primary_fallbacks = 0
+        self._next = itertools.count()
+        self._check_lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    def check(self):
+        for replica in self.replicas:
+            replica.check()
+        self.checked_at = time.monotonic()
+
+    def _check_if_stale(self):
+        if self.checked_at is not None and time.monotonic() - self.checked_at < self.check_interval:
+            return
+        # Un seul thread vérifie ; les autres gardent l'état précédent
+        if self._check_lock.acquire(blocking=False):
+            try:
+                self.check()
+            finally:
+                self._check_lock.release()
+
+    def pick(self):
+        """Moteur du prochain réplica utilisable, ou None (lecture sur le primaire)."""
+        self._check_if_stale()
+        usable = [r for r in self.replicas if r.healthy and r.lag is not None and r.lag <= self.max_lag]
+        if not usable:
+            self.primary_fallbacks += 1
+            return None
+        replica = usable[next(self._next) % len(usable)]
+        replica.reads += 1
+        return replica.engine
+
+    def snapshot(self) -> dict:
+        return {
+            "max_lag_seconds": self.max_lag,
+            "primary_fallbacks": self.primary_fallbacks,
+            "replicas": [replica.snapshot() for replica in self.replicas],
+        }
+
+
+class RequestConsistency:
+    """État d'une requête HTTP : doit-elle lire sur le primaire, a-t-elle écrit ?"""
+
+    def __init__(self, primary_only: bool = False):
+        self.primary_only = primary_only
+        self.wrote = False
+
+
+request_consistency: ContextVar[RequestConsistency | None] = ContextVar("request_consistency", default=None)
+
+
+def is_replica_read(clause) -> bool:
+    """SELECT sans verrou de ligne : peut être servi par un réplica."""
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    """Session qui envoie ses lectures aux réplicas et tout le reste au primaire (`bind`)."""
+
+    def __init__(self, *args, replicas: ReplicaSet | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if clause is None and not self._flushing:
+            # Choix du dialecte, connexion explicite : primaire, sans effet sur le routage
+            return super().get_bind(mapper, clause=clause, **kwargs)
+
+        consistency = request_consistency.get()
+        if is_replica_read(clause):
+            primary_only = self.info.get("wrote") or (consistency is not None and consistency.primary_only)
+            if self.replicas and not primary_only:
+                replica = self.replicas.pick()
+                if replica is not None:
+                    return replica
+            return super().get_bind(mapper, clause=clause, **kwargs)
+
+        self.info["wrote"] = True
+        if consistency is not None:
+            consistency.wrote = True
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+def last_write_from_request(request) -> float | None:
+    value = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+async def read_your_writes_middleware(request, call_next):
+    """
+    Lit sur le primaire si le client a écrit il y a moins de READ_YOUR_WRITES_WINDOW
+    secondes ; marque la réponse (cookie et en-tête) quand la requête a écrit.
+    """
+    last_write = last_write_from_request(request)
+    consistency = RequestConsistency(
+        primary_only=last_write is not None and time.time() - last_write < READ_YOUR_WRITES_WINDOW
+    )
+    token = request_consistency.set(consistency)
+    try:
+        response = await call_next(request)
+    finally:
+        request_consistency.reset(token)
+
+    if consistency.wrote:
+        now = f"{time.time():.3f}"
+        response.headers[LAST_WRITE_HEADER] = now
+        response.set_cookie(LAST_WRITE_COOKIE, now, max_age=int(READ_YOUR_WRITES_WINDOW) + 1, httponly=True)
+    return response
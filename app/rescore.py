@@ -0,0 +1,160 @@
+"""
+Rescoring incrémental : seuls les employés dont la prédiction courante est périmée
+sont prédits à nouveau.
+
+Une prédiction est périmée si l'employé a été modifié depuis (`employees.updated_at`
+postérieur à `current_risk.created_at`), si elle vient d'une autre version du modèle
+que `model_manager.version`, ou si l'employé n'a jamais été prédit.
+
+Le coût suit le volume de changements, pas la population : après un premier passage
+complet, seules deux recherches indexées sont faites :
+- les employés modifiés depuis le dernier rescoring réussi (index sur updated_at),
+  moins RESCORE_OVERLAP_SECONDS pour ne pas manquer une écriture encore en cours ;
+- les prédictions courantes d'une autre version du modèle (index sur
+  current_risk.model_version).
+
+Les employés sont prédits par blocs (un appel au modèle et un INSERT multi-lignes par
+bloc, un commit par bloc) ; la position du dernier passage est gardée dans
+`job_watermarks`.
+
+Usage :
+    python -m app.rescore
+    python -m app.rescore --full --chunk-size 10000
+    python -m app.rescore --dry-run
+"""
+import argparse
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import sessionmaker
+from app.database import engine
+from app.models import CurrentRisk, Employee, JobWatermark, EMPLOYEE_DATA_COLUMNS, model_manager
+from app.routes import dialect_insert, prepare_features_batch, save_predictions_batch
+
+logger = logging.getLogger(__name__)
+
+# Employés prédits par bloc (un appel au modèle, une transaction)
+RESCORE_CHUNK_SIZE = int(os.getenv("RESCORE_CHUNK_SIZE", "5000"))
+
+# Recouvrement avec le passage précédent : écritures validées juste après son départ
+RESCORE_OVERLAP_SECONDS = float(os.getenv("RESCORE_OVERLAP_SECONDS", "300"))
+
+WATERMARK_NAME = "rescore"
+
+EMPLOYEE_COLUMNS = [Employee.__table__.c[name] for name in EMPLOYEE_DATA_COLUMNS]
+
+
+def stale_condition(version: str):
+    """Prédiction courante absente, antérieure à la dernière modification ou d'une autre version."""
+    return or_(
+        CurrentRisk.id_employee.is_(None),
+        Employee.updated_at > CurrentRisk.created_at,
+        CurrentRisk.model_version.is_distinct_from(version),
+    )
+
+
+def stale_employees_queries(version: str, since: datetime | None) -> dict:
+    """
+    Requêtes des employés à rescorer, par motif. Sans `since` (premier passage ou
+    --full), une seule requête sur toute la table.
+    """
+    base = (
+        select(*EMPLOYEE_COLUMNS)
+        .outerjoin(CurrentRisk, CurrentRisk.id_employee == Employee.id_employee)
+        .where(stale_condition(version))
+    )
+    if since is None:
+        return {"all": base}
+    return {
+        "changed": base.where(Employee.updated_at > since),
+        # Deux intervalles plutôt que <> : l'index sur model_version reste utilisable
+        "model_version": base.where(or_(CurrentRisk.model_version < version, CurrentRisk.model_version > version)),
+    }
+
+
+def read_watermark(db) -> datetime | None:
+    return db.scalar(select(JobWatermark.watermark).where(JobWatermark.name == WATERMARK_NAME))
+
+
+def write_watermark(db, value: datetime):
+    stmt = dialect_insert(db, JobWatermark).values(name=WATERMARK_NAME, watermark=value)
+    db.execute(stmt.on_conflict_do_update(index_elements=[JobWatermark.name], set_={"watermark": value}))
+
+
+def score_chunk(db, records: list[dict]) -> int:
+    """Prédit un bloc d'employés en un appel au modèle et enregistre les prédictions."""
+    probabilities = model_manager.predict_proba(prepare_features_batch(records))
+    ids = [record["id_employee"] for record in records]
+    save_predictions_batch(db, ids, probabilities.argmax(axis=1), probabilities)
+    db.commit()
+    return len(records)
+
+
+def rescore(chunk_size: int = RESCORE_CHUNK_SIZE, full: bool = False, dry_run: bool = False, bind=engine) -> dict:
+    """
+    Rescore les employés dont la prédiction est périmée.
+
+    Returns:
+        Employés rescorés par motif, nombre de blocs et durée (secondes)
+    """
+    if model_manager.pipeline is None:
+        model_manager.load()
+
+    SessionLocal = sessionmaker(bind=bind, autoflush=False)
+    start = time.perf_counter()
+    started_at = datetime.utcnow()
+    summary = {"rescored": {}, "chunks": 0}
+
+    with SessionLocal() as db:
+        watermark = None if full else read_watermark(db)
+        since = watermark - timedelta(seconds=RESCORE_OVERLAP_SECONDS) if watermark else None
+
+        for reason, query in stale_employees_queries(model_manager.version, since).items():
+            if dry_run:
+                summary["rescored"][reason] = db.scalar(select(func.count()).select_from(query.subquery()))
+                continue
+
+            # Pagination par clé : un employé rescoré n'est plus périmé, mais on avance
+            # quand même après le dernier identifiant (bloc en échec, prédiction plus récente)
+            rescored, last_id = 0, None
+            while True:
+                stmt = query if last_id is None else query.where(Employee.id_employee > last_id)
+                records = [dict(row) for row in db.execute(stmt.order_by(Employee.id_employee).limit(chunk_size)).mappings()]
+                if not records:
+                    break
+                rescored += score_chunk(db, records)
+                summary["chunks"] += 1
+                last_id = records[-1]["id_employee"]
+            summary["rescored"][reason] = rescored
+
+        if not dry_run:
+            write_watermark(db, started_at)
+            db.commit()
+
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Rescore les employés modifiés ou prédits par une autre version du modèle")
+    parser.add_argument("--chunk-size", type=int, default=RESCORE_CHUNK_SIZE, help="Employés prédits par bloc")
+    parser.add_argument("--full", action="store_true", help="Ignore le dernier passage : vérifie toute la table")
+    parser.add_argument("--dry-run", action="store_true", help="Compte les employés à rescorer sans rien écrire")
+
+    args = parser.parse_args()
+
+    summary = rescore(args.chunk_size, args.full, args.dry_run)
+    logger.info(
+        "%s %s en %.2f s (%d bloc(s), version %s)",
+        "À rescorer :" if args.dry_run else "Rescorés :",
+        ", ".join(f"{reason} {count}" for reason, count in summary["rescored"].items()),
+        summary["seconds"], summary["chunks"], model_manager.version,
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,123 @@
+"""
+Rétention de l'historique des prédictions (table `predictions` partitionnée par mois).
+
+Les partitions entièrement plus anciennes que la période de rétention sont agrégées
+par jour, département et version de modèle dans `prediction_daily_rollups`, puis
+détachées et supprimées, dans une même transaction par partition. Les partitions des
+prochains mois sont créées au passage.
+
+Usage :
+    python -m app.retention --keep-months 12
+    python -m app.retention --keep-months 12 --keep-detached   # garde les tables détachées
+"""
+import argparse
+import logging
+import re
+from datetime import date, datetime
+from sqlalchemy import text
+from app.database import engine
+from app.migrate import add_months, ensure_prediction_partitions, is_partitioned, month_start
+
+logger = logging.getLogger(__name__)
+
+# Nombre de mois d'historique détaillé conservés par défaut
+DEFAULT_KEEP_MONTHS = 12
+
+PARTITION_PATTERN = re.compile(r"^predictions_(\d{4})_(\d{2})$")
+
+# Agrégation d'une partition ; ré-exécutable (un jour appartient à une seule partition)
+ROLLUP_SQL = """
+INSERT INTO prediction_daily_rollups (
+    day, departement, model_version, predictions, departures, high_risk,
+    sum_probability_quitte, sum_confidence
+)
+SELECT
+    CAST(p.created_at AS DATE),
+    COALESCE(e.departement, 'Inconnu'),
+    COALESCE(p.model_version, 'inconnue'),
+    count(*),
+    count(*) FILTER (WHERE p.prediction = 1),
+    count(*) FILTER (WHERE p.risk_level = 'Haut'),
+    COALESCE(sum(p.probability_quitte), 0),
+    COALESCE(sum(p.confidence), 0)
+FROM {partition} p
+LEFT JOIN employees e ON e.id_employee = p.id_employee
+GROUP BY 1, 2, 3
+ON CONFLICT (day, departement, model_version) DO UPDATE SET
+    predictions = EXCLUDED.predictions,
+    departures = EXCLUDED.departures,
+    high_risk = EXCLUDED.high_risk,
+    sum_probability_quitte = EXCLUDED.sum_probability_quitte,
+    sum_confidence = EXCLUDED.sum_confidence
+"""
+
+
+def list_month_partitions(conn) -> list[tuple[str, date]]:
+    """Partitions mensuelles attachées à `predictions`, de la plus ancienne à la plus récente."""
+    names = conn.execute(text(
+        "SELECT inhrelid::regclass::text FROM pg_inherits "
+        "WHERE inhparent = 'predictions'::regclass"
+    )).scalars()
+    partitions = []
+    for name in names:
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def rollup_partition(conn, name: str) -> int:
+    """Agrège une partition dans prediction_daily_rollups ; renvoie le nombre de groupes écrits."""
+    return conn.execute(text(ROLLUP_SQL.format(partition=name))).rowcount
+
+
+def apply_retention(keep_months: int = DEFAULT_KEEP_MONTHS, keep_detached: bool = False, today: date | None = None) -> list[dict]:
+    """
+    Agrège puis détache les partitions dont le mois se termine avant
+    (mois courant - keep_months).
+
+    Returns:
+        Un résumé par partition traitée (nom, groupes agrégés)
+    """
+    cutoff = add_months(month_start(today or datetime.utcnow()), -keep_months)
+    processed = []
+
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            logger.warning("La table predictions n'est pas partitionnée : lancer app.migrate d'abord")
+            return processed
+
+        created = ensure_prediction_partitions(conn)
+        conn.commit()
+        if created:
+            logger.info("Partitions créées : %s", ", ".join(created))
+
+        for name, month in list_month_partitions(conn):
+            if month >= cutoff:
+                break
+            groups = rollup_partition(conn, name)
+            conn.execute(text(f"ALTER TABLE predictions DETACH PARTITION {name}"))
+            if not keep_detached:
+                conn.execute(text(f"DROP TABLE {name}"))
+            conn.commit()
+            logger.info("Partition %s agrégée (%d groupes) et détachée", name, groups)
+            processed.append({"partition": name, "groups": groups})
+
+    return processed
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Agrège et supprime les partitions anciennes de predictions")
+    parser.add_argument("--keep-months", type=int, default=DEFAULT_KEEP_MONTHS, help="Mois d'historique détaillé conservés")
+    parser.add_argument("--keep-detached", action="store_true", help="Détache les partitions sans les supprimer")
+
+    args = parser.parse_args()
+
+    processed = apply_retention(args.keep_months, args.keep_detached)
+    logger.info("%d partition(s) traitée(s)", len(processed))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -1,30 +1,281 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import bindparam, func, select, insert, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
+from datetime import datetime
+import base64
+import functools
+import logging
 import numpy as np
-import pandas as pd
-from app.models import model_manager, Employee, Prediction
-from app.schemas import EmployeeInput, PredictionOutput
+from app.lazy import lazy_import
+from app.models import model_manager, Employee, Prediction, CurrentRisk, EMPLOYEE_DATA_COLUMNS
+from app.schemas import EmployeeInput, PredictionOutput, PredictionPage, AtRiskEmployee
+from app import database
 from app.database import get_db
+from app.coalescing import prediction_flights
+from app.hashing import employee_content_hash, payload_fingerprint
+from app.drift import drift_monitor
+from app.columnar import MEDIA_TYPES, PREDICTION_SCHEMA, encode_batches, rows_to_batch
+from app.serialization import dumps_line, fast_response, streaming_response, MSGPACK_MEDIA_TYPE
+from app.logs import stage
+
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["predictions"])
 
-def save_prediction(db: Session, id_employee: int, prediction: int, probabilities: list):
-    """Fonction utilitaire pour enregistrer le résultat en base."""
-    confidence = float(np.max(probabilities))
-    new_prediction = Prediction(
-        id_employee=id_employee,
-        prediction=int(prediction),
-        confidence=confidence,
-        probability_reste=float(probabilities[0]),
-        probability_quitte=float(probabilities[1]),
-        risk_level="Haut" if (prediction == 1 and confidence > 0.7) else "Normal",
-        model_version="1.0.0"
-    )
-    db.add(new_prediction)
+def compute_risk_level(prediction: int, confidence: float) -> str:
+    """Niveau de risque : "Haut" si départ prédit avec une confiance > 0.7."""
+    return "Haut" if (prediction == 1 and confidence > 0.7) else "Normal"
+
+def dialect_insert(db: Session, model):
+    """INSERT propre au dialecte de la session (pour ON CONFLICT ... DO UPDATE)."""
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite_insert(model)
+    return pg_insert(model)
+
+# Colonnes de `predictions` renseignées à l'insertion
+PREDICTION_ROW_COLUMNS = [
+    "id_employee", "prediction", "confidence", "probability_reste",
+    "probability_quitte", "risk_level", "model_version", "created_at"
+]
+
+def prediction_rows(ids, predictions, probabilities, tier: str | None = None) -> list[dict]:
+    """Lignes de `predictions` (sans `id`) pour un lot de résultats du modèle (palier `tier`)."""
+    probabilities = np.asarray(probabilities)
+    model_version = model_manager.version_for(tier)
+    confidences = probabilities.max(axis=1)
+    return [
+        {
+            "id_employee": int(id_employee),
+            "prediction": int(prediction),
+            "confidence": float(confidence),
+            "probability_reste": float(proba[0]),
+            "probability_quitte": float(proba[1]),
+            "risk_level": compute_risk_level(prediction, confidence),
+            "model_version": model_version,
+            "created_at": datetime.utcnow(),
+        }
+        for id_employee, prediction, confidence, proba in zip(ids, predictions, confidences, probabilities)
+    ]
+
+def save_prediction(db: Session, id_employee: int, prediction: int, probabilities: list, employee: dict | None = None,
+                    tier: str | None = None):
+    """
+    Enregistre le résultat en base (et l'employé s'il est fourni) en une seule transaction.
+    Une prédiction d'un palier tronqué est inscrite sous la version suffixée du palier
+    (ex. 1.0.0+fast) : le rescoring la remplace par celle du modèle complet.
+
+    Sur PostgreSQL, l'upsert de l'employé, l'insertion de la prédiction et la mise
+    à jour de current_risk forment une seule requête (CTE) : un aller-retour et un commit.
+    """
+    row = prediction_rows([id_employee], [prediction], [probabilities], tier)[0]
+    dialect = db.get_bind().dialect.name
+    if dialect in PREDICTION_WRITE_DIALECTS:
+        params = {f"prediction_{col}": value for col, value in row.items()}
+        if employee is not None:
+            params.update({f"employee_{col}": value for col, value in employee_rows([employee])[0].items()})
+            # Même horodatage que la prédiction : l'employé n'est pas vu comme modifié depuis
+            params["employee_created_at"] = params["employee_updated_at"] = row["created_at"]
+        for stmt in prediction_write_statements(dialect, employee is not None):
+            db.execute(stmt, params)
+        if employee is not None:
+            track_written_employees(db, [employee])
+    else:
+        if employee is not None:
+            upsert_employees(db, [employee])
+        save_predictions_batch(db, [id_employee], [prediction], [probabilities], tier)
     db.commit()
-    return confidence
+    return row["confidence"]
+
+# Dialectes dont les INSERT ... ON CONFLICT sont compilés une seule fois
+PREDICTION_WRITE_DIALECTS = {
+    "postgresql": (pg_insert, postgresql.dialect(paramstyle="named")),
+    "sqlite": (sqlite_insert, sqlite.dialect(paramstyle="named")),
+}
+
+def compiled_text(stmt, dialect):
+    """
+    SQL texte compilé une fois, avec le type de chaque paramètre : SQLAlchemy ne met
+    pas en cache la compilation des INSERT ... ON CONFLICT (~2 ms par requête).
+    """
+    compiled = stmt.compile(dialect=dialect)
+    return text(str(compiled)).bindparams(
+        *[bindparam(name, type_=bind.type) for name, bind in compiled.binds.items()]
+    )
 
-def prepare_features(data_dict: dict) -> pd.DataFrame:
+@functools.cache
+def prediction_write_statements(dialect: str, with_employee: bool) -> tuple:
+    """
+    Écriture d'une prédiction (paramètres nommés `prediction_*` et `employee_*`).
+
+    PostgreSQL, une seule requête :
+        WITH employee AS (INSERT ... ON CONFLICT DO UPDATE),
+             new_prediction AS (INSERT INTO predictions ... RETURNING ...)
+        INSERT INTO current_risk SELECT ... FROM new_prediction ON CONFLICT DO UPDATE
+
+    SQLite (pas d'INSERT dans un WITH) : les mêmes étapes en trois requêtes, sans
+    aller-retour réseau ; current_risk est relu depuis last_insert_rowid().
+    """
+    insert_for, compile_dialect = PREDICTION_WRITE_DIALECTS[dialect]
+    prediction = insert_for(Prediction).values({
+        col: bindparam(f"prediction_{col}", type_=Prediction.__table__.c[col].type) for col in PREDICTION_ROW_COLUMNS
+    })
+    employee = None
+    if with_employee:
+        employee = employees_upsert_statement(insert_for(Employee).values({
+            col: bindparam(f"employee_{col}", type_=Employee.__table__.c[col].type)
+            for col in [*EMPLOYEE_ROW_COLUMNS, "created_at"]
+        }))
+
+    if dialect == "postgresql":
+        new_prediction = prediction.returning(
+            Prediction.id, *[Prediction.__table__.c[col] for col in CURRENT_RISK_COLUMNS]
+        ).cte("new_prediction")
+    else:
+        new_prediction = Prediction.__table__
+
+    if with_employee:
+        # Les sous-requêtes d'un WITH partagent le même instantané : le département
+        # est repris des paramètres plutôt que relu dans `employees`
+        departement = bindparam("employee_departement", type_=Employee.departement.type)
+    else:
+        departement = (
+            select(Employee.departement)
+            .where(Employee.id_employee == new_prediction.c.id_employee)
+            .scalar_subquery()
+        )
+
+    source = select(new_prediction.c.id, departement, *[new_prediction.c[col] for col in CURRENT_RISK_COLUMNS])
+    if dialect == "sqlite":
+        # Le WHERE lève aussi l'ambiguïté de SQLite entre ON CONFLICT et une jointure
+        source = source.where(Prediction.id == func.last_insert_rowid())
+    current_risk = current_risk_on_conflict(insert_for(CurrentRisk).from_select(
+        ["prediction_id", "departement", *CURRENT_RISK_COLUMNS], source
+    ))
+
+    if dialect == "postgresql":
+        if employee is not None:
+            current_risk = current_risk.add_cte(employee.cte("employee"))
+        return (compiled_text(current_risk, compile_dialect),)
+    statements = [prediction, current_risk] if employee is None else [employee, prediction, current_risk]
+    return tuple(compiled_text(stmt, compile_dialect) for stmt in statements)
+
+def save_predictions_batch(db: Session, ids, predictions, probabilities, tier: str | None = None) -> list[dict]:
+    """
+    Enregistre un lot de prédictions en un seul INSERT multi-lignes (sans commit)
+    et met à jour current_risk dans la même transaction.
+    
+    Returns:
+        Les lignes insérées (sous forme de dictionnaires)
+    """
+    rows = prediction_rows(ids, predictions, probabilities, tier)
+    if rows:
+        inserted_ids = db.scalars(
+            insert(Prediction).returning(Prediction.id, sort_by_parameter_order=True), rows
+        ).all()
+        upsert_current_risk(db, [{"id": pk, **row} for pk, row in zip(inserted_ids, rows)])
+    return rows
+
+# Colonnes de Prediction recopiées dans current_risk
+CURRENT_RISK_COLUMNS = [
+    "id_employee", "prediction", "confidence", "risk_level",
+    "probability_quitte", "model_version", "created_at"
+]
+
+def current_risk_on_conflict(stmt):
+    """ON CONFLICT DO UPDATE de current_risk : une prédiction plus ancienne n'écrase pas la plus récente."""
+    return stmt.on_conflict_do_update(
+        index_elements=[CurrentRisk.id_employee],
+        set_={col: stmt.excluded[col] for col in ["prediction_id", "departement", *CURRENT_RISK_COLUMNS]},
+        where=CurrentRisk.created_at <= stmt.excluded.created_at
+    )
+
+def upsert_current_risk(db: Session, predictions: list[dict]):
+    """
+    Reporte les prédictions (avec leur `id`) dans current_risk, en une requête
+    INSERT ... ON CONFLICT DO UPDATE exécutée par lots de lignes, sans commit.
+
+    Le département est relu dans `employees` en une requête ; une prédiction plus
+    ancienne que celle déjà enregistrée ne l'écrase pas.
+    """
+    # Une seule ligne par employé et par requête (la dernière du lot)
+    latest = {row["id_employee"]: row for row in predictions}
+    if not latest:
+        return
+    departements = dict(db.execute(
+        select(Employee.id_employee, Employee.departement).where(Employee.id_employee.in_(latest))
+    ).all())
+    rows = [
+        {
+            "prediction_id": row["id"],
+            "departement": departements.get(id_employee),
+            **{col: row[col] for col in CURRENT_RISK_COLUMNS},
+        }
+        for id_employee, row in latest.items()
+    ]
+    # Table (et non entité ORM) : INSERT Core multi-lignes, sans le chemin d'insertion en masse de l'ORM
+    db.execute(current_risk_on_conflict(dialect_insert(db, CurrentRisk.__table__)), rows)
+
+# Colonnes écrites par l'upsert des employés
+EMPLOYEE_ROW_COLUMNS = [*EMPLOYEE_DATA_COLUMNS, "content_hash", "updated_at"]
+
+def employee_rows(employees: list[dict]) -> list[dict]:
+    """
+    Lignes de `employees` avec leur empreinte et leur date de modification ; une
+    seule par employé (la dernière), car ON CONFLICT ne peut pas modifier deux fois
+    la même ligne.
+    """
+    latest = {employee["id_employee"]: employee for employee in employees}
+    now = datetime.utcnow()
+    return [
+        {
+            **{col: employee.get(col) for col in EMPLOYEE_DATA_COLUMNS},
+            "content_hash": employee_content_hash(employee),
+            "updated_at": now,
+        }
+        for employee in latest.values()
+    ]
+
+def employees_upsert_statement(stmt):
+    """
+    ON CONFLICT DO UPDATE d'un INSERT d'employés : la ligne existante n'est
+    réécrite (et updated_at avancé) que si l'empreinte de son contenu a changé.
+    """
+    return stmt.on_conflict_do_update(
+        index_elements=[Employee.id_employee],
+        set_={col: stmt.excluded[col] for col in EMPLOYEE_ROW_COLUMNS if col != "id_employee"},
+        where=Employee.content_hash.is_distinct_from(stmt.excluded.content_hash)
+    )
+
+# Employés écrits par la transaction en cours (repris après commit par app/feature_store.py)
+WRITTEN_EMPLOYEES = "written_employees"
+
+def track_written_employees(db: Session, employees: list[dict]):
+    db.info.setdefault(WRITTEN_EMPLOYEES, []).extend(employees)
+
+def upsert_employees(db: Session, employees: list[dict]):
+    """
+    Insère ou met à jour un lot d'employés en une seule requête
+    (INSERT ... ON CONFLICT DO UPDATE), sans commit. Les employés inchangés
+    (même empreinte de contenu) ne sont pas réécrits.
+    """
+    if not employees:
+        return
+    db.execute(employees_upsert_statement(dialect_insert(db, Employee).values(employee_rows(employees))))
+    track_written_employees(db, employees)
+
+def encode_overtime(val) -> int:
+    """Conversion des heures supplémentaires : "Oui"/"Yes" ou nombre > 0 -> 1, sinon 0."""
+    if isinstance(val, str):
+        return 1 if val.strip().lower() in ['oui', 'yes'] else 0
+    return 1 if (val and val > 0) else 0
+
+def prepare_features(data_dict: dict) -> "pd.DataFrame":
     """
     Prépare le DataFrame pour le modèle ML.
     """
@@ -39,57 +290,84 @@ def prepare_features(data_dict: dict) -> pd.DataFrame:
         features['ayant_enfants'] = 0 if features['ayant_enfants'] else 1
         
     if 'heure_supplementaires' in features:
-        val = features['heure_supplementaires']
         # Conversion "Oui"/"Non" -> 1/0
-        if isinstance(val, str):
-            features['heure_supplementaires'] = 1 if val.strip().lower() in ['oui', 'yes'] else 0
-        else:
-            features['heure_supplementaires'] = 1 if (val and val > 0) else 0
+        features['heure_supplementaires'] = encode_overtime(features['heure_supplementaires'])
 
     # 4. Création du DataFrame
     df = pd.DataFrame([features])
     
     return df
 
-@router.post("/predict_employee", response_model=PredictionOutput)
-async def predict_employee(data: EmployeeInput, db: Session = Depends(get_db)):
-    try:
-        # --- ÉTAPE 1 : Sauvegarde de l'employé ---
-        # Conversion Pydantic -> Dict -> Objet SQLAlchemy
-        employee_data = data.model_dump() 
-        
-        new_employee = Employee(**employee_data)
-        
-        db.merge(new_employee)
-        db.commit()
+def prepare_features_batch(records: list[dict]) -> "pd.DataFrame":
+    """
+    Version vectorisée de prepare_features pour un lot d'employés :
+    mêmes conversions, appliquées colonne par colonne.
+    """
+    df = pd.DataFrame.from_records(records)
+    
+    if 'genre' in df:
+        df['genre'] = (df['genre'] != 'F').astype(int)
+    
+    if 'ayant_enfants' in df:
+        df['ayant_enfants'] = (~df['ayant_enfants'].map(bool)).astype(int)
+    
+    if 'heure_supplementaires' in df:
+        df['heure_supplementaires'] = df['heure_supplementaires'].map(encode_overtime).astype(int)
+    
+    return df
 
-        # --- ÉTAPE 2 : Prédiction ---
+def predict_new_employee(db: Session, employee_data: dict, tier: str | None = None) -> PredictionOutput:
+    """Prédit l'employé, puis enregistre l'employé et la prédiction en une seule transaction."""
+    try:
+        # --- ÉTAPE 1 : Prédiction ---
         # On utilise la fonction commune pour préparer les données
-        df = prepare_features(employee_data)
-        
-        # Debug : Affiche les colonnes pour vérifier si ça correspond au modèle
-        # print(f"Colonnes envoyées au modèle : {df.columns.tolist()}")
+        with stage("preprocess"):
+            df = prepare_features(employee_data)
 
-        prediction = model_manager.predict(df)[0]
-        probabilities = model_manager.predict_proba(df)[0]
+        with stage("predict"):
+            prediction = model_manager.predict(df, tier)[0]
+            probabilities = model_manager.predict_proba(df, tier)[0]
+        drift_monitor.observe(employee_data)
         
-        # --- ÉTAPE 3 : Archivage ---
-        confidence = save_prediction(db, data.id_employee, prediction, probabilities)
+        # --- ÉTAPE 2 : Upsert de l'employé et archivage (un seul commit) ---
+        with stage("save"):
+            confidence = save_prediction(db, employee_data["id_employee"], prediction, probabilities, employee=employee_data, tier=tier)
         
         return PredictionOutput(
-            id_employee=data.id_employee,
+            id_employee=employee_data["id_employee"],
             prediction=int(prediction),
             confidence=confidence
         )
 
     except Exception as e:
         db.rollback()
-        print(f"\n🛑 ERREUR POST /predict_employee : {str(e)}") # S'affichera dans pytest -s
+        logger.warning("Erreur POST /predict_employee : %s", e, exc_info=True, extra={"id_employee": employee_data.get("id_employee")})
         raise HTTPException(status_code=400, detail=f"Erreur lors du traitement : {str(e)}")
 
-@router.get("/predict_employee/{id_employee}", response_model=PredictionOutput)
-async def predict_by_id(id_employee: int, db: Session = Depends(get_db)):
-    employee = db.query(Employee).filter(Employee.id_employee == id_employee).first()
+def predict_existing_employee(db: Session, id_employee: int, tier: str | None = None) -> PredictionOutput:
+    """
+    Prédit un employé déjà en base et archive la prédiction. Avec le magasin de
+    variables (app/feature_store.py), l'employé n'est pas relu : sa ligne déjà encodée
+    est prédite directement.
+    """
+    from app.feature_store import feature_store
+    encoded = feature_store.get(id_employee)
+    if encoded is not None:
+        try:
+            with stage("predict"):
+                probabilities = model_manager.predict_encoded(encoded, tier)[0]
+            prediction = int(probabilities.argmax())
+            drift_monitor.skip()
+            with stage("save"):
+                confidence = save_prediction(db, id_employee, prediction, probabilities, tier=tier)
+            return PredictionOutput(id_employee=id_employee, prediction=prediction, confidence=confidence)
+        except Exception as e:
+            db.rollback()
+            logger.error("Erreur GET /predict_employee/%d : %s", id_employee, e, exc_info=True, extra={"id_employee": id_employee})
+            raise HTTPException(status_code=500, detail=str(e))
+
+    with stage("load"):
+        employee = db.query(Employee).filter(Employee.id_employee == id_employee).first()
     if not employee:
         raise HTTPException(status_code=404, detail="Employé non trouvé")
 
@@ -97,19 +375,22 @@ async def predict_by_id(id_employee: int, db: Session = Depends(get_db)):
         # Conversion SQLAlchemy -> Dict
         # On exclut les champs techniques (metadata, created_at...)
         employee_dict = {
-            col.name: getattr(employee, col.name) 
-            for col in Employee.__table__.columns 
-            if col.name != "created_at" # Exclure les dates/metadata non utilisées
+            col: getattr(employee, col) 
+            for col in EMPLOYEE_DATA_COLUMNS # Exclure les dates/metadata non utilisées
         }
 
         # --- Prédiction ---
         # On réutilise EXACTEMENT la même fonction de préparation
-        df = prepare_features(employee_dict)
+        with stage("preprocess"):
+            df = prepare_features(employee_dict)
 
-        prediction = model_manager.predict(df)[0]
-        probabilities = model_manager.predict_proba(df)[0]
+        with stage("predict"):
+            prediction = model_manager.predict(df, tier)[0]
+            probabilities = model_manager.predict_proba(df, tier)[0]
+        drift_monitor.observe(employee_dict)
         
-        confidence = save_prediction(db, id_employee, prediction, probabilities)
+        with stage("save"):
+            confidence = save_prediction(db, id_employee, prediction, probabilities, tier=tier)
 
         return PredictionOutput(
             id_employee=id_employee,
@@ -118,5 +399,210 @@ async def predict_by_id(id_employee: int, db: Session = Depends(get_db)):
         )
     except Exception as e:
         db.rollback()
-        print(f"\n🛑 ERREUR GET /predict_employee/{id_employee} : {str(e)}") # S'affichera dans pytest -s
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        logger.error("Erreur GET /predict_employee/%d : %s", id_employee, e, exc_info=True, extra={"id_employee": id_employee})
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Les requêtes identiques simultanées (même corps, ou même employé) partagent une seule
+# prédiction et une seule ligne archivée (voir app/coalescing.py)
+
+def in_own_session(func, *args):
+    """
+    Exécute `func(db, *args)` avec une session ouverte et fermée ici : le calcul partagé
+    ne dépend pas de la session de la requête qui l'a lancé (fermée si elle est annulée).
+    """
+    with database.SessionLocal() as db:
+        return func(db, *args)
+
+def inference_tier(
+    tier: str | None = Query(None, description="Palier d'inférence (ex. fast : premiers arbres seulement ; par défaut : modèle complet)"),
+) -> str | None:
+    """Palier demandé, validé contre ceux de model_manager.tiers."""
+    if tier is not None and tier not in model_manager.tiers:
+        raise HTTPException(status_code=422, detail=f"Palier inconnu : {tier} (disponibles : {', '.join(model_manager.tiers)})")
+    return tier
+
+@router.post("/predict_employee", response_model=PredictionOutput)
+async def predict_employee(data: EmployeeInput, tier: str | None = Depends(inference_tier)):
+    employee_data = data.model_dump()
+    key = ("payload", payload_fingerprint(employee_data), tier)
+    return await prediction_flights.run(key, in_own_session, predict_new_employee, employee_data, tier)
+
+@router.get("/predict_employee/{id_employee}", response_model=PredictionOutput)
+async def predict_by_id(id_employee: int, tier: str | None = Depends(inference_tier)):
+    return await prediction_flights.run(("employee", id_employee, tier), in_own_session, predict_existing_employee, id_employee, tier)
+
+
+# --- Historique des prédictions ---
+
+# Nombre de lignes lues par aller-retour avec le curseur serveur en mode streaming
+STREAM_BATCH_SIZE = 1000
+
+
+def encode_cursor(created_at: datetime, prediction_id: int) -> str:
+    """Encode la position (created_at, id) de la dernière ligne d'une page."""
+    raw = f"{created_at.isoformat()}|{prediction_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Décode un curseur produit par encode_cursor."""
+    try:
+        created_at, prediction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(prediction_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+
+def build_predictions_query(
+    id_employee: int | None = None,
+    model_version: str | None = None,
+    risk_level: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    cursor: str | None = None,
+):
+    """
+    Construit la requête de l'historique, triée de la plus récente à la plus ancienne.
+
+    La pagination se fait par clé (keyset) sur (created_at, id) : la page suivante
+    reprend strictement après la dernière ligne lue, ce qui s'appuie sur les index
+    composites de Prediction au lieu de parcourir les lignes sautées (OFFSET).
+    """
+    stmt = select(*Prediction.__table__.columns)
+
+    if id_employee is not None:
+        stmt = stmt.where(Prediction.id_employee == id_employee)
+    if model_version is not None:
+        stmt = stmt.where(Prediction.model_version == model_version)
+    if risk_level is not None:
+        stmt = stmt.where(Prediction.risk_level == risk_level)
+    if since is not None:
+        stmt = stmt.where(Prediction.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(Prediction.created_at < until)
+    if cursor is not None:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(Prediction.created_at, Prediction.id) < tuple_(cursor_created_at, cursor_id)
+        )
+
+    return stmt.order_by(Prediction.created_at.desc(), Prediction.id.desc())
+
+
+def stream_predictions_ndjson(db: Session, stmt):
+    """
+    Générateur NDJSON : les lignes sont lues par lots via un curseur serveur
+    (stream_results), sans jamais charger tout le résultat en mémoire, et encodées
+    directement par orjson.
+    """
+    result = db.execute(stmt.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE))
+    for rows in result.mappings().partitions():
+        yield b"".join(dumps_line(dict(row)) for row in rows)
+
+
+def stream_predictions_columnar(db: Session, stmt, format: str):
+    """Export Parquet/Arrow : un record batch par lot lu sur le curseur serveur."""
+    result = db.execute(stmt.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE))
+    batches = (rows_to_batch(rows, PREDICTION_SCHEMA) for rows in result.partitions())
+    yield from encode_batches(batches, PREDICTION_SCHEMA, format)
+
+
+def read_predictions_page(db: Session, stmt, limit: int) -> dict:
+    """Lit une page de `limit` lignes et calcule le curseur suivant."""
+    rows = db.execute(stmt.limit(limit + 1)).mappings().all()
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def predictions_response(request: Request, db: Session, stmt, limit: int, format: str):
+    """
+    Renvoie une page (JSON ou MessagePack selon Accept) ou le flux NDJSON complet
+    selon `format`, compressés selon Accept-Encoding.
+    """
+    if format == "ndjson":
+        return streaming_response(request, stream_predictions_ndjson(db, stmt), "application/x-ndjson")
+    return fast_response(request, read_predictions_page(db, stmt, limit))
+
+
+@router.get("/predictions", response_model=PredictionPage, responses={200: {"content": {MSGPACK_MEDIA_TYPE: {}}}})
+def list_predictions(
+    request: Request,
+    id_employee: int | None = None,
+    model_version: str | None = None,
+    risk_level: str | None = None,
+    since: datetime | None = Query(None, description="Date minimale (incluse)"),
+    until: datetime | None = Query(None, description="Date maximale (exclue)"),
+    cursor: str | None = Query(None, description="Curseur renvoyé par la page précédente"),
+    limit: int = Query(100, ge=1, le=1000, description="Taille de page (mode json)"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json (paginé) ou ndjson (flux complet)"),
+    db: Session = Depends(get_db),
+):
+    """Historique des prédictions, paginé par curseur ou diffusé en NDJSON."""
+    stmt = build_predictions_query(id_employee, model_version, risk_level, since, until, cursor)
+    return predictions_response(request, db, stmt, limit, format)
+
+
+@router.get("/predictions/export")
+def export_predictions(
+    format: str = Query("parquet", pattern="^(parquet|arrow)$", description="parquet ou arrow (IPC stream)"),
+    id_employee: int | None = None,
+    model_version: str | None = None,
+    risk_level: str | None = None,
+    since: datetime | None = Query(None, description="Date minimale (incluse)"),
+    until: datetime | None = Query(None, description="Date maximale (exclue)"),
+    db: Session = Depends(get_db),
+):
+    """Export typé de l'historique des prédictions (schéma de la table `predictions`)."""
+    stmt = build_predictions_query(id_employee, model_version, risk_level, since, until)
+    return StreamingResponse(
+        stream_predictions_columnar(db, stmt, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="predictions.{format}"'}
+    )
+
+
+@router.get("/employees/{id_employee}/predictions", response_model=PredictionPage, responses={200: {"content": {MSGPACK_MEDIA_TYPE: {}}}})
+def list_employee_predictions(
+    request: Request,
+    id_employee: int,
+    model_version: str | None = None,
+    risk_level: str | None = None,
+    since: datetime | None = Query(None, description="Date minimale (incluse)"),
+    until: datetime | None = Query(None, description="Date maximale (exclue)"),
+    cursor: str | None = Query(None, description="Curseur renvoyé par la page précédente"),
+    limit: int = Query(100, ge=1, le=1000, description="Taille de page (mode json)"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json (paginé) ou ndjson (flux complet)"),
+    db: Session = Depends(get_db),
+):
+    """Historique des prédictions d'un employé."""
+    if db.get(Employee, id_employee) is None:
+        raise HTTPException(status_code=404, detail="Employé non trouvé")
+
+    stmt = build_predictions_query(id_employee, model_version, risk_level, since, until, cursor)
+    return predictions_response(request, db, stmt, limit, format)
+
+
+# --- Employés à risque ---
+
+@router.get("/employees/at-risk", response_model=list[AtRiskEmployee])
+def list_employees_at_risk(
+    k: int = Query(50, ge=1, le=1000, description="Nombre d'employés renvoyés"),
+    departement: str | None = Query(None, description="Filtrer sur un département"),
+    db: Session = Depends(get_db),
+):
+    """
+    Les `k` employés dont la dernière prédiction a la plus forte probabilité de départ.
+
+    Servi par la table current_risk (une ligne par employé) et ses index sur
+    probability_quitte et (departement, probability_quitte) : le coût ne dépend
+    pas de la taille de l'historique des prédictions.
+    """
+    stmt = select(CurrentRisk).where(CurrentRisk.probability_quitte.is_not(None))
+    if departement is not None:
+        stmt = stmt.where(CurrentRisk.departement == departement)
+    stmt = stmt.order_by(CurrentRisk.probability_quitte.desc(), CurrentRisk.id_employee).limit(k)
+    return db.scalars(stmt).all()
@@ -1,4 +1,9 @@
-from pydantic import BaseModel, Field, ConfigDict
+import functools
+from datetime import datetime
+from typing import Annotated, Any, Mapping, Sequence
+import numpy as np
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, ValidationError, model_validator
+
 
 class EmployeeInput(BaseModel):
     """Schéma pour les données d'un employé à prédire."""
@@ -90,6 +95,125 @@ class EmployeeInput(BaseModel):
     a_quitte_l_entreprise: str | None = Field(None, description="A quitté l'entreprise (Oui/Non)")
 
 
+# Validation d'un lot d'employés en un seul appel au validateur (pydantic-core)
+EMPLOYEE_LIST_ADAPTER = TypeAdapter(list[EmployeeInput])
+
+
+def row_errors(error: ValidationError) -> dict[int, list[dict]]:
+    """Erreurs d'une validation de liste, regroupées par indice de ligne (indice retiré de `loc`)."""
+    errors = {}
+    for err in error.errors(include_url=False):
+        index, *loc = err["loc"] or (None,)
+        errors.setdefault(index, []).append({"loc": tuple(loc), "msg": err["msg"], "type": err["type"]})
+    return errors
+
+
+def validate_employees(data: Sequence[Mapping] | str | bytes) -> tuple[list[EmployeeInput], list[int], dict[int, list[dict]]]:
+    """
+    Valide un lot d'employés (liste de dicts ou tableau JSON) sans construire les
+    objets un par un : le lot entier passe en un appel au validateur. Une ligne
+    invalide n'invalide pas le lot.
+
+    Returns:
+        (employees, indices, errors) : les employés valides, leur indice dans le lot,
+        et les erreurs (format pydantic) par indice de ligne rejetée
+    """
+    validate = EMPLOYEE_LIST_ADAPTER.validate_json if isinstance(data, (str, bytes)) else EMPLOYEE_LIST_ADAPTER.validate_python
+    try:
+        employees = validate(data)
+        return employees, list(range(len(employees))), {}
+    except ValidationError as e:
+        errors = row_errors(e)
+        if not all(isinstance(index, int) for index in errors):
+            raise  # JSON mal formé, ou pas une liste
+
+    # Second appel sur les seules lignes valides
+    rows = TypeAdapter(list[Any]).validate_json(data) if isinstance(data, (str, bytes)) else data
+    indices = [i for i in range(len(rows)) if i not in errors]
+    employees = EMPLOYEE_LIST_ADAPTER.validate_python([rows[i] for i in indices])
+    return employees, indices, errors
+
+
+@functools.cache
+def column_adapter(name: str) -> TypeAdapter:
+    """Validateur d'une colonne : liste de valeurs du champ `name` de EmployeeInput (type et contraintes)."""
+    info = EmployeeInput.model_fields[name]
+    item = Annotated[info.annotation, *info.metadata] if info.metadata else info.annotation
+    return TypeAdapter(list[item])
+
+
+def validate_column(name: str, values: Sequence) -> tuple[list, dict[int, dict]]:
+    """
+    Valide une colonne en un appel au validateur, avec les règles de EmployeeInput.
+
+    Returns:
+        (values, errors) : les valeurs converties (None pour les valeurs rejetées), et
+        l'erreur de chaque indice rejeté
+    """
+    values = values.tolist() if hasattr(values, "tolist") else list(values)
+    adapter = column_adapter(name)
+    try:
+        return adapter.validate_python(values), {}
+    except ValidationError as e:
+        errors = {
+            err["loc"][0]: {"loc": (name,), "msg": err["msg"], "type": err["type"]}
+            for err in e.errors(include_url=False)
+        }
+
+    # Second appel sur les seules valeurs valides
+    indices = [i for i in range(len(values)) if i not in errors]
+    converted = [None] * len(values)
+    for i, value in zip(indices, adapter.validate_python([values[i] for i in indices])):
+        converted[i] = value
+    return converted, errors
+
+
+def typed_column(annotation, values: list) -> np.ndarray:
+    """Tableau NumPy d'une colonne validée (int64, float64, bool, ou objets pour les chaînes)."""
+    dtype = {int: np.int64, float: np.float64, bool: np.bool_}.get(annotation, object)
+    try:
+        return np.array(values, dtype=dtype)
+    except OverflowError:
+        return np.array(values, dtype=object)  # entier hors de int64, accepté par pydantic
+
+
+def validate_employee_columns(columns: Mapping[str, Sequence]) -> tuple[dict[str, np.ndarray], np.ndarray, dict[int, list[dict]]]:
+    """
+    Valide un lot d'employés au format colonnaire (un tableau par champ de
+    EmployeeInput) : chaque colonne passe en un appel au validateur (pydantic-core),
+    avec exactement les règles de conversion et les bornes de EmployeeInput.
+
+    Returns:
+        (columns, indices, errors) : les colonnes converties restreintes aux lignes
+        valides, l'indice de ces lignes, et les erreurs par indice de ligne rejetée
+    """
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Colonnes de longueurs différentes : {sorted(lengths)}")
+    n_rows = lengths.pop() if lengths else 0
+
+    converted = {}
+    errors = {}
+    for name, info in EmployeeInput.model_fields.items():
+        if name not in columns:
+            if info.is_required():
+                for index in range(n_rows):
+                    errors.setdefault(index, []).append({"loc": (name,), "msg": "Field required", "type": "missing"})
+            converted[name] = [info.default] * n_rows
+            continue
+
+        converted[name], column_errors = validate_column(name, columns[name])
+        for index, error in column_errors.items():
+            errors.setdefault(index, []).append(error)
+
+    indices = np.array([i for i in range(n_rows) if i not in errors], dtype=np.int64)
+    valid = {
+        name: typed_column(EmployeeInput.model_fields[name].annotation, [values[i] for i in indices.tolist()])
+        for name, values in converted.items()
+    }
+    return valid, indices, dict(sorted(errors.items()))
+
+
 class PredictionOutput(BaseModel):
     """Schéma pour la réponse de prédiction."""
     
@@ -106,6 +230,141 @@ class PredictionOutput(BaseModel):
     confidence: float = Field(..., ge=0.0, le=1.0, description="Confiance (0.0-1.0)")
 
 
+class PredictionRecord(BaseModel):
+    """Schéma d'une prédiction archivée (historique)."""
+    
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: int = Field(..., description="ID de la prédiction")
+    id_employee: int = Field(..., description="ID de l'employé")
+    prediction: int = Field(..., description="Prédiction : 0 = reste, 1 = quitte")
+    confidence: float = Field(..., description="Confiance (0.0-1.0)")
+    risk_level: str | None = Field(None, description="Niveau de risque (Haut/Normal)")
+    probability_reste: float | None = Field(None, description="Probabilité de rester")
+    probability_quitte: float | None = Field(None, description="Probabilité de quitter")
+    model_version: str | None = Field(None, description="Version du modèle")
+    created_at: datetime = Field(..., description="Date de la prédiction")
+
+
+class PredictionPage(BaseModel):
+    """Page de l'historique des prédictions (pagination par curseur)."""
+    
+    items: list[PredictionRecord] = Field(..., description="Prédictions, de la plus récente à la plus ancienne")
+    next_cursor: str | None = Field(None, description="Curseur de la page suivante (null si dernière page)")
+
+
+class AtRiskEmployee(BaseModel):
+    """Dernière prédiction d'un employé (table current_risk)."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id_employee: int = Field(..., description="ID de l'employé")
+    departement: str | None = Field(None, description="Département")
+    prediction: int = Field(..., description="Prédiction : 0 = reste, 1 = quitte")
+    confidence: float = Field(..., description="Confiance (0.0-1.0)")
+    probability_quitte: float = Field(..., description="Probabilité de quitter")
+    risk_level: str | None = Field(None, description="Niveau de risque (Haut/Normal)")
+    model_version: str | None = Field(None, description="Version du modèle")
+    prediction_id: int | None = Field(None, description="ID de la prédiction dans l'historique")
+    created_at: datetime = Field(..., description="Date de la prédiction")
+
+
+class FeatureContribution(BaseModel):
+    """Contribution d'une variable d'entrée à la prédiction."""
+    
+    feature: str = Field(..., description="Champ de EmployeeInput")
+    value: bool | int | float | str | None = Field(None, description="Valeur de l'employé")
+    contribution: float = Field(..., description="Contribution au logit de « quitte » (> 0 : augmente le risque)")
+
+
+class ExplanationOutput(BaseModel):
+    """Explication d'une prédiction : valeur de base + contributions par variable."""
+    
+    id_employee: int = Field(..., description="ID de l'employé")
+    prediction: int = Field(..., description="Prédiction : 0 = reste, 1 = quitte")
+    probability_quitte: float = Field(..., description="Probabilité de quitter")
+    base_value: float = Field(..., description="Logit moyen du modèle (avant contributions)")
+    contributions: list[FeatureContribution] = Field(..., description="Par importance décroissante (valeur absolue)")
+
+
+class ExplainBatchRequest(BaseModel):
+    """Lot d'employés à expliquer."""
+    
+    ids: list[int] = Field(..., min_length=1, max_length=5000, description="IDs des employés")
+
+
+class GridRange(BaseModel):
+    """Plage de valeurs numériques (bornes incluses)."""
+
+    start: float = Field(..., description="Première valeur")
+    stop: float = Field(..., description="Dernière valeur (incluse)")
+    step: float = Field(..., gt=0, description="Pas")
+
+    @model_validator(mode="after")
+    def check_bounds(self):
+        if self.stop < self.start:
+            raise ValueError(f"stop ({self.stop}) inférieur à start ({self.start})")
+        return self
+
+
+class WhatIfRequest(BaseModel):
+    """Grille de changements à évaluer pour un employé."""
+
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "grid": {
+                "augementation_salaire_precedente": {"start": 0, "stop": 20, "step": 1},
+                "heure_supplementaires": ["Oui", "Non"],
+                "niveau_hierarchique_poste": [2, 3]
+            },
+            "threshold": 0.5,
+            "top": 5
+        }
+    })
+
+    grid: dict[str, list[bool | int | float | str] | GridRange] = Field(
+        ..., min_length=1, description="Valeurs candidates par champ modifiable (liste ou plage)"
+    )
+    costs: dict[str, float] = Field(default_factory=dict, description="Coûts unitaires remplaçant ceux par défaut")
+    threshold: float = Field(0.5, gt=0.0, lt=1.0, description="Probabilité de départ à passer sous ce seuil")
+    top: int = Field(10, ge=1, le=100, description="Nombre de scénarios renvoyés")
+
+
+class WhatIfScenario(BaseModel):
+    """Combinaison de changements et son effet."""
+
+    changes: dict[str, bool | int | float | str] = Field(..., description="Champs modifiés et nouvelles valeurs")
+    probability_quitte: float = Field(..., description="Probabilité de départ après changement")
+    cost: float = Field(..., description="Coût estimé des changements")
+
+
+class WhatIfOutput(BaseModel):
+    """Résultat de l'analyse what-if."""
+
+    id_employee: int = Field(..., description="ID de l'employé")
+    probability_quitte: float = Field(..., description="Probabilité de départ actuelle")
+    threshold: float = Field(..., description="Seuil visé")
+    scenarios_evaluated: int = Field(..., description="Nombre de variantes prédites")
+    scenarios_below_threshold: int = Field(..., description="Variantes qui passent sous le seuil")
+    scenarios: list[WhatIfScenario] = Field(..., description="Les moins coûteuses d'abord")
+
+
+class PredictRequest(BaseModel):
+    """Variables déjà encodées (sortie du préprocesseur), pour POST /predict."""
+
+    features: list[float] | list[list[float]] = Field(
+        ..., min_length=1, description="Une ligne de variables encodées, ou une liste de lignes"
+    )
+
+
+class PredictResponse(BaseModel):
+    """Prédictions pour les lignes reçues par POST /predict (dans le même ordre)."""
+
+    predictions: list[int] = Field(..., description="Prédictions : 0 = reste, 1 = quitte")
+    confidences: list[float] = Field(..., description="Confiance de chaque prédiction")
+    probabilities_quitte: list[float] = Field(..., description="Probabilité de quitter")
+
+
 class HealthResponse(BaseModel):
     """Schéma pour le healthcheck."""
     
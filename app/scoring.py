@@ -0,0 +1,374 @@
+"""Scoring en masse d'un fichier envoyé en flux (POST /score/csv et /score/columnar)."""
+import csv
+import io
+import logging
+import os
+import tempfile
+import anyio.from_thread
+from app.lazy import lazy_import
+import pyarrow as pa
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from app.models import model_manager
+from app.routes import prepare_features_batch, save_predictions_batch, upsert_employees, compute_risk_level, inference_tier
+from app.schemas import EMPLOYEE_LIST_ADAPTER, validate_employees
+from app.database import get_db
+from app.seed import clean_csv_row
+from app.drift import drift_monitor
+from app.columnar import (
+    EMPLOYEE_INPUT_COLUMNS, MEDIA_TYPES, SCORE_RESULT_SCHEMA, encode_batches, iter_frames
+)
+from app.serialization import dumps_line, streaming_response
+
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["scoring"])
+
+# Nombre de lignes du CSV lues, validées et prédites à la fois
+SCORE_CHUNK_SIZE = 1000
+
+# Taille du tampon de lecture du corps de la requête
+READ_BUFFER_SIZE = 256 * 1024
+
+# Au-delà, un upload Parquet mis en tampon passe de la mémoire au disque
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
+
+# Taille maximale d'un upload Parquet mis en tampon (413 au-delà)
+SCORE_MAX_UPLOAD_BYTES = int(os.getenv("SCORE_MAX_UPLOAD_BYTES", str(1024 * 1024 * 1024)))
+
+RESULT_COLUMNS = SCORE_RESULT_SCHEMA.names
+OUTPUT_FORMATS = "^(csv|ndjson|parquet|arrow)$"
+
+
+class RequestBodyReader(io.RawIOBase):
+    """
+    Fichier binaire en lecture seule branché sur le flux du corps de la requête.
+
+    Il est lu depuis un thread du threadpool (par pandas) : chaque morceau reçu
+    est récupéré sur la boucle asyncio via anyio.from_thread, au fil de l'eau,
+    sans jamais attendre la fin de l'upload.
+    """
+
+    def __init__(self, request: Request):
+        self._chunks = request.stream()
+        self._buffer = memoryview(b"")
+        self._done = False
+
+    def readable(self):
+        return True
+
+    async def _next_chunk(self):
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    def readinto(self, buffer):
+        while not self._buffer and not self._done:
+            chunk = anyio.from_thread.run(self._next_chunk)
+            if chunk is None:
+                self._done = True
+            else:
+                self._buffer = memoryview(chunk)
+
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class UploadStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse qui n'écoute pas la déconnexion du client via receive() :
+    le corps de la requête est encore en cours de lecture par le générateur.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def format_row_errors(errors: list[dict]) -> str:
+    """Message d'erreur compact pour une ligne rejetée par validate_employees."""
+    return "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in errors)
+
+
+def format_validation_error(error: Exception) -> str:
+    """Message d'erreur compact pour une ligne rejetée."""
+    if isinstance(error, ValidationError):
+        return format_row_errors(error.errors())
+    return str(error)
+
+
+def score_records(db: Session, lines: list[int], records: list[dict], persist: bool, tier: str | None = None) -> list[dict]:
+    """Prédit un lot d'employés validés en un seul appel au modèle (palier `tier`)."""
+    df = prepare_features_batch(records)
+    probabilities = model_manager.predict_proba(df, tier)
+    predictions = probabilities.argmax(axis=1)
+    ids = [record["id_employee"] for record in records]
+    drift_monitor.observe_many(records)
+
+    if persist:
+        try:
+            upsert_employees(db, records)
+            save_predictions_batch(db, ids, predictions, probabilities, tier)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    results = []
+    for line, id_employee, prediction, proba in zip(lines, ids, predictions, probabilities):
+        confidence = float(proba.max())
+        results.append({
+            "line": line,
+            "id_employee": id_employee,
+            "prediction": int(prediction),
+            "confidence": confidence,
+            "probability_quitte": float(proba[1]),
+            "risk_level": compute_risk_level(prediction, confidence),
+        })
+    return results
+
+
+def score_chunk(chunk, first_line: int, db: Session, persist: bool, tier: str | None = None) -> list[dict]:
+    """
+    Applique le nettoyage du seeder à un bloc de lignes (DataFrame), valide, prédit,
+    et renvoie les résultats du bloc (dans l'ordre des lignes).
+    """
+    rows, row_lines, results = [], [], []
+    for line, row in enumerate(chunk.to_dict(orient="records"), start=first_line):
+        try:
+            rows.append(clean_csv_row(row))
+            row_lines.append(line)
+        except ValueError as e:
+            results.append({"line": line, "error": format_validation_error(e)})
+
+    # Validation du bloc en un seul appel ; les lignes invalides sont signalées une à une
+    employees, indices, errors = validate_employees(rows)
+    for index, row_errors in errors.items():
+        results.append({"line": row_lines[index], "error": format_row_errors(row_errors)})
+    lines = [row_lines[index] for index in indices]
+    records = EMPLOYEE_LIST_ADAPTER.dump_python(employees)
+
+    if records:
+        results.extend(score_records(db, lines, records, persist, tier))
+    return sorted(results, key=lambda result: result["line"])
+
+
+def score_frames(frames, db: Session, persist: bool, tier: str | None = None):
+    """
+    Produit les résultats de chaque bloc de lignes (voir score_chunk).
+
+    La réponse est déjà partie (statut 200, blocs précédents envoyés et enregistrés) :
+    un bloc en échec (prédiction, écriture en base) n'interrompt pas le flux, chacune
+    de ses lignes produit un résultat avec le champ `error` et le bloc suivant est traité.
+    """
+    line = 0
+    for chunk in frames:
+        first_line = line + 1
+        line += len(chunk)
+        try:
+            results = score_chunk(chunk, first_line, db, persist, tier)
+        except Exception as e:
+            logger.error("Scoring : lignes %d à %d non traitées : %s", first_line, line, e, exc_info=True)
+            results = [{"line": n, "error": f"Lot non traité : {e}"} for n in range(first_line, line + 1)]
+        yield results
+
+
+def score_csv_stream(reader, db: Session, persist: bool, chunk_size: int, tier: str | None = None):
+    """Lit le CSV par blocs de `chunk_size` lignes et les prédit avec score_frames."""
+    try:
+        yield from score_frames(
+            pd.read_csv(reader, chunksize=chunk_size, encoding="utf-8-sig"), db, persist, tier
+        )
+    except pd.errors.EmptyDataError:
+        yield [{"line": 0, "error": "CSV vide"}]
+    except pd.errors.ParserError as e:
+        yield [{"line": 0, "error": f"CSV invalide : {e}"}]
+
+
+def score_columnar_stream(source, input_format: str, db: Session, persist: bool, chunk_size: int, tier: str | None = None):
+    """
+    Lit un fichier Parquet/Arrow par record batches (colonnes utiles uniquement) et les
+    prédit ; `source` est fermé à la fin du flux (tampon temporaire de l'upload Parquet).
+    """
+    try:
+        frames = iter_frames(source, input_format, columns=EMPLOYEE_INPUT_COLUMNS, batch_size=chunk_size)
+        yield from score_frames(frames, db, persist, tier)
+    except (pa.ArrowInvalid, OSError) as e:
+        yield [{"line": 0, "error": f"Fichier {input_format} invalide : {e}"}]
+    finally:
+        source.close()
+
+
+def upload_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Fichier trop volumineux (maximum {SCORE_MAX_UPLOAD_BYTES} octets)"
+    )
+
+
+async def spool_upload(request: Request):
+    """
+    Met le corps de la requête en tampon (en mémoire, puis sur disque au-delà de
+    SPOOL_MAX_SIZE) ; 413 au-delà de SCORE_MAX_UPLOAD_BYTES, annoncés ou reçus.
+    """
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > SCORE_MAX_UPLOAD_BYTES:
+        raise upload_too_large()
+
+    source = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    try:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > SCORE_MAX_UPLOAD_BYTES:
+                raise upload_too_large()
+            source.write(chunk)
+    except BaseException:
+        source.close()
+        raise
+    source.seek(0)
+    return source
+
+
+def render_ndjson(batches):
+    for results in batches:
+        yield b"".join(dumps_line(result) for result in results)
+
+
+def render_csv(batches):
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=RESULT_COLUMNS)
+    writer.writeheader()
+    yield output.getvalue()
+    for results in batches:
+        output.seek(0)
+        output.truncate()
+        writer.writerows(results)
+        yield output.getvalue()
+
+
+def render_columnar(batches, format: str):
+    record_batches = (
+        pa.RecordBatch.from_pylist(results, schema=SCORE_RESULT_SCHEMA) for results in batches
+    )
+    yield from encode_batches(record_batches, SCORE_RESULT_SCHEMA, format)
+
+
+def scoring_response(request: Request, batches, format: str):
+    """
+    Réponse en flux dans le format de sortie demandé ; CSV et NDJSON sont compressés
+    selon Accept-Encoding (Parquet et Arrow le sont déjà en interne).
+    """
+    if format in MEDIA_TYPES:
+        return UploadStreamingResponse(render_columnar(batches, format), media_type=MEDIA_TYPES[format])
+    if format == "csv":
+        return streaming_response(request, render_csv(batches), "text/csv", UploadStreamingResponse)
+    return streaming_response(request, render_ndjson(batches), "application/x-ndjson", UploadStreamingResponse)
+
+
+def negotiate_format(request: Request, format: str | None) -> str:
+    """Format de sortie : paramètre `format`, sinon en-tête Accept, sinon ndjson."""
+    if format is not None:
+        return format
+    accept = request.headers.get("accept", "")
+    if "text/csv" in accept:
+        return "csv"
+    for name, media_type in MEDIA_TYPES.items():
+        if media_type in accept:
+            return name
+    return "ndjson"
+
+
+@router.post(
+    "/score/csv",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"text/csv": {"schema": {"type": "string", "format": "binary"}}},
+        }
+    },
+)
+async def score_csv(
+    request: Request,
+    format: str | None = Query(None, pattern=OUTPUT_FORMATS, description="Format de sortie (par défaut selon Accept, sinon ndjson)"),
+    persist: bool = Query(False, description="Enregistrer les employés et les prédictions en base"),
+    chunk_size: int = Query(SCORE_CHUNK_SIZE, ge=1, le=50_000, description="Nombre de lignes prédites par lot"),
+    tier: str | None = Depends(inference_tier),
+    db: Session = Depends(get_db),
+):
+    """
+    Prédit chaque ligne d'un CSV au format data_merge.csv, envoyé brut dans le corps
+    de la requête (`curl --data-binary @fichier.csv -H "Content-Type: text/csv"`).
+
+    Le fichier est lu et prédit par blocs pendant l'upload et les résultats sont
+    renvoyés au fur et à mesure : la mémoire utilisée ne dépend pas de la taille du
+    fichier. Les lignes invalides produisent un résultat avec le champ `error`.
+    """
+    if model_manager.pipeline is None:
+        raise HTTPException(status_code=503, detail="Modèle non chargé")
+
+    if request.headers.get("content-type", "").startswith("multipart/"):
+        raise HTTPException(
+            status_code=415,
+            detail="Envoyer le CSV brut dans le corps de la requête (Content-Type: text/csv)"
+        )
+
+    reader = io.BufferedReader(RequestBodyReader(request), buffer_size=READ_BUFFER_SIZE)
+    batches = score_csv_stream(reader, db, persist, chunk_size, tier)
+    return scoring_response(request, batches, negotiate_format(request, format))
+
+
+@router.post(
+    "/score/columnar",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                media_type: {"schema": {"type": "string", "format": "binary"}}
+                for media_type in MEDIA_TYPES.values()
+            },
+        }
+    },
+)
+async def score_columnar(
+    request: Request,
+    format: str | None = Query(None, pattern=OUTPUT_FORMATS, description="Format de sortie (par défaut selon Accept, sinon ndjson)"),
+    persist: bool = Query(False, description="Enregistrer les employés et les prédictions en base"),
+    chunk_size: int = Query(SCORE_CHUNK_SIZE, ge=1, le=50_000, description="Nombre de lignes prédites par lot"),
+    tier: str | None = Depends(inference_tier),
+    db: Session = Depends(get_db),
+):
+    """
+    Prédit un fichier d'employés typé au format Parquet
+    (`Content-Type: application/vnd.apache.parquet`) ou Arrow IPC
+    (`Content-Type: application/vnd.apache.arrow.stream`), colonnes du schéma `employees`.
+
+    Un flux Arrow IPC est lu au fil de l'upload ; un fichier Parquet (dont l'index est
+    en fin de fichier) est d'abord mis en tampon sur disque, puis lu par row groups ;
+    il est refusé (413) au-delà de SCORE_MAX_UPLOAD_BYTES.
+    """
+    if model_manager.pipeline is None:
+        raise HTTPException(status_code=503, detail="Modèle non chargé")
+
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith(MEDIA_TYPES["parquet"]):
+        source = await spool_upload(request)
+        batches = score_columnar_stream(source, "parquet", db, persist, chunk_size, tier)
+    elif content_type.startswith("application/vnd.apache.arrow"):
+        source = io.BufferedReader(RequestBodyReader(request), buffer_size=READ_BUFFER_SIZE)
+        batches = score_columnar_stream(source, "arrow", db, persist, chunk_size, tier)
+    else:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Content-Type attendu : {MEDIA_TYPES['parquet']} ou {MEDIA_TYPES['arrow']}"
+        )
+
+    return scoring_response(request, batches, negotiate_format(request, format))
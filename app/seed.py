@@ -15,26 +15,66 @@ sys.path.insert(0, str(project_root))
 
 # Maintenant les imports fonctionnent
 import argparse
-import pandas as pd
+from app.lazy import lazy_import
 from typing import List, Optional
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 from pydantic import ValidationError
 import logging
 import time
+from datetime import datetime
 
 # Importez vos modèles existants
-from app.schemas import EmployeeInput 
+from app.schemas import EmployeeInput, validate_employees
+from app.columnar import detect_format, iter_frames, EMPLOYEE_INPUT_COLUMNS
+from app.database import get_engine
+from app.hashing import employee_content_hash
 # from your_database import Employee, engine  # Vos modèles SQLAlchemy
 
-# Configuration du logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+pd = lazy_import("pandas")
+
 logger = logging.getLogger(__name__)
 
+def clean_csv_row(row_dict: dict) -> dict:
+    """
+    Nettoie une ligne brute du CSV (format data_merge.csv) avant validation.
+    
+    Args:
+        row_dict: Ligne du CSV sous forme de dictionnaire
+        
+    Returns:
+        Le même dictionnaire, nettoyé
+    """
+    # Remplacer les NaN par None ou des valeurs par défaut
+    for key, value in row_dict.items():
+        if pd.isna(value):
+            if key in ['ayant_enfants']:
+                row_dict[key] = False
+            elif isinstance(value, (int, float)):
+                row_dict[key] = 0
+            else:
+                row_dict[key] = None
+    
+    # Convertir ayant_enfants de Y/N à True/False
+    if 'ayant_enfants' in row_dict and isinstance(row_dict['ayant_enfants'], str):
+        row_dict['ayant_enfants'] = row_dict['ayant_enfants'].strip().upper() == 'Y'
+    
+    # Nettoyer augementation_salaire_precedente (retirer le % et convertir en float)
+    if 'augementation_salaire_precedente' in row_dict and isinstance(row_dict['augementation_salaire_precedente'], str):
+        row_dict['augementation_salaire_precedente'] = float(row_dict['augementation_salaire_precedente'].replace('%', '').strip())
+    
+    return row_dict
+
+
+def employee_params(employee: EmployeeInput) -> dict:
+    """Paramètres des requêtes du seeder : données, empreinte du contenu et date de modification."""
+    params = employee.model_dump()
+    params["content_hash"] = employee_content_hash(params)
+    params["updated_at"] = datetime.utcnow()
+    return params
+
+
 class EmployeeSeeder:
     """Classe pour gérer l'import/mise à jour des données employés."""
     
@@ -57,7 +97,8 @@ class EmployeeSeeder:
             try:
                 # Try to connect
                 if self.engine is None:
-                    self.engine = create_engine(self.database_url)
+                    # Moteur partagé avec l'API (même pool si même URL)
+                    self.engine = get_engine(self.database_url)
                     self.SessionLocal = sessionmaker(bind=self.engine)
                 
                 connection = self.engine.connect()
@@ -73,7 +114,12 @@ class EmployeeSeeder:
                     raise
         return False
         
-    def validate_csv_data(self, df: pd.DataFrame) -> List[EmployeeInput]:
+    def migrate(self) -> int:
+        """Met à jour le schéma de la base cible (crée les tables d'une base SQLite vierge)."""
+        from app.migrate import migrate_database
+        return migrate_database(self.engine)
+        
+    def validate_csv_data(self, df: "pd.DataFrame") -> List[EmployeeInput]:
         """
         Valide les données du CSV avec Pydantic.
         
@@ -83,47 +129,28 @@ class EmployeeSeeder:
         Returns:
             Liste des objets EmployeeInput validés
         """
-        validated_data = []
         errors = []
         
         logger.info(f"Validation de {len(df)} enregistrements...")
         
-        for index, row in df.iterrows():
+        # Nettoyage ligne par ligne, puis validation Pydantic du lot en un seul appel
+        rows, lines = [], []
+        for index, row_dict in enumerate(df.to_dict(orient="records")):
             try:
-                # Convertir la ligne en dictionnaire et nettoyer les NaN
-                row_dict = row.to_dict()
-                
-                # Remplacer les NaN par None ou des valeurs par défaut
-                for key, value in row_dict.items():
-                    if pd.isna(value):
-                        if key in ['ayant_enfants']:
-                            row_dict[key] = False
-                        elif isinstance(value, (int, float)):
-                            row_dict[key] = 0
-                        else:
-                            row_dict[key] = None
-                
-                # Convertir ayant_enfants de Y/N à True/False
-                if 'ayant_enfants' in row_dict and isinstance(row_dict['ayant_enfants'], str):
-                    row_dict['ayant_enfants'] = row_dict['ayant_enfants'].strip().upper() == 'Y'
-                
-                # Nettoyer augementation_salaire_precedente (retirer le % et convertir en float)
-                if 'augementation_salaire_precedente' in row_dict and isinstance(row_dict['augementation_salaire_precedente'], str):
-                    row_dict['augementation_salaire_precedente'] = float(row_dict['augementation_salaire_precedente'].replace('%', '').strip())
-                
-                # Validation avec Pydantic
-                employee = EmployeeInput(**row_dict)
-                validated_data.append(employee)
-                
-            except ValidationError as e:
-                error_msg = f"Ligne {index + 1}: {e}"
-                errors.append(error_msg)
-                logger.warning(error_msg)
+                rows.append(clean_csv_row(row_dict))
+                lines.append(index + 1)
             except Exception as e:
                 error_msg = f"Ligne {index + 1}: Erreur inattendue - {e}"
                 errors.append(error_msg)
                 logger.error(error_msg)
         
+        validated_data, _, row_errors = validate_employees(rows)
+        for index, row_error in row_errors.items():
+            details = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in row_error)
+            error_msg = f"Ligne {lines[index]}: {details}"
+            errors.append(error_msg)
+            logger.warning(error_msg)
+        
         logger.info(f"Validation terminée: {len(validated_data)} valides, {len(errors)} erreurs")
         
         if errors:
@@ -166,8 +193,7 @@ class EmployeeSeeder:
                             
                             if existing:
                                 # Mise à jour
-                                self._update_employee(session, employee)
-                                total_updated += 1
+                                total_updated += self._update_employee(session, employee)
                             else:
                                 # Insertion
                                 self._insert_employee(session, employee)
@@ -212,7 +238,7 @@ class EmployeeSeeder:
                 satisfaction_employee_environnement, satisfaction_employee_nature_travail,
                 satisfaction_employee_equipe, satisfaction_employee_equilibre_pro_perso,
                 note_evaluation_precedente, note_evaluation_actuelle, frequence_deplacement,
-                a_quitte_l_entreprise
+                a_quitte_l_entreprise, content_hash, created_at, updated_at
             ) VALUES (
                 :id_employee, :age, :genre, :statut_marital, :ayant_enfants,
                 :distance_domicile_travail, :departement, :poste, :niveau_hierarchique_poste,
@@ -225,14 +251,14 @@ class EmployeeSeeder:
                 :satisfaction_employee_environnement, :satisfaction_employee_nature_travail,
                 :satisfaction_employee_equipe, :satisfaction_employee_equilibre_pro_perso,
                 :note_evaluation_precedente, :note_evaluation_actuelle, :frequence_deplacement,
-                :a_quitte_l_entreprise
+                :a_quitte_l_entreprise, :content_hash, :updated_at, :updated_at
             )
         """)
         
-        session.execute(insert_query, employee.model_dump())
+        session.execute(insert_query, employee_params(employee))
     
-    def _update_employee(self, session, employee: EmployeeInput):
-        """Met à jour un employé existant."""
+    def _update_employee(self, session, employee: EmployeeInput) -> int:
+        """Met à jour un employé existant si son contenu a changé (1 si la ligne a été écrite)."""
         update_query = text("""
             UPDATE employees SET
                 age = :age, genre = :genre, statut_marital = :statut_marital,
@@ -257,11 +283,13 @@ class EmployeeSeeder:
                 note_evaluation_precedente = :note_evaluation_precedente,
                 note_evaluation_actuelle = :note_evaluation_actuelle,
                 frequence_deplacement = :frequence_deplacement,
-                a_quitte_l_entreprise = :a_quitte_l_entreprise
-            WHERE id_employee = :id_employee
+                a_quitte_l_entreprise = :a_quitte_l_entreprise,
+                content_hash = :content_hash, updated_at = :updated_at
+            WHERE id_employee = :id_employee AND content_hash IS DISTINCT FROM :content_hash
         """)
         
-        session.execute(update_query, employee.model_dump())
+        # Ligne inchangée : pas d'écriture, updated_at conservé (pas de rescoring)
+        return session.execute(update_query, employee_params(employee)).rowcount
     
     def get_stats(self) -> dict:
         """Retourne des statistiques sur la base de données."""
@@ -275,8 +303,9 @@ class EmployeeSeeder:
 
 def main():
     """Fonction principale."""
-    parser = argparse.ArgumentParser(description="Import/mise à jour des données employés depuis CSV")
-    parser.add_argument("--csv-file", default="employees.csv", help="Chemin vers le fichier CSV")
+    parser = argparse.ArgumentParser(description="Import/mise à jour des données employés depuis CSV, Parquet ou Arrow")
+    parser.add_argument("--csv-file", "--input-file", dest="csv_file", default="employees.csv", help="Chemin vers le fichier CSV (ou Parquet/Arrow)")
+    parser.add_argument("--format", choices=["auto", "csv", "parquet", "arrow"], default="auto", help="Format du fichier (auto: d'après l'extension)")
     parser.add_argument("--update", action="store_true", help="Met à jour les enregistrements existants")
     parser.add_argument("--batch-size", type=int, default=1000, help="Taille des lots pour l'insertion")
     parser.add_argument("--database-url", default="sqlite:///employees.db", help="URL de la base de données")
@@ -284,17 +313,28 @@ def main():
     
     args = parser.parse_args()
     
-    # Vérifier que le fichier CSV existe
+    # Vérifier que le fichier existe
     csv_path = Path(args.csv_file)
     if not csv_path.exists():
-        logger.error(f"Fichier CSV non trouvé: {csv_path}")
+        logger.error(f"Fichier non trouvé: {csv_path}")
+        sys.exit(1)
+    
+    input_format = detect_format(csv_path) if args.format == "auto" else args.format
+    if input_format not in ("csv", "parquet", "arrow"):
+        logger.error(f"Format d'entrée non supporté: {input_format} ({csv_path})")
         sys.exit(1)
     
     try:
-        # Charger le CSV
-        logger.info(f"Chargement du fichier CSV: {csv_path}")
-        df = pd.read_csv(csv_path)
-        logger.info(f"CSV chargé: {len(df)} lignes, {len(df.columns)} colonnes")
+        if input_format == "csv":
+            # Charger le CSV
+            logger.info(f"Chargement du fichier CSV: {csv_path}")
+            df = pd.read_csv(csv_path)
+            logger.info(f"CSV chargé: {len(df)} lignes, {len(df.columns)} colonnes")
+            frames = [df]
+        else:
+            # Fichier colonnaire typé : lecture par record batches, colonnes utiles uniquement
+            logger.info(f"Lecture du fichier {input_format} par lots de {args.batch_size}: {csv_path}")
+            frames = iter_frames(csv_path, input_format, columns=EMPLOYEE_INPUT_COLUMNS, batch_size=args.batch_size)
         
         # Initialiser le seeder
         logger.info("Initialisation du seeder...")
@@ -303,6 +343,8 @@ def main():
         # Attendre que la base de données soit prête
         logger.info("Attente de la base de données...")
         seeder.wait_for_db()
+        if not args.dry_run:
+            seeder.migrate()
         
         logger.info("Seeder initialisé avec succès")
         
@@ -311,20 +353,24 @@ def main():
         #stats_before = seeder.get_stats()
         #logger.info(f"Employés en base avant import: {stats_before['total_employees']}")
         
-        # Valider les données
-        validated_employees = seeder.validate_csv_data(df)
+        total_valid = 0
+        for df in frames:
+            # Valider les données
+            validated_employees = seeder.validate_csv_data(df)
+            total_valid += len(validated_employees)
+            
+            # Insérer/mettre à jour les données
+            if validated_employees and not args.dry_run:
+                seeder.insert_employees(validated_employees, args.update)
         
-        if not validated_employees:
+        if not total_valid:
             logger.error("Aucune donnée valide trouvée. Arrêt du processus.")
             sys.exit(1)
         
         if args.dry_run:
-            logger.info(f"Mode dry-run: {len(validated_employees)} enregistrements seraient traités")
+            logger.info(f"Mode dry-run: {total_valid} enregistrements seraient traités")
             return
         
-        # Insérer/mettre à jour les données
-        seeder.insert_employees(validated_employees, args.update)
-        
         # Afficher les stats après
         stats_after = seeder.get_stats()
         logger.info(f"Employés en base après import: {stats_after['total_employees']}")
@@ -337,4 +383,5 @@ def main():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     main()
@@ -0,0 +1,142 @@
+"""
+Sérialisation rapide des réponses volumineuses (lots de prédictions, historique).
+
+- JSON encodé par orjson, directement depuis les tableaux NumPy et les lignes SQL,
+  sans modèles Pydantic intermédiaires ;
+- MessagePack si le client le demande (`Accept: application/msgpack`) ;
+- compression zstd ou gzip selon `Accept-Encoding`, au-delà de COMPRESS_MIN_SIZE octets.
+"""
+import gzip
+import os
+import zlib
+import msgpack
+import numpy as np
+import orjson
+import zstandard
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+
+# En dessous de cette taille, la compression coûte plus qu'elle ne rapporte
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+# Encodages supportés, par ordre de préférence
+ENCODINGS = ("zstd", "gzip")
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def negotiate_media_type(request: Request) -> str:
+    """MessagePack si l'en-tête Accept le demande, JSON sinon."""
+    accept = request.headers.get("accept", "")
+    if any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES):
+        return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def negotiate_encoding(request: Request) -> str | None:
+    """Compression acceptée par le client (zstd de préférence, puis gzip), ou None."""
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.lower())
+    if "*" in accepted:
+        return ENCODINGS[0]
+    for encoding in ENCODINGS:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def _orjson_default(value):
+    # orjson ne sérialise nativement que les tableaux contigus (pas les vues p[:, 1])
+    if isinstance(value, np.ndarray):
+        return np.ascontiguousarray(value)
+    raise TypeError(f"Type non sérialisable en JSON : {type(value).__name__}")
+
+
+def _msgpack_default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable en MessagePack : {type(value).__name__}")
+
+
+def dumps(content, media_type: str = JSON_MEDIA_TYPE) -> bytes:
+    """Sérialise `content` (dicts, listes, tableaux et scalaires NumPy, dates)."""
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return msgpack.packb(content, default=_msgpack_default, datetime=False)
+    return orjson.dumps(content, default=_orjson_default, option=ORJSON_OPTIONS)
+
+
+def dumps_line(content) -> bytes:
+    """Une ligne NDJSON."""
+    return orjson.dumps(content, default=_orjson_default, option=ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(chunks, encoding: str):
+    """
+    Compresse un flux morceau par morceau : chaque morceau est vidé (flush) à la
+    suite pour que le client puisse décoder les lignes au fil de l'eau.
+    """
+    if encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        flush_block = lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31 : en-tête gzip
+        flush_block = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        data = compressor.compress(chunk) + flush_block()
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def fast_response(request: Request, content, status_code: int = 200) -> Response:
+    """Réponse JSON (orjson) ou MessagePack, compressée si elle est assez grande."""
+    media_type = negotiate_media_type(request)
+    body = dumps(content, media_type)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+
+    encoding = negotiate_encoding(request)
+    if encoding and len(body) >= COMPRESS_MIN_SIZE:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+
+    return Response(body, status_code=status_code, media_type=media_type, headers=headers)
+
+
+def streaming_response(request: Request, chunks, media_type: str, response_class=StreamingResponse, headers=None):
+    """Réponse en flux, compressée à la volée si le client l'accepte."""
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(request)
+    if encoding:
+        chunks = compress_stream(chunks, encoding)
+        headers["Content-Encoding"] = encoding
+    return response_class(chunks, media_type=media_type, headers=headers)
@@ -0,0 +1,142 @@
+"""
+Mesure du démarrage à froid de l'API.
+
+- `imports` : temps d'import de `app.main` (python -X importtime), par module et par
+  paquet de premier niveau ;
+- `bench` : délai entre le lancement d'uvicorn et la première réponse de /health,
+  sur plusieurs lancements ; code de sortie 1 si la médiane dépasse `--budget`
+  (à brancher en CI pour repérer les régressions).
+
+Usage :
+    python -m app.startup imports --top 20
+    python -m app.startup bench --runs 5 --budget 5
+"""
+import argparse
+import logging
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+# Budget par défaut du délai jusqu'à la première réponse (secondes)
+DEFAULT_BUDGET = float(os.getenv("STARTUP_BUDGET_SECONDS", "10"))
+
+IMPORT_TIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_times(module: str = "app.main") -> list[dict]:
+    """
+    Importe `module` dans un nouvel interpréteur et renvoie le temps d'import de
+    chaque module (secondes) : propre (`self`) et cumulé avec ses dépendances.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            times.append({
+                "module": name,
+                "depth": len(indent) // 2,
+                "self": int(self_us) / 1e6,
+                "cumulative": int(cumulative_us) / 1e6,
+            })
+    return times
+
+
+def import_report(times: list[dict], top: int = 20) -> dict:
+    """Temps total, modules les plus coûteux (cumulé) et temps propre par paquet de premier niveau."""
+    packages = {}
+    for entry in times:
+        package = entry["module"].split(".")[0]
+        packages[package] = packages.get(package, 0.0) + entry["self"]
+    return {
+        "total": sum(entry["self"] for entry in times),
+        "modules": sorted(times, key=lambda entry: entry["cumulative"], reverse=True)[:top],
+        "packages": sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top],
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_response(path: str = "/health", timeout: float = 120.0) -> float:
+    """Lance l'API avec uvicorn et mesure le délai jusqu'à la première réponse 200 sur `path`."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn s'est arrêté (code {process.returncode})")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                pass
+            time.sleep(0.02)
+        raise TimeoutError(f"Pas de réponse de {url} après {timeout} s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    """Fonction principale."""
+    parser = argparse.ArgumentParser(description="Mesure du démarrage à froid de l'API")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    imports = commands.add_parser("imports", help="Temps d'import par module")
+    imports.add_argument("--module", default="app.main", help="Module importé")
+    imports.add_argument("--top", type=int, default=20, help="Nombre de lignes affichées")
+
+    bench = commands.add_parser("bench", help="Délai jusqu'à la première réponse")
+    bench.add_argument("--runs", type=int, default=5, help="Nombre de lancements")
+    bench.add_argument("--path", default="/health", help="Endpoint interrogé")
+    bench.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="Médiane maximale acceptée (secondes)")
+
+    args = parser.parse_args()
+
+    if args.command == "imports":
+        report = import_report(import_times(args.module), args.top)
+        print(f"Import de {args.module} : {report['total'] * 1000:.0f} ms\n")
+        print("Modules (cumulé)")
+        for entry in report["modules"]:
+            print(f"  {entry['cumulative'] * 1000:8.1f} ms  {'  ' * entry['depth']}{entry['module']}")
+        print("\nPaquets (temps propre)")
+        for package, seconds in report["packages"]:
+            print(f"  {seconds * 1000:8.1f} ms  {package}")
+        return
+
+    timings = [time_to_first_response(args.path) for _ in range(args.runs)]
+    median = statistics.median(timings)
+    logger.info(
+        "Première réponse de %s : médiane %.2f s (min %.2f s, max %.2f s, %d lancements), budget %.2f s",
+        args.path, median, min(timings), max(timings), len(timings), args.budget
+    )
+    if median > args.budget:
+        logger.error("Budget de démarrage dépassé : %.2f s > %.2f s", median, args.budget)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,162 @@
+"""
+Analyse « what-if » : quels changements (augmentation, fin des heures supplémentaires,
+promotion...) feraient passer un employé sous le seuil de risque, et à quel coût ?
+
+Toutes les variantes de la grille sont construites en une seule matrice de variables
+et prédites en un seul appel à predict_proba.
+"""
+import math
+from typing import Annotated
+import numpy as np
+from fastapi import APIRouter, HTTPException, Depends
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.orm import Session
+from app.models import model_manager
+from app.routes import prepare_features_batch
+from app.schemas import EmployeeInput, WhatIfRequest, WhatIfOutput, GridRange
+from app.explain import load_employee_records
+from app.database import get_db
+
+router = APIRouter(tags=["explications"])
+
+# Nombre maximal de variantes évaluées par requête
+MAX_SCENARIOS = 100_000
+
+# Champs modifiables et coût par défaut d'un changement : par unité pour les champs
+# numériques, forfaitaire pour les autres
+ACTIONABLE_FIELDS = {
+    "augementation_salaire_precedente": 1.0,        # par point d'augmentation
+    "revenu_mensuel": 0.01,                         # par euro mensuel
+    "heure_supplementaires": 2.0,
+    "niveau_hierarchique_poste": 5.0,               # par niveau (promotion)
+    "annees_depuis_la_derniere_promotion": 1.0,     # par année
+    "nb_formations_suivies": 0.5,                   # par formation
+    "frequence_deplacement": 1.0,
+    "distance_domicile_travail": 0.1,               # par km (mobilité, télétravail)
+    "satisfaction_employee_environnement": 1.0,
+    "satisfaction_employee_equilibre_pro_perso": 1.0,
+}
+
+
+def expand_values(field: str, values) -> list:
+    """Valeurs candidates d'un champ (liste ou plage), validées selon EmployeeInput."""
+    if isinstance(values, GridRange):
+        count = math.floor((values.stop - values.start) / values.step + 1e-9) + 1
+        if count > MAX_SCENARIOS:
+            raise HTTPException(status_code=422, detail=f"{field} : plage de {count} valeurs (maximum {MAX_SCENARIOS})")
+        values = [values.start + i * values.step for i in range(count)]
+    info = EmployeeInput.model_fields[field]
+    try:
+        return TypeAdapter(list[Annotated[info.annotation, info]]).validate_python(values)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"{field} : {e.errors()[0]['msg']}")
+
+
+def change_costs(field: str, values: list, base, unit_cost: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Coût de chaque valeur candidate par rapport à la valeur actuelle, et masque des
+    changements. Valeur actuelle inconnue (NULL en base) : toute valeur est un
+    changement, au coût forfaitaire `unit_cost`.
+    """
+    if base is None:
+        return np.full(len(values), float(unit_cost)), np.ones(len(values), dtype=bool)
+    changed = np.array([value != base for value in values])
+    numeric = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in [*values, base])
+    if numeric:
+        costs = np.abs(np.array(values, dtype=float) - float(base)) * unit_cost
+    else:
+        costs = changed * unit_cost
+    return costs, changed
+
+
+def evaluate_scenarios(record: dict, request: WhatIfRequest):
+    """
+    Construit toutes les combinaisons de la grille et les prédit en un seul lot.
+
+    Returns:
+        (grid, indices, probabilities, costs, n_changes) : les valeurs par champ,
+        l'indice de la valeur de chaque champ pour chaque variante, et les résultats
+    """
+    fields = list(request.grid)
+    grid = {field: expand_values(field, request.grid[field]) for field in fields}
+    sizes = [len(grid[field]) for field in fields]
+    n_scenarios = math.prod(sizes)
+    if n_scenarios > MAX_SCENARIOS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"{n_scenarios} variantes demandées (maximum {MAX_SCENARIOS})"
+        )
+
+    # indices[k, i] : position dans grid[fields[k]] de la valeur de la variante i
+    indices = np.indices(sizes).reshape(len(fields), -1)
+
+    base = prepare_features_batch([record])
+    variants = base.loc[base.index.repeat(n_scenarios)].reset_index(drop=True)
+    costs = np.zeros(n_scenarios)
+    n_changes = np.zeros(n_scenarios, dtype=int)
+
+    for field, field_indices in zip(fields, indices):
+        values = grid[field]
+        # Encodage des valeurs candidates une seule fois, puis indexation vectorisée
+        encoded = prepare_features_batch([{field: value} for value in values])[field].to_numpy()
+        variants[field] = encoded[field_indices]
+
+        unit_cost = request.costs.get(field, ACTIONABLE_FIELDS[field])
+        field_costs, changed = change_costs(field, values, record.get(field), unit_cost)
+        costs += field_costs[field_indices]
+        n_changes += changed[field_indices]
+
+    probabilities = model_manager.predict_proba(variants)[:, 1]
+    return grid, indices, probabilities, costs, n_changes
+
+
+@router.post("/predict_employee/{id_employee}/what-if", response_model=WhatIfOutput)
+def what_if(id_employee: int, request: WhatIfRequest, db: Session = Depends(get_db)):
+    """
+    Évalue une grille de changements sur les champs modifiables d'un employé et renvoie
+    les combinaisons les moins coûteuses qui le font passer sous `threshold`.
+    """
+    if model_manager.pipeline is None:
+        raise HTTPException(status_code=503, detail="Modèle non chargé")
+
+    unknown = sorted(set(request.grid) - set(ACTIONABLE_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Champs non modifiables : {unknown} (autorisés : {sorted(ACTIONABLE_FIELDS)})"
+        )
+
+    records = load_employee_records(db, [id_employee])
+    if id_employee not in records:
+        raise HTTPException(status_code=404, detail="Employé non trouvé")
+    record = records[id_employee]
+
+    current = float(model_manager.predict_proba(prepare_features_batch([record]))[0, 1])
+    grid, indices, probabilities, costs, n_changes = evaluate_scenarios(record, request)
+
+    # Variantes qui changent au moins un champ et passent sous le seuil, les moins chères d'abord
+    feasible = np.flatnonzero((probabilities < request.threshold) & (n_changes > 0))
+    ranked = feasible[np.lexsort((probabilities[feasible], costs[feasible]))][:request.top]
+
+    fields = list(grid)
+    scenarios = []
+    for i in ranked:
+        changes = {}
+        for field, field_indices in zip(fields, indices):
+            value = grid[field][field_indices[i]]
+            if value != record.get(field):
+                changes[field] = value
+        scenarios.append({
+            "changes": changes,
+            "probability_quitte": float(probabilities[i]),
+            "cost": float(costs[i]),
+        })
+
+    return WhatIfOutput(
+        id_employee=id_employee,
+        probability_quitte=current,
+        threshold=request.threshold,
+        scenarios_evaluated=len(probabilities),
+        scenarios_below_threshold=len(feasible),
+        scenarios=scenarios,
+    )
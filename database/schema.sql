@@ -35,7 +35,9 @@ CREATE TABLE IF NOT EXISTS employees (
     domaine_etude VARCHAR(100),
     frequence_deplacement VARCHAR(50),
     a_quitte_l_entreprise VARCHAR(10),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    content_hash VARCHAR(32),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Table des prédictions
@@ -68,6 +70,7 @@ CREATE INDEX idx_predictions_employee ON predictions(id_employee);
 CREATE INDEX idx_predictions_created ON predictions(created_at);
 CREATE INDEX idx_predictions_confidence ON predictions(confidence);
 CREATE INDEX idx_audit_prediction ON prediction_audit(prediction_id);
+CREATE INDEX ix_employees_updated_at ON employees(updated_at);
 
 -- Vue pour les statistiques
 CREATE OR REPLACE VIEW prediction_stats AS
@@ -0,0 +1,116 @@
+import asyncio
+import re
+import pytest
+from fastapi import FastAPI
+from app.admission import ADJUST_EVERY, AdaptiveLimiter, AdmissionMiddleware
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestAdaptiveLimiter:
+    def test_queue_then_admit_in_order(self):
+        async def scenario():
+            limiter = AdaptiveLimiter("test", 1, 1, 1, max_queue=2, max_wait=1)
+            assert await limiter.acquire()
+            waiters = [asyncio.create_task(limiter.acquire()) for _ in range(2)]
+            await asyncio.sleep(0)
+            assert limiter.snapshot()["queued"] == 2
+            limiter.release(0.01)
+            assert await waiters[0]
+            assert not waiters[1].done()
+            limiter.release(0.01)
+            assert await waiters[1]
+            return limiter
+
+        limiter = run(scenario())
+        assert limiter.in_flight == 1 and limiter.admitted == 3
+
+    def test_full_queue_is_rejected_immediately(self):
+        async def scenario():
+            limiter = AdaptiveLimiter("test", 1, 1, 1, max_queue=0, max_wait=1)
+            assert await limiter.acquire()
+            assert not await limiter.acquire()
+            return limiter
+
+        assert run(scenario()).rejected == 1
+
+    def test_wait_deadline_fails_fast(self):
+        async def scenario():
+            limiter = AdaptiveLimiter("test", 1, 1, 1, max_queue=5, max_wait=0.05)
+            assert await limiter.acquire()
+            assert not await limiter.acquire()
+            # La place libérée ne part pas à une requête abandonnée
+            limiter.release(0.01)
+            return limiter
+
+        limiter = run(scenario())
+        assert limiter.timed_out == 1
+        assert limiter.in_flight == 0 and limiter.snapshot()["queued"] == 0
+
+    def test_limit_grows_while_latency_is_stable(self):
+        async def scenario():
+            limiter = AdaptiveLimiter("test", 2, 1, 10)
+            for _ in range(ADJUST_EVERY):
+                await limiter.acquire()
+                await limiter.acquire()
+                limiter.release(0.01)
+                limiter.release(0.01)
+            return limiter
+
+        assert run(scenario()).limit == 3
+
+    def test_limit_shrinks_when_latency_degrades(self):
+        async def scenario():
+            limiter = AdaptiveLimiter("test", 10, 2, 10, tolerance=2.0)
+            for latency in [0.01] * ADJUST_EVERY + [0.2] * ADJUST_EVERY:
+                await limiter.acquire()
+                limiter.release(latency)
+            return limiter
+
+        assert run(scenario()).limit < 10
+
+
+@pytest.fixture
+def slow_app():
+    app = FastAPI()
+
+    @app.post("/predict_employee")
+    async def predict():
+        await asyncio.sleep(0.2)
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    limiter = AdaptiveLimiter("predict_employee", 1, 1, 1, max_queue=1, max_wait=0.05)
+    app.add_middleware(AdmissionMiddleware, limiters=[(re.compile("/predict_employee"), {"POST"}, limiter)])
+    return app, limiter
+
+
+class TestAdmissionMiddleware:
+    def test_overload_returns_503_with_retry_after(self, slow_app):
+        app, limiter = slow_app
+
+        async def scenario():
+            import httpx
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                responses = await asyncio.gather(*[client.post("/predict_employee") for _ in range(4)])
+                health = await asyncio.gather(*[client.get("/health") for _ in range(4)])
+            return responses, health
+
+        responses, health = run(scenario())
+        statuses = sorted(r.status_code for r in responses)
+        assert statuses == [200, 503, 503, 503]
+        rejected = next(r for r in responses if r.status_code == 503)
+        assert int(rejected.headers["retry-after"]) >= 1
+        assert "predict_employee" in rejected.json()["detail"]
+        assert all(r.status_code == 200 for r in health)
+        assert limiter.rejected + limiter.timed_out == 3
+
+    def test_admission_metrics(self, client):
+        client.get("/health")
+        assert "predict_employee" in client.get("/metrics").json()["admission"]
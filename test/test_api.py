@@ -388,4 +388,133 @@ def test_prediction_foreign_key_constraint(db_session):
     
     # Devrait lever une erreur d'intégrité
     with pytest.raises(Exception):  # IntegrityError de SQLAlchemy
-        db_session.commit()
\ No newline at end of file
+        db_session.commit()
+# ==================== Tests de POST /predict (variables encodées) ====================
+
+@pytest.fixture
+def encoded_features(employee_data):
+    """Variables encodées de deux employés (sortie du préprocesseur) et leurs probabilités."""
+    from app.models import model_manager
+    from app.routes import prepare_features_batch
+    female = {**employee_data, "genre": "F", "heure_supplementaires": "Non"}
+    df = prepare_features_batch([employee_data, female])
+    matrix = model_manager.pipeline[:-1].transform(df).astype(np.float32)
+    return matrix, model_manager.predict_proba(df)
+
+def test_predict_features_names(client):
+    """Teste la liste des variables encodées attendues."""
+    response = client.get("/predict/features")
+    assert response.status_code == 200
+    features = response.json()["features"]
+    assert "onehot__departement_Commercial" in features
+
+def test_predict_json_single_row(client, encoded_features):
+    """Teste /predict avec une ligne JSON."""
+    matrix, probabilities = encoded_features
+    response = client.post("/predict", json={"features": matrix[0].tolist()})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["predictions"] == [int(probabilities[0].argmax())]
+    assert data["probabilities_quitte"][0] == pytest.approx(probabilities[0][1], abs=1e-6)
+
+def test_predict_binary_tensor(client, encoded_features):
+    """Teste /predict avec une matrice float32 binaire : mêmes résultats qu'en JSON."""
+    from app.api import encode_tensor
+    matrix, probabilities = encoded_features
+    response = client.post(
+        "/predict", content=encode_tensor(matrix),
+        headers={"Content-Type": "application/octet-stream"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["probabilities_quitte"] == pytest.approx(probabilities[:, 1].tolist(), abs=1e-6)
+    assert data == client.post("/predict", json={"features": matrix.tolist()}).json()
+
+def test_predict_binary_size_mismatch(client, encoded_features):
+    """Teste qu'un corps binaire tronqué est refusé."""
+    from app.api import encode_tensor
+    matrix, _ = encoded_features
+    response = client.post(
+        "/predict", content=encode_tensor(matrix)[:-4],
+        headers={"Content-Type": "application/octet-stream"}
+    )
+    assert response.status_code == 422
+
+def test_predict_wrong_feature_count(client):
+    """Teste qu'un mauvais nombre de variables est refusé."""
+    response = client.post("/predict", json={"features": [1.0, 2.0, 3.0]})
+    assert response.status_code == 422
+    assert "variables encodées" in response.json()["detail"]
+
+def test_predict_invalid_json(client):
+    """Teste qu'un corps JSON invalide est refusé."""
+    response = client.post("/predict", json={"features": ["a"]})
+    assert response.status_code == 422
+
+def test_predict_tiers(client):
+    """Teste la liste des paliers d'inférence."""
+    data = client.get("/predict/tiers").json()
+    assert data["default"] == "full"
+    assert data["tiers"]["full"] == 0 and data["tiers"]["fast"] > 0
+
+def test_predict_fast_tier(client, encoded_features):
+    """Teste /predict?tier=fast : premiers arbres seulement, probabilités différentes du modèle complet."""
+    from app.models import model_manager
+    matrix, probabilities = encoded_features
+    response = client.post("/predict?tier=fast", json={"features": matrix.tolist()})
+    assert response.status_code == 200
+    expected = model_manager.predict_encoded(matrix, "fast")[:, 1]
+    assert response.json()["probabilities_quitte"] == pytest.approx(expected.tolist(), abs=1e-6)
+    assert not np.allclose(expected, probabilities[:, 1])
+
+def test_predict_unknown_tier(client, encoded_features):
+    """Teste qu'un palier inconnu est refusé."""
+    matrix, _ = encoded_features
+    response = client.post("/predict?tier=turbo", json={"features": matrix[0].tolist()})
+    assert response.status_code == 422
+    assert "turbo" in response.json()["detail"]
+
+def test_predict_employee_fast_tier_version(client, db_session, employee_data):
+    """Teste qu'une prédiction d'un palier tronqué est archivée sous une version suffixée."""
+    client.post("/predict_employee?tier=fast", json=employee_data)
+    client.get("/predict_employee/9999")
+    versions = [p.model_version for p in db_session.query(Prediction).filter_by(id_employee=9999).order_by(Prediction.id)]
+    assert versions == ["1.0.0+fast", "1.0.0"]
+
+def test_predict_too_many_rows(client, encoded_features, monkeypatch):
+    """Teste qu'un lot au-delà de MAX_ROWS est refusé."""
+    from app.api import encode_tensor
+    monkeypatch.setattr("app.api.MAX_ROWS", 1)
+    matrix, _ = encoded_features
+    response = client.post("/predict", content=encode_tensor(matrix), headers={"Content-Type": "application/octet-stream"})
+    assert response.status_code == 422
+
+def test_predict_does_not_block_event_loop(encoded_features, monkeypatch):
+    """Teste que /health répond pendant une inférence longue de POST /predict."""
+    import asyncio
+    import time
+    import httpx
+    from app.main import app
+    from app.models import model_manager
+    matrix, _ = encoded_features
+    predict_encoded = model_manager.predict_encoded
+
+    def slow_predict(features, tier=None):
+        time.sleep(0.5)
+        return predict_encoded(features, tier)
+
+    monkeypatch.setattr(model_manager, "predict_encoded", slow_predict)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            start = time.perf_counter()
+            prediction = asyncio.create_task(client.post("/predict", json={"features": matrix.tolist()}))
+            await asyncio.sleep(0.1)
+            health = await client.get("/health")
+            return health, time.perf_counter() - start, await prediction
+
+    health, health_seconds, prediction = asyncio.run(scenario())
+    assert health.status_code == 200 and prediction.status_code == 200
+    # Répond pendant l'inférence (0,5 s), pas après
+    assert health_seconds < 0.4
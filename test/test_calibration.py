@@ -0,0 +1,27 @@
+import pytest
+from app.calibration import format_report, load_labeled, calibration_report
+
+
+@pytest.fixture(scope="module")
+def labeled():
+    records, labels = load_labeled()
+    return records[:200], labels[:200]
+
+
+def test_load_labeled():
+    records, labels = load_labeled()
+    assert len(records) == len(labels) == 1470
+    assert 0.1 < labels.mean() < 0.2
+
+
+def test_report(labeled, monkeypatch):
+    monkeypatch.setattr("app.calibration.LATENCY_REPEATS", 3)
+    monkeypatch.setattr("app.calibration.BATCH_ROWS", 500)
+    report = calibration_report(*labeled, {"fast": 10, "full": 0})
+    fast, full = report["tiers"]["fast"], report["tiers"]["full"]
+    assert list(report["tiers"]) == ["fast", "full"]
+    assert full["rounds"] == report["total_rounds"] and fast["rounds"] == 10
+    assert full["agreement_with_full"] == 1.0 and full["mean_abs_probability_diff"] == 0
+    assert fast["mean_abs_probability_diff"] > 0
+    assert full["log_loss"] < fast["log_loss"]
+    assert "fast" in format_report(report)
@@ -0,0 +1,144 @@
+"""Tests pour le module coalescing.py (requêtes identiques simultanées)"""
+import asyncio
+import time
+import httpx
+import pytest
+from app.coalescing import SingleFlight
+from app.hashing import payload_fingerprint
+from app.main import app
+from app.models import Employee, Prediction, model_manager
+
+
+def slow(value, delay=0.1):
+    time.sleep(delay)
+    return value
+
+
+class TestSingleFlight:
+    """Tests unitaires de SingleFlight."""
+    
+    def test_concurrent_calls_share_result(self):
+        flights = SingleFlight()
+        
+        async def scenario():
+            return await asyncio.gather(*(flights.run("k", slow, object()) for _ in range(5)))
+        
+        results = asyncio.run(scenario())
+        assert all(result is results[0] for result in results)
+        assert flights.snapshot() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+    
+    def test_distinct_keys_not_coalesced(self):
+        flights = SingleFlight()
+        
+        async def scenario():
+            return await asyncio.gather(flights.run("a", slow, 1), flights.run("b", slow, 2))
+        
+        assert asyncio.run(scenario()) == [1, 2]
+        assert flights.snapshot()["executed"] == 2
+    
+    def test_exception_shared(self):
+        flights = SingleFlight()
+        
+        def fail():
+            time.sleep(0.1)
+            raise ValueError("boom")
+        
+        async def scenario():
+            return await asyncio.gather(*(flights.run("k", fail) for _ in range(3)), return_exceptions=True)
+        
+        errors = asyncio.run(scenario())
+        assert all(isinstance(error, ValueError) for error in errors)
+        assert flights.snapshot()["in_flight"] == 0
+    
+    def test_cancelled_leader_does_not_fail_followers(self):
+        """Un appelant annulé (client déconnecté) n'annule pas le calcul partagé."""
+        flights = SingleFlight()
+        
+        async def scenario():
+            leader = asyncio.ensure_future(flights.run("k", slow, 42, 0.2))
+            await asyncio.sleep(0.05)
+            follower = asyncio.ensure_future(flights.run("k", slow, 0))
+            await asyncio.sleep(0.05)
+            leader.cancel()
+            return await asyncio.gather(leader, follower, return_exceptions=True)
+        
+        leader, follower = asyncio.run(scenario())
+        assert isinstance(leader, asyncio.CancelledError)
+        assert follower == 42
+        assert flights.snapshot() == {"executed": 1, "coalesced": 1, "in_flight": 0}
+    
+    def test_sequential_calls_not_coalesced(self):
+        """Le résultat n'est pas mis en cache : un appel ultérieur recalcule."""
+        flights = SingleFlight()
+        asyncio.run(flights.run("k", slow, 1, 0))
+        asyncio.run(flights.run("k", slow, 1, 0))
+        assert flights.snapshot()["executed"] == 2
+    
+    def test_payload_fingerprint_order_independent(self):
+        assert payload_fingerprint({"a": 1, "b": 2}) == payload_fingerprint({"b": 2, "a": 1})
+        assert payload_fingerprint({"a": 1}) != payload_fingerprint({"a": 2})
+
+
+class TestCoalescedEndpoints:
+    """Des requêtes identiques simultanées ne produisent qu'une prédiction archivée."""
+    
+    @pytest.fixture
+    def slow_model(self, monkeypatch):
+        """Inférence ralentie pour que les requêtes se chevauchent."""
+        predict = model_manager.predict
+        monkeypatch.setattr(model_manager, "predict", lambda df, tier=None: slow(predict(df, tier), 0.2))
+    
+    def send_concurrently(self, n, method, url, **kwargs):
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await asyncio.gather(*(client.request(method, url, **kwargs) for _ in range(n)))
+        return asyncio.run(scenario())
+    
+    def test_get_by_id(self, db_session, employee_data, slow_model):
+        db_session.add(Employee(**{**employee_data, "id_employee": 7730}))
+        db_session.commit()
+        
+        responses = self.send_concurrently(5, "GET", "/predict_employee/7730")
+        assert [r.status_code for r in responses] == [200] * 5
+        assert len({r.text for r in responses}) == 1
+        assert db_session.query(Prediction).filter_by(id_employee=7730).count() == 1
+    
+    def test_post_same_payload(self, client, db_session, employee_data, slow_model):
+        before = client.get("/metrics").json()["single_flight"]["coalesced"]
+        payload = {**employee_data, "id_employee": 7731}
+        
+        responses = self.send_concurrently(4, "POST", "/predict_employee", json=payload)
+        assert [r.status_code for r in responses] == [200] * 4
+        assert db_session.query(Prediction).filter_by(id_employee=7731).count() == 1
+        assert client.get("/metrics").json()["single_flight"]["coalesced"] == before + 3
+    
+    def test_cancelled_leader_request(self, db_session, employee_data, slow_model, monkeypatch):
+        """Client du premier appel déconnecté : le calcul partagé garde sa propre session."""
+        from app import database
+        db_session.add(Employee(**{**employee_data, "id_employee": 7732}))
+        db_session.commit()
+        sessions = []
+        session_factory = database.SessionLocal
+        
+        def own_session():
+            sessions.append(session_factory())
+            return sessions[-1]
+        
+        monkeypatch.setattr(database, "SessionLocal", own_session)
+        
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                leader = asyncio.ensure_future(client.get("/predict_employee/7732"))
+                await asyncio.sleep(0.05)
+                follower = asyncio.ensure_future(client.get("/predict_employee/7732"))
+                await asyncio.sleep(0.05)
+                leader.cancel()
+                return await asyncio.gather(leader, follower, return_exceptions=True)
+        
+        leader, follower = asyncio.run(scenario())
+        assert isinstance(leader, asyncio.CancelledError)
+        assert follower.status_code == 200
+        assert len(sessions) == 1
+        assert db_session.query(Prediction).filter_by(id_employee=7732).count() == 1
@@ -0,0 +1,77 @@
+"""Tests pour le module columnar.py"""
+import io
+import os
+import pytest
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.columnar import (
+    EMPLOYEE_SCHEMA, PREDICTION_SCHEMA, convert_csv, detect_format,
+    encode_batches, iter_frames, iter_record_batches, rows_to_batch
+)
+from app.models import Employee, Prediction
+
+
+class TestSchemas:
+    """Tests des schémas Arrow."""
+
+    def test_employee_schema_mirrors_table(self):
+        """Le schéma reprend toutes les colonnes de la table employees."""
+        assert EMPLOYEE_SCHEMA.names == [col.name for col in Employee.__table__.columns]
+        assert EMPLOYEE_SCHEMA.field("ayant_enfants").type == pa.bool_()
+        assert EMPLOYEE_SCHEMA.field("augementation_salaire_precedente").type == pa.float64()
+
+    def test_prediction_schema_mirrors_table(self):
+        """Le schéma reprend toutes les colonnes de la table predictions."""
+        assert PREDICTION_SCHEMA.names == [col.name for col in Prediction.__table__.columns]
+        assert PREDICTION_SCHEMA.field("created_at").type == pa.timestamp("us")
+
+    def test_detect_format(self):
+        """Détection du format d'après l'extension."""
+        assert detect_format("data.parquet") == "parquet"
+        assert detect_format("data.ARROW") == "arrow"
+        assert detect_format("data_merge.csv") == "csv"
+        assert detect_format("data.jsonl") == "ndjson"
+        assert detect_format("data.txt") == "csv"
+
+
+class TestReadWrite:
+    """Tests de lecture/écriture par record batches."""
+
+    @pytest.mark.parametrize("extension", ["parquet", "arrow"])
+    def test_convert_csv_roundtrip(self, tmp_path, extension):
+        """Le CSV converti est typé et nettoyé (Y/N et % supprimés)."""
+        output = tmp_path / f"employees.{extension}"
+        total = convert_csv("data_merge.csv", output, batch_size=500)
+        assert total == 1470
+
+        frames = list(iter_frames(output, extension, columns=["id_employee", "ayant_enfants", "augementation_salaire_precedente"], batch_size=500))
+        assert sum(len(frame) for frame in frames) == 1470
+        first = frames[0]
+        assert list(first.columns) == ["id_employee", "ayant_enfants", "augementation_salaire_precedente"]
+        assert first["ayant_enfants"].dtype == bool
+        assert first["augementation_salaire_precedente"].iloc[0] == 11.0
+
+    def test_parquet_smaller_than_csv(self, tmp_path):
+        """Le fichier Parquet est nettement plus petit que le CSV d'origine."""
+        output = tmp_path / "employees.parquet"
+        convert_csv("data_merge.csv", output)
+        assert output.stat().st_size * 3 < os.path.getsize("data_merge.csv")
+
+    def test_projection_ignores_missing_columns(self, tmp_path):
+        """Les colonnes demandées absentes du fichier sont ignorées."""
+        output = tmp_path / "employees.parquet"
+        convert_csv("data_merge.csv", output)
+        batch = next(iter_record_batches(output, "parquet", columns=["age", "inexistante"]))
+        assert batch.schema.names == ["age"]
+
+    @pytest.mark.parametrize("format", ["parquet", "arrow"])
+    def test_encode_batches_streams(self, format):
+        """encode_batches produit un flux relisible, batch par batch."""
+        schema = pa.schema([("id", pa.int32()), ("label", pa.string())])
+        batches = [rows_to_batch([(i, f"r{i}"), (i + 10, None)], schema) for i in range(3)]
+        chunks = list(encode_batches(iter(batches), schema, format))
+        assert len(chunks) >= 3
+
+        data = io.BytesIO(b"".join(chunks))
+        rows = sum(batch.num_rows for batch in iter_record_batches(data, format))
+        assert rows == 6
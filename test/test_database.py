@@ -26,3 +26,134 @@ def test_get_db():
         next(db_gen)
     except StopIteration:
         pass  # Comportement attendu
+
+
+class TestConnectionPool:
+    """Tests pour la configuration et l'instrumentation du pool."""
+    
+    def test_engine_uses_instrumented_pool(self):
+        """Le moteur de l'application utilise le pool instrumenté."""
+        from app.database import engine, InstrumentedQueuePool, DB_POOL_SIZE
+        assert isinstance(engine.pool, InstrumentedQueuePool)
+        assert engine.pool.size() == DB_POOL_SIZE
+    
+    def test_get_engine_is_shared(self):
+        """Le seeder et l'API partagent le même moteur pour la même URL."""
+        from app.database import engine, get_engine, DATABASE_URL
+        assert get_engine(DATABASE_URL) is engine
+    
+    def test_pool_size_from_environment(self, monkeypatch):
+        """La taille du pool se configure par l'environnement."""
+        import app.database as database
+        monkeypatch.setattr(database, "DB_POOL_SIZE", 2)
+        monkeypatch.setattr(database, "DB_MAX_OVERFLOW", 1)
+        test_engine = database.create_db_engine(database.DATABASE_URL)
+        try:
+            assert test_engine.pool.size() == 2
+            assert database.pool_status(test_engine)["max_overflow"] == 1
+        finally:
+            test_engine.dispose()
+    
+    def test_external_pooler_mode(self, monkeypatch):
+        """Le mode external (PgBouncer) désactive le pool local."""
+        import app.database as database
+        from sqlalchemy.pool import NullPool
+        monkeypatch.setattr(database, "DB_POOL_MODE", "external")
+        test_engine = database.create_db_engine(database.DATABASE_URL)
+        assert isinstance(test_engine.pool, NullPool)
+    
+    def test_idle_pre_ping(self, monkeypatch):
+        """Le pre-ping n'a lieu qu'après une période d'inactivité."""
+        import app.database as database
+        monkeypatch.setattr(database, "DB_POOL_PRE_PING", "idle")
+        
+        monkeypatch.setattr(database, "DB_POOL_PRE_PING_IDLE", 3600)
+        test_engine = database.create_db_engine(database.DATABASE_URL)
+        for _ in range(3):
+            with test_engine.connect():
+                pass
+        assert test_engine.pool.metrics.pings == 0
+        test_engine.dispose()
+        
+        monkeypatch.setattr(database, "DB_POOL_PRE_PING_IDLE", 0)
+        test_engine = database.create_db_engine(database.DATABASE_URL)
+        for _ in range(3):
+            with test_engine.connect():
+                pass
+        assert test_engine.pool.metrics.pings == 2
+        test_engine.dispose()
+    
+    def test_checkout_wait_is_measured(self):
+        """Chaque checkout alimente l'histogramme des temps d'attente."""
+        from app.database import engine, pool_status
+        before = pool_status(engine)["checkout_wait_seconds"]["count"]
+        with engine.connect():
+            pass
+        status = pool_status(engine)
+        assert status["checkout_wait_seconds"]["count"] == before + 1
+        assert status["checked_out"] >= 0
+
+
+class TestSQLiteMode:
+    """Tests pour le mode SQLite embarqué."""
+    
+    def test_pragmas_applied(self, sqlite_engine):
+        """WAL, synchronous NORMAL, clés étrangères et busy_timeout sur chaque connexion."""
+        with sqlite_engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+            assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+            assert conn.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+            assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() > 0
+    
+    def test_concurrent_writers_are_serialized(self, sqlite_engine):
+        """Des écritures simultanées depuis plusieurs threads passent toutes, sans « database is locked »."""
+        import threading
+        from sqlalchemy import text
+        errors = []
+        
+        def write(worker):
+            try:
+                for i in range(50):
+                    with sqlite_engine.connect() as conn:
+                        conn.execute(text("SELECT count(*) FROM employees")).scalar()
+                        conn.execute(text("INSERT INTO employees (id_employee, age, genre) VALUES (:id, 30, 'F')"),
+                                     {"id": worker * 1000 + i})
+                        conn.commit()
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert errors == []
+        with sqlite_engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM employees")).scalar() == 400
+    
+    def test_writer_lock_released_on_rollback(self, sqlite_engine):
+        """Une transaction annulée (ou rendue au pool sans commit) libère le verrou d'écriture."""
+        from sqlalchemy import text
+        with sqlite_engine.connect() as conn:
+            conn.execute(text("INSERT INTO employees (id_employee, age, genre) VALUES (1, 30, 'F')"))
+        with sqlite_engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM employees")).scalar() == 0
+            conn.execute(text("INSERT INTO employees (id_employee, age, genre) VALUES (2, 30, 'F')"))
+            conn.commit()
+    
+    def test_second_writer_in_same_thread_times_out(self, tmp_path, monkeypatch):
+        """Deux connexions qui écrivent dans le même thread : la seconde échoue après le délai, sans blocage."""
+        from sqlalchemy import text
+        from sqlalchemy.exc import OperationalError
+        from app import database
+        monkeypatch.setitem(database.SQLITE_PRAGMAS, "busy_timeout", 100)
+        engine = database.create_db_engine(f"sqlite:///{tmp_path / 'locked.db'}")
+        with engine.connect() as first, engine.connect() as second:
+            first.execute(text("CREATE TABLE t (x INTEGER)"))
+            first.commit()
+            first.execute(text("INSERT INTO t VALUES (1)"))
+            with pytest.raises(OperationalError, match="locked"):
+                second.execute(text("INSERT INTO t VALUES (2)"))
+            first.commit()
+        engine.dispose()
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+from app.drift import DriftMonitor, NUMERIC_FEATURES, OTHER_CATEGORY, ReferenceProfile, drift_monitor
+from app.lazy import lazy_import
+from app.seed import clean_csv_row
+
+pd = lazy_import("pandas")
+
+
+@pytest.fixture(scope="module")
+def reference_rows():
+    return [clean_csv_row(row) for row in pd.read_csv("data_merge.csv").to_dict(orient="records")]
+
+
+@pytest.fixture
+def monitor():
+    return DriftMonitor(flush_size=64)
+
+
+class TestDriftMonitor:
+    def test_training_data_does_not_drift(self, monitor, reference_rows):
+        monitor.observe_many(reference_rows)
+        report = monitor.report()
+        assert report["observations"] == len(reference_rows) == report["reference_rows"]
+        assert report["drifted_features"] == []
+        assert all(entry["psi"] < 1e-9 for entry in report["features"].values())
+
+    def test_streaming_moments_match_numpy(self, monitor, reference_rows):
+        for row in reference_rows[:500]:
+            monitor.observe(row)
+        report = monitor.report()["features"]["revenu_mensuel"]
+        values = np.array([row["revenu_mensuel"] for row in reference_rows[:500]], dtype=float)
+        assert report["mean"] == pytest.approx(values.mean())
+        assert report["std"] == pytest.approx(values.std())
+        assert (report["min"], report["max"]) == (values.min(), values.max())
+
+    def test_shifted_feature_is_reported(self, monitor, reference_rows):
+        monitor.observe_many([{**row, "revenu_mensuel": row["revenu_mensuel"] * 3} for row in reference_rows])
+        report = monitor.report()
+        assert report["drifted_features"] == ["revenu_mensuel"]
+        entry = report["features"]["revenu_mensuel"]
+        assert entry["ks"] > 0.5
+        assert entry["p50"] == pytest.approx(3 * entry["reference_p50"], rel=0.2)
+        assert report["features"]["age"]["status"] == "stable"
+
+    def test_unknown_categories_are_grouped(self, monitor, reference_rows):
+        monitor.observe_many([{**row, "departement": f"Nouveau {i}"} for i, row in enumerate(reference_rows)])
+        entry = monitor.report()["features"]["departement"]
+        assert entry["frequencies"] == {OTHER_CATEGORY: 1.0}
+        assert entry["status"] == "drift"
+
+    def test_too_few_observations(self, monitor, reference_rows):
+        monitor.observe_many(reference_rows[:10])
+        report = monitor.report()
+        assert report["observations"] == 10
+        assert {entry["status"] for entry in report["features"].values()} == {"insufficient_data"}
+
+    def test_missing_values_are_skipped(self, monitor, reference_rows):
+        """Valeurs absentes (colonnes nullables lues en base) : comptées à part, sans NaN."""
+        rows = [{**row, "revenu_mensuel": None} if i % 3 == 0 else row for i, row in enumerate(reference_rows[:300])]
+        monitor.observe_many(rows)
+        entry = monitor.report()["features"]["revenu_mensuel"]
+        values = np.array([row["revenu_mensuel"] for row in rows if row["revenu_mensuel"] is not None], dtype=float)
+        assert entry["missing"] == 100
+        assert entry["mean"] == pytest.approx(values.mean())
+        assert entry["std"] == pytest.approx(values.std())
+        assert (entry["min"], entry["max"]) == (values.min(), values.max())
+        assert not np.isnan(entry["psi"])
+
+    def test_discrete_feature_bins(self, reference_rows):
+        reference = ReferenceProfile(pd.DataFrame(reference_rows))
+        edges = reference.numeric["satisfaction_employee_equipe"]["edges"]
+        assert len(edges) == len(set(edges)) <= 4
+        assert set(reference.numeric) == set(NUMERIC_FEATURES)
+
+    def test_missing_reference(self, tmp_path):
+        monitor = DriftMonitor(reference_path=tmp_path / "absent.csv")
+        with pytest.raises(RuntimeError):
+            monitor.report()
+
+
+class TestDriftEndpoint:
+    def test_predictions_feed_drift(self, client, employee_data):
+        drift_monitor.reset()
+        assert client.post("/predict_employee", json=employee_data).status_code == 200
+        response = client.get("/drift")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["observations"] == 1
+        assert body["features"]["age"]["mean"] == employee_data["age"]
+        assert body["features"]["genre"]["frequencies"] == {"M": 1.0}
+        drift_monitor.reset()
+
+    def test_predictions_by_id_feed_drift(self, client, employee_data):
+        assert client.post("/predict_employee", json=employee_data).status_code == 200
+        drift_monitor.reset()
+        assert client.get("/predict_employee/9999").status_code == 200
+        body = client.get("/drift").json()
+        assert body["observations"] == 1
+        assert body["features"]["age"]["mean"] == employee_data["age"]
+        drift_monitor.reset()
+
+    def test_unobserved_predictions_are_counted(self, client, employee_data, monkeypatch):
+        """Prédictions sans valeurs brutes (magasin de variables, POST /predict) : comptées dans unobserved."""
+        from app.feature_store import feature_store
+        from app.models import model_manager
+        from app.routes import prepare_features
+        assert client.post("/predict_employee", json=employee_data).status_code == 200
+        encoded = model_manager.pipeline[:-1].transform(prepare_features(employee_data))
+        monkeypatch.setattr(feature_store, "get", lambda id_employee: encoded)
+        drift_monitor.reset()
+        assert client.get("/predict_employee/9999").status_code == 200
+        assert client.post("/predict", json={"features": encoded.tolist()}).status_code == 200
+        body = client.get("/drift").json()
+        assert (body["observations"], body["unobserved"]) == (0, 2)
+        drift_monitor.reset()
@@ -0,0 +1,92 @@
+"""Tests pour le module explain.py"""
+import math
+import pytest
+from app.explain import explanation_cache
+
+
+@pytest.fixture
+def employees(client, employee_data):
+    """Enregistre trois employés via POST /predict_employee."""
+    ids = [7700, 7701, 7702]
+    for i, id_employee in enumerate(ids):
+        data = {**employee_data, "id_employee": id_employee, "age": 25 + 10 * i}
+        assert client.post("/predict_employee", json=data).status_code == 200
+    return ids
+
+
+class TestExplain:
+    """Tests pour GET /predict_employee/{id}/explain."""
+    
+    def test_contributions_sum_to_probability(self, client, employees):
+        """Valeur de base + contributions = logit de la probabilité prédite."""
+        data = client.get(f"/predict_employee/{employees[0]}/explain").json()
+        logit = data["base_value"] + sum(c["contribution"] for c in data["contributions"])
+        assert 1 / (1 + math.exp(-logit)) == pytest.approx(data["probability_quitte"], abs=1e-5)
+        
+        prediction = client.get(f"/predict_employee/{employees[0]}").json()
+        assert data["prediction"] == prediction["prediction"]
+    
+    def test_contributions_use_input_fields(self, client, employees, employee_data):
+        """Les contributions sont rapportées aux champs de EmployeeInput, triées par importance."""
+        data = client.get(f"/predict_employee/{employees[0]}/explain").json()
+        features = [c["feature"] for c in data["contributions"]]
+        assert set(features) <= set(employee_data)
+        assert "departement" in features and "heure_supplementaires" in features
+        magnitudes = [abs(c["contribution"]) for c in data["contributions"]]
+        assert magnitudes == sorted(magnitudes, reverse=True)
+        departement = next(c for c in data["contributions"] if c["feature"] == "departement")
+        assert departement["value"] == employee_data["departement"]
+    
+    def test_top(self, client, employees):
+        """Le paramètre top limite le nombre de contributions."""
+        data = client.get(f"/predict_employee/{employees[0]}/explain", params={"top": 3}).json()
+        assert len(data["contributions"]) == 3
+    
+    def test_cache(self, client, employees):
+        """Une deuxième explication du même employé est servie par le cache."""
+        explanation_cache.clear()
+        client.get(f"/predict_employee/{employees[0]}/explain")
+        client.get(f"/predict_employee/{employees[0]}/explain")
+        assert explanation_cache.hits == 1
+        assert explanation_cache.misses == 1
+    
+    def test_cache_per_model_version(self, client, employees, monkeypatch):
+        """Un autre modèle (autre version) ne réutilise pas les explications du précédent."""
+        from app.models import model_manager
+        explanation_cache.clear()
+        client.get(f"/predict_employee/{employees[0]}/explain")
+        monkeypatch.setattr(model_manager, "version", "2.0.0")
+        client.get(f"/predict_employee/{employees[0]}/explain")
+        assert explanation_cache.hits == 0
+        assert explanation_cache.misses == 2
+    
+    def test_unknown_employee(self, client):
+        """Un employé inexistant renvoie 404."""
+        assert client.get("/predict_employee/99999/explain").status_code == 404
+
+
+class TestExplainBatch:
+    """Tests pour POST /predict_employee/explain."""
+    
+    def test_batch_matches_single(self, client, employees):
+        """Le lot donne les mêmes explications, dans l'ordre demandé."""
+        explanation_cache.clear()
+        batch = client.post("/predict_employee/explain", json={"ids": employees[::-1]}).json()
+        assert [item["id_employee"] for item in batch] == employees[::-1]
+        assert explanation_cache.misses == 3
+        
+        single = client.get(f"/predict_employee/{employees[0]}/explain").json()
+        assert batch[-1] == single
+    
+    def test_batch_approximate(self, client, employees):
+        """L'approximation de Saabas reste cohérente avec la probabilité."""
+        batch = client.post("/predict_employee/explain?approximate=true", json={"ids": employees}).json()
+        exact = client.post("/predict_employee/explain", json={"ids": employees}).json()
+        for approx_item, exact_item in zip(batch, exact):
+            assert approx_item["probability_quitte"] == pytest.approx(exact_item["probability_quitte"], abs=1e-5)
+    
+    def test_batch_unknown_employee(self, client, employees):
+        """Un ID inconnu dans le lot renvoie 404."""
+        response = client.post("/predict_employee/explain", json={"ids": [employees[0], 99999]})
+        assert response.status_code == 404
+        assert "99999" in response.json()["detail"]
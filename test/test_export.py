@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.export import EXPORT_SCHEMA, detect_format, export_to_file
+from app.readiness import synthetic_records
+from app.routes import save_predictions_batch, upsert_employees
+from test.conftest import TestingSessionLocal
+
+DEPARTEMENT = "Export"
+
+
+def populate(SessionLocal, count: int = 10, predicted: int = 6):
+    """`count` employés du département Export, dont les `predicted` premiers ont une prédiction."""
+    records = [
+        {**record, "id_employee": 9100 + i, "departement": DEPARTEMENT}
+        for i, record in enumerate(synthetic_records(count))
+    ]
+    with SessionLocal() as db:
+        upsert_employees(db, records)
+        ids = [record["id_employee"] for record in records[:predicted]]
+        save_predictions_batch(db, ids, [1] * predicted, [[0.2, 0.8]] * predicted)
+        db.commit()
+    return records
+
+
+@pytest.fixture
+def exported():
+    return populate(TestingSessionLocal)
+
+
+class TestExportRoute:
+    def test_csv(self, client, exported):
+        response = client.get("/export", params={"format": "csv", "departement": DEPARTEMENT})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert list(rows[0]) == EXPORT_SCHEMA.names
+        assert [int(row["id_employee"]) for row in rows] == [record["id_employee"] for record in exported]
+        assert rows[0]["probability_quitte"] == "0.8" and rows[0]["risk_level"] == "Haut"
+        # Employé jamais prédit : colonnes de prédiction vides
+        assert rows[-1]["prediction"] == "" and rows[-1]["predicted_at"] == ""
+
+    def test_ndjson_compressed(self, client, exported):
+        response = client.get(
+            "/export", params={"format": "ndjson", "departement": DEPARTEMENT},
+            headers={"Accept-Encoding": "gzip"},
+        )
+        assert response.headers["content-encoding"] == "gzip"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert len(lines) == 10
+        assert sum(line["prediction"] is not None for line in lines) == 6
+
+    def test_parquet_and_risk_level_filter(self, client, exported):
+        response = client.get("/export", params={"format": "parquet", "departement": DEPARTEMENT, "risk_level": "Haut"})
+        table = pq.read_table(io.BytesIO(response.content))
+        assert table.schema == EXPORT_SCHEMA
+        assert table.num_rows == 6
+
+    def test_throughput_metrics(self, client, exported):
+        client.get("/export", params={"departement": DEPARTEMENT})
+        last = client.get("/metrics").json()["export"]["last"]
+        assert last["rows"] == 10 and last["completed"]
+        assert last["bytes"] > 0 and last["bytes_per_second"] > 0
+
+    def test_unknown_format(self, client):
+        assert client.get("/export", params={"format": "xlsx"}).status_code == 422
+
+
+class TestExportToFile:
+    def test_fixed_size_batches(self, sqlite_engine, tmp_path):
+        populate(sessionmaker(bind=sqlite_engine), count=25, predicted=25)
+        path = tmp_path / "employees.parquet"
+        with open(path, "wb") as f:
+            summary = export_to_file(f, "parquet", batch_size=10, bind=sqlite_engine)
+
+        assert summary["rows"] == 25 and summary["bytes"] == path.stat().st_size
+        # Un row group par lot lu sur le curseur
+        metadata = pq.ParquetFile(path).metadata
+        assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [10, 10, 5]
+
+    def test_detect_format(self):
+        assert detect_format("out.parquet") == "parquet"
+        assert detect_format("out.jsonl") == "ndjson"
+        assert detect_format("out.csv") == "csv"
@@ -0,0 +1,145 @@
+import numpy as np
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+from app.feature_store import FeatureStore
+from app.models import Employee, model_manager
+from app.readiness import synthetic_records
+from app.routes import prepare_features_batch, upsert_employees
+from test.conftest import engine as pg_engine
+
+DEPARTEMENTS = ["Commercial", "Consulting", "Ressources Humaines"]
+
+
+def employee_records(count: int, offset: int = 9100) -> list[dict]:
+    return [
+        {**record, "id_employee": offset + i, "departement": DEPARTEMENTS[i % 3], "revenu_mensuel": 2000.0 + 100 * i}
+        for i, record in enumerate(synthetic_records(count))
+    ]
+
+
+@pytest.fixture
+def sqlite_store(sqlite_engine, monkeypatch):
+    """Magasin chargé depuis une base SQLite de 30 employés, branché sur les sessions."""
+    SessionLocal = sessionmaker(bind=sqlite_engine)
+    with SessionLocal() as db:
+        upsert_employees(db, employee_records(30))
+        db.commit()
+    store = FeatureStore(bind=sqlite_engine, enabled=True)
+    store.load()
+    monkeypatch.setattr("app.feature_store.feature_store", store)
+    return store, SessionLocal
+
+
+def pipeline_probability(record: dict) -> float:
+    return float(model_manager.predict_proba(prepare_features_batch([record]))[0, 1])
+
+
+class TestFeatureStore:
+    def test_same_predictions_as_pipeline(self, sqlite_store):
+        store, _ = sqlite_store
+        for record in employee_records(30)[::7]:
+            encoded = store.get(record["id_employee"])
+            assert encoded.dtype == np.float32 and encoded.shape[0] == 1
+            assert float(model_manager.predict_encoded(encoded)[0, 1]) == pytest.approx(pipeline_probability(record), abs=1e-6)
+        assert store.get(12345) is None
+
+    def test_committed_writes_are_applied(self, sqlite_store):
+        store, SessionLocal = sqlite_store
+        changed = {**employee_records(30)[4], "revenu_mensuel": 15000.0}
+        new = employee_records(1, offset=9500)[0]
+        with SessionLocal() as db:
+            upsert_employees(db, [changed, new])
+            db.commit()
+            # Écriture annulée : ignorée
+            upsert_employees(db, [{**new, "age": 60}])
+            db.rollback()
+
+        # Mis en file au commit, encodés à la première lecture
+        assert store.snapshot()["pending"] == 2
+        for record in (changed, new):
+            assert float(model_manager.predict_encoded(store.get(record["id_employee"]))[0, 1]) == pytest.approx(
+                pipeline_probability(record), abs=1e-6
+            )
+        assert store.snapshot()["employees"] == 31
+
+    def test_refresh_reads_writes_from_other_processes(self, sqlite_store, sqlite_engine):
+        store, _ = sqlite_store
+        record = {**employee_records(30)[2], "heure_supplementaires": "Non", "revenu_mensuel": 9000.0}
+        # Écriture hors session (autre processus) : seule la relecture la voit
+        with sqlite_engine.begin() as conn:
+            conn.execute(update(Employee).where(Employee.id_employee == 9102).values(
+                heure_supplementaires="Non", revenu_mensuel=9000.0, updated_at=store._watermark
+            ))
+        assert store.refresh() >= 1
+        assert float(model_manager.predict_encoded(store.get(9102))[0, 1]) == pytest.approx(pipeline_probability(record), abs=1e-6)
+
+    def test_segment(self, sqlite_store):
+        store, _ = sqlite_store
+        ids, matrix = store.segment({"departement": "Commercial"})
+        assert sorted(ids) == [9100 + i for i in range(0, 30, 3)]
+        assert matrix.shape[0] == 10
+        assert len(store.segment()[0]) == 30
+        assert len(store.segment({"departement": "Inconnu"})[0]) == 0
+
+    def test_segment_is_a_snapshot(self, sqlite_store):
+        store, SessionLocal = sqlite_store
+        ids, matrix = store.segment()
+        before = matrix.copy()
+        with SessionLocal() as db:
+            upsert_employees(db, [{**record, "revenu_mensuel": 19000.0} for record in employee_records(30)])
+            db.commit()
+        store.get(9100)
+        # Les lignes réécrites en place ne changent pas un segment déjà renvoyé
+        assert np.array_equal(matrix, before)
+        assert not np.array_equal(store.segment()[1], before)
+
+    def test_get_does_not_wait_for_encoding(self, sqlite_store):
+        store, SessionLocal = sqlite_store
+        previous = store.get(9105)
+        with SessionLocal() as db:
+            upsert_employees(db, [{**employee_records(30)[5], "revenu_mensuel": 19000.0}])
+            db.commit()
+        # Encodage en cours dans un autre thread : la lecture rend la ligne précédente
+        with store._apply_lock:
+            assert np.array_equal(store.get(9105), previous)
+        assert not np.array_equal(store.get(9105), previous)
+
+    def test_memory_per_employee(self, sqlite_store):
+        snapshot = sqlite_store[0].snapshot()
+        width = snapshot["encoded_features"]
+        assert snapshot["ready"]
+        assert snapshot["bytes_per_employee"] == pytest.approx(4 * width + 4)
+
+    def test_not_ready_after_model_change(self, sqlite_store, monkeypatch):
+        store, _ = sqlite_store
+        monkeypatch.setattr(model_manager, "pipeline", model_manager.pipeline[:])
+        assert not store.ready and store.get(9100) is None
+
+
+class TestFeatureStoreRoutes:
+    def test_segment_unavailable_without_store(self, client):
+        assert client.get("/score/segment").status_code == 503
+
+    def test_segment_scores(self, client, sqlite_store):
+        response = client.get("/score/segment", params={"departement": "Consulting"})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["employees"] == 10
+        assert body["id_employee"] == [9100 + i for i in range(1, 30, 3)]
+        assert len(body["probability_quitte"]) == 10
+        assert body["high_risk"] == sum(p > 0.7 for p in body["probability_quitte"])
+
+    def test_predict_by_id_reads_the_store(self, client, employee_data, monkeypatch):
+        store = FeatureStore(bind=pg_engine, enabled=True)
+        monkeypatch.setattr("app.feature_store.feature_store", store)
+        client.post("/predict_employee", json=employee_data)
+        store.load()
+        expected = client.get("/predict_employee/9999").json()
+
+        # Modification hors session, pas encore relue : la prédiction vient du magasin
+        with pg_engine.begin() as conn:
+            conn.execute(update(Employee).where(Employee.id_employee == 9999).values(heure_supplementaires="Non", age=20))
+        assert client.get("/predict_employee/9999").json() == expected
+        store.enabled = False
+        assert client.get("/predict_employee/9999").json() != expected
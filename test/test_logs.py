@@ -0,0 +1,102 @@
+"""Tests pour le module logs.py (journalisation asynchrone et structurée)"""
+import io
+import json
+import logging
+import pytest
+from app.logs import JsonFormatter, LogPipeline, stage, request_stages
+
+
+@pytest.fixture
+def captured():
+    """Pipeline (file + thread d'écoute) écrivant du JSON dans un tampon, branché sur le logger `test.logs`."""
+    output = io.StringIO()
+    handler = logging.StreamHandler(output)
+    handler.setFormatter(JsonFormatter())
+    pipeline = LogPipeline(handler, sample_rate=1.0)
+    logger = logging.getLogger("test.logs")
+    logger.addHandler(pipeline.handler)
+    logger.setLevel(logging.INFO)
+    pipeline.start()
+
+    def lines():
+        pipeline.stop()
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    yield logger, pipeline, lines
+    pipeline.stop()
+    logger.removeHandler(pipeline.handler)
+    logger.setLevel(logging.NOTSET)
+
+
+def test_json_record_with_extra_and_exception(captured):
+    logger, _, lines = captured
+    logger.info("lot de %d lignes", 3, extra={"rows": 3})
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("échec")
+
+    info, error = lines()
+    assert info["message"] == "lot de 3 lignes" and info["rows"] == 3 and info["level"] == "INFO"
+    assert "request_id" not in info
+    assert error["level"] == "ERROR" and "ZeroDivisionError" in error["exception"]
+
+
+def test_sampling_keeps_warnings(captured):
+    logger, pipeline, lines = captured
+    pipeline.sampling.rate = 0.0
+    for _ in range(5):
+        logger.info("volumineux", extra={"sample": True})
+        logger.warning("avertissement", extra={"sample": True})
+    logger.info("rare")
+
+    assert [line["message"] for line in lines()] == ["avertissement"] * 5 + ["rare"]
+    assert pipeline.snapshot()["sampled_out"] == 5
+
+
+def test_full_queue_drops_without_blocking():
+    handler = logging.StreamHandler(io.StringIO())
+    pipeline = LogPipeline(handler, queue_size=2)
+    logger = logging.getLogger("test.logs.full")
+    logger.addHandler(pipeline.handler)
+    try:
+        # Thread d'écoute non démarré : la file se remplit
+        for i in range(5):
+            logger.warning("message %d", i)
+    finally:
+        logger.removeHandler(pipeline.handler)
+    assert pipeline.snapshot()["queued"] == 2
+    assert pipeline.snapshot()["dropped"] == 3
+
+
+def test_stage_outside_request():
+    with stage("predict"):
+        pass
+    assert request_stages.get() is None
+
+
+class TestRequestContext:
+    def test_request_id_header(self, client):
+        response = client.get("/health", headers={"X-Request-ID": "abc-123"})
+        assert response.headers["x-request-id"] == "abc-123"
+        generated = client.get("/health").headers["x-request-id"]
+        assert len(generated) == 32
+
+    def test_access_log_with_stages(self, client, employee_data, captured):
+        _, pipeline, lines = captured
+        access = logging.getLogger("app.access")
+        access.addHandler(pipeline.handler)
+        access.setLevel(logging.INFO)
+        try:
+            client.post("/predict_employee", json=employee_data)
+            client.get("/predict_employee/9999", headers={"X-Request-ID": "req-1"})
+        finally:
+            access.removeHandler(pipeline.handler)
+            access.setLevel(logging.NOTSET)
+
+        entry = [line for line in lines() if line.get("request_id") == "req-1"][-1]
+        assert entry["logger"] == "app.access" and entry["status"] == 200
+        assert entry["path"] == "/predict_employee/9999"
+        # Étapes mesurées dans le threadpool, remontées à la requête
+        assert {"load", "preprocess", "predict", "save"} <= set(entry["stages"])
+        assert entry["duration_ms"] >= sum(entry["stages"].values())
@@ -33,3 +33,34 @@ def test_health_endpoint(client):
     data = response.json()
     assert data["status"] == "ok"
     assert "model_loaded" in data
+
+
+def test_metrics_endpoint(client):
+    """Teste que les métriques du pool sont exposées."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    data = response.json()
+    assert "db_pool" in data
+    assert "checkout_wait_seconds" in data["db_pool"]
+    assert "checked_out" in data["db_pool"]
+
+
+def test_logging_configured_by_lifespan():
+    """Journalisation asynchrone installée au démarrage de l'API (pas à l'import de app.main), relancée à chaque démarrage."""
+    import subprocess
+    import sys
+    code = """
+import logging
+from fastapi.testclient import TestClient
+import app.main
+from app import logs
+from app.logs import AsyncQueueHandler
+installed = lambda: any(isinstance(h, AsyncQueueHandler) for h in logging.getLogger().handlers)
+print(installed())
+app.main.start_background_startup = lambda: None
+for _ in range(2):
+    with TestClient(app.main.app):
+        print(installed() and logs._pipeline.listener._thread is not None)
+"""
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["False", "True", "True"]
@@ -1,5 +1,6 @@
 """Tests pour le module migrate.py"""
 import pytest
+from app.models import Employee, Prediction
 
 
 class TestMigrateModule:
@@ -11,3 +12,130 @@ class TestMigrateModule:
         # Juste vérifier que la fonction existe et peut être importée
         assert callable(migrate_database)
 
+
+
+class TestPredictionPartitions:
+    """Tests pour le partitionnement mensuel de predictions."""
+    
+    def test_month_helpers(self):
+        """Teste le calcul des mois et des noms de partitions."""
+        from datetime import date, datetime
+        from app.migrate import add_months, month_start, partition_name
+        assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+        assert add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+        assert month_start(datetime(2025, 3, 17, 10, 30)) == date(2025, 3, 1)
+        assert partition_name(date(2025, 3, 1)) == "predictions_2025_03"
+    
+    def test_predictions_partitioned(self, db_session):
+        """Après migration, predictions est partitionnée avec les mois à venir."""
+        from datetime import datetime
+        from sqlalchemy import text
+        from app.migrate import migrate_database, is_partitioned, month_start, partition_name
+        migrate_database()
+        conn = db_session.connection()
+        assert is_partitioned(conn)
+        current = partition_name(month_start(datetime.utcnow()))
+        assert conn.execute(text("SELECT to_regclass(:name)"), {"name": current}).scalar() is not None
+    
+    def test_partition_created_from_default(self, db_session):
+        """Les lignes d'un mois sans partition sont déplacées à la création de celle-ci."""
+        from datetime import date, datetime
+        from sqlalchemy import text
+        from app.migrate import migrate_database, create_month_partition
+        migrate_database()
+        db_session.add(Employee(id_employee=7901, age=30, genre="F", departement="IT", revenu_mensuel=4000.0))
+        db_session.add(Prediction(id_employee=7901, prediction=1, confidence=0.9, created_at=datetime(2002, 5, 3)))
+        db_session.commit()
+
+        conn = db_session.connection()
+        assert create_month_partition(conn, date(2002, 5, 1))
+        count = conn.execute(text("SELECT count(*) FROM predictions_2002_05 WHERE id_employee = 7901")).scalar()
+        db_session.rollback()
+        assert count == 1
+
+
+class TestMigrationLedger:
+    """Tests pour le registre des migrations (schema_migrations)."""
+    
+    def test_versions_ordered(self):
+        """Versions uniques et croissantes."""
+        from app.migrate import MIGRATIONS, LATEST_VERSION
+        versions = [version for version, _, _ in MIGRATIONS]
+        assert versions == sorted(set(versions))
+        assert LATEST_VERSION == versions[-1]
+    
+    def test_applied_once(self, db_session):
+        """Toutes les migrations sont inscrites ; un second appel ne fait que lire la version."""
+        from sqlalchemy import text
+        from app.migrate import migrate_database, LATEST_VERSION
+        assert migrate_database() == LATEST_VERSION
+        applied = db_session.execute(text("SELECT version, applied_at FROM schema_migrations ORDER BY version")).all()
+        assert [row.version for row in applied] == list(range(1, LATEST_VERSION + 1))
+        assert migrate_database() == LATEST_VERSION
+        assert db_session.execute(text("SELECT version, applied_at FROM schema_migrations ORDER BY version")).all() == applied
+    
+    def test_lock_held_by_another_worker(self):
+        """Si un autre processus tient le verrou et que le schéma est à jour, on n'attend pas."""
+        from sqlalchemy import text
+        from app.database import engine
+        from app.migrate import migrate_database, acquire_migration_lock, MIGRATION_LOCK_KEY
+        migrate_database()
+        with engine.connect() as other, engine.connect() as conn:
+            other.execute(text("SELECT pg_advisory_lock(hashtext(:key))"), {"key": MIGRATION_LOCK_KEY})
+            try:
+                assert acquire_migration_lock(conn) is False
+            finally:
+                other.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {"key": MIGRATION_LOCK_KEY})
+    
+    def test_sqlite_migrations(self, sqlite_engine):
+        """SQLite : toutes les versions inscrites, tables et index créés, second appel sans effet."""
+        from sqlalchemy import inspect, text
+        from app.migrate import migrate_database, LATEST_VERSION
+        with sqlite_engine.connect() as conn:
+            versions = conn.execute(text("SELECT version FROM schema_migrations ORDER BY version")).scalars().all()
+        assert versions == list(range(1, LATEST_VERSION + 1))
+        assert migrate_database(sqlite_engine) == LATEST_VERSION
+        
+        inspector = inspect(sqlite_engine)
+        assert {"employees", "predictions", "current_risk"} <= set(inspector.get_table_names())
+        assert "content_hash" in {col["name"] for col in inspector.get_columns("employees")}
+        assert "ix_current_risk_departement_probability_quitte" in {
+            index["name"] for index in inspector.get_indexes("current_risk")
+        }
+    
+    def test_sqlite_schema_matches_models(self, sqlite_engine):
+        """SQLite : les migrations seules donnent les tables, colonnes et index des modèles."""
+        from sqlalchemy import inspect
+        from app.database import Base
+        inspector = inspect(sqlite_engine)
+        for table in Base.metadata.sorted_tables:
+            assert {col["name"] for col in inspector.get_columns(table.name)} == {col.name for col in table.columns}, table.name
+            assert {index.name for index in table.indexes} <= {index["name"] for index in inspector.get_indexes(table.name)}, table.name
+
+    def test_sqlite_upgrade_adds_column(self, sqlite_engine):
+        """SQLite : une base antérieure à la migration 10 reçoit la colonne content_hash."""
+        from sqlalchemy import inspect, text
+        from app.migrate import migrate_database, LATEST_VERSION
+        with sqlite_engine.connect() as conn:
+            conn.execute(text("ALTER TABLE employees DROP COLUMN content_hash"))
+            conn.execute(text("DELETE FROM schema_migrations WHERE version >= 10"))
+            conn.commit()
+        
+        assert migrate_database(sqlite_engine) == LATEST_VERSION
+        assert "content_hash" in {col["name"] for col in inspect(sqlite_engine).get_columns("employees")}
+    
+    @pytest.mark.parametrize("table", ["current_risk", "predictions"])
+    def test_create_index_concurrently(self, table):
+        """Index créé sans transaction, y compris sur une table partitionnée (une fois par partition)."""
+        from sqlalchemy import text
+        from app.database import engine
+        from app.migrate import migrate_database, create_index_concurrently, index_is_valid, ConcurrentIndex
+        migrate_database()
+        index = ConcurrentIndex(f"ix_test_{table}_created_at", table, "created_at")
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            try:
+                create_index_concurrently(conn, index)
+                create_index_concurrently(conn, index)  # idempotent
+                assert index_is_valid(conn, index.name)
+            finally:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
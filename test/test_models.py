@@ -1,7 +1,7 @@
 """Tests pour le module models.py"""
 import pytest
 from pathlib import Path
-from app.models import ModelManager, Employee, Prediction
+from app.models import ModelManager, Employee, Prediction, parse_tiers
 
 
 class TestModelManager:
@@ -120,3 +120,32 @@ class TestPredictionModel:
         
         repr_str = repr(prediction)
         assert "Prediction" in repr_str
+
+
+class TestModelTiers:
+    """Tests pour les paliers d'inférence (arbres tronqués)."""
+
+    def test_parse_tiers(self):
+        """Le palier complet est toujours présent."""
+        assert parse_tiers("fast=20, medium=50") == {"fast": 20, "medium": 50, "full": 0}
+
+    def test_truncated_tier(self):
+        """Un palier tronqué n'évalue que les premiers arbres et suffixe la version."""
+        from app.models import model_manager
+        from app.readiness import synthetic_records
+        from app.routes import prepare_features_batch
+        df = prepare_features_batch(synthetic_records(5))
+        classifier = model_manager.pipeline[-1]
+        encoded = model_manager.pipeline[:-1].transform(df)
+        rounds = model_manager.tiers["fast"]
+        assert model_manager.predict_proba(df, "fast") == pytest.approx(
+            classifier.predict_proba(encoded, iteration_range=(0, rounds)), abs=1e-6
+        )
+        assert model_manager.predict_proba(df, "full") == pytest.approx(model_manager.predict_proba(df))
+        assert model_manager.version_for("fast") == f"{model_manager.version}+fast"
+        assert model_manager.version_for("full") == model_manager.version_for(None) == model_manager.version
+
+    def test_unknown_tier(self):
+        from app.models import model_manager
+        with pytest.raises(ValueError, match="Palier d'inférence inconnu"):
+            model_manager.tier_params("turbo")
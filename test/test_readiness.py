@@ -0,0 +1,85 @@
+"""Tests pour le module readiness.py (démarrage en arrière-plan et GET /ready)"""
+import pytest
+from app.models import model_manager
+from app.readiness import readiness, run_startup, startup_state, synthetic_records, warm_up_model
+
+
+@pytest.fixture
+def fresh_state():
+    """État de démarrage remis à zéro, restauré après le test."""
+    startup_state.reset()
+    yield startup_state
+    startup_state.reset()
+
+
+class TestWarmUp:
+    """Tests du préchauffage du modèle."""
+    
+    def test_synthetic_records(self):
+        records = synthetic_records(3)
+        assert [record["id_employee"] for record in records] == [0, 1, 2]
+    
+    def test_warm_up_all_batch_sizes(self):
+        timings = warm_up_model(batch_sizes=[1, 8], rounds=1)
+        assert set(timings) == {1, 8}
+        assert all(seconds > 0 for seconds in timings.values())
+
+
+class TestReady:
+    """Tests de la sonde de disponibilité."""
+    
+    def test_not_ready_while_loading(self, client, fresh_state):
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["model"] == "loading"
+        assert response.json()["database"] == "ok"
+    
+    def test_ready_after_startup(self, client, fresh_state):
+        run_startup(migrate=False)
+        assert fresh_state.model_warm
+        assert set(fresh_state.snapshot()["steps_seconds"]) == {"database", "load_model", "warm_up", "drift_reference"}
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json() == {"status": "ready", "model": "warm", "database": "ok"}
+    
+    def test_load_failure_reported(self, fresh_state, monkeypatch):
+        def fail():
+            raise FileNotFoundError("modèle absent")
+        monkeypatch.setattr(model_manager, "load", fail)
+        run_startup(migrate=False)
+        ready, details = readiness()
+        assert not ready
+        assert details["model"] == "error"
+        assert "load_model" in details["error"]
+    
+    def test_database_step_retried(self, fresh_state, monkeypatch):
+        """Une base indisponible au premier essai : nouvelle tentative, puis démarrage complet."""
+        from app import readiness as module
+        calls = []
+        def flaky():
+            calls.append(1)
+            if len(calls) == 1:
+                raise ConnectionError("base indisponible")
+        monkeypatch.setattr(module, "wait_for_db", flaky)
+        monkeypatch.setattr(module, "STARTUP_DB_BACKOFF_SECONDS", 0)
+        run_startup(migrate=False)
+        assert len(calls) == 2
+        assert fresh_state.model_warm
+    
+    def test_database_failure_exits(self, fresh_state, monkeypatch):
+        """Base toujours indisponible : le modèle est chargé quand même, puis le processus s'arrête."""
+        from app import readiness as module
+        exits = []
+        def down():
+            raise ConnectionError("base indisponible")
+        monkeypatch.setattr(module, "wait_for_db", down)
+        monkeypatch.setattr(module, "STARTUP_DB_BACKOFF_SECONDS", 0)
+        monkeypatch.setattr(module, "exit_process", lambda: exits.append(1))
+        run_startup(migrate=False)
+        assert exits == [1]
+        assert not fresh_state.model_warm
+        assert {"load_model", "warm_up"} <= set(fresh_state.snapshot()["steps_seconds"])
+        assert "database" in fresh_state.snapshot()["error"]
+    
+    def test_health_independent_of_readiness(self, client, fresh_state):
+        assert client.get("/health").status_code == 200
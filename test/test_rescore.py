@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import sessionmaker
+from app.models import CurrentRisk, Employee, JobWatermark, Prediction, model_manager
+from app.readiness import synthetic_records
+from app.rescore import rescore, stale_employees_queries
+from app.routes import upsert_employees
+
+
+@pytest.fixture
+def population(sqlite_engine):
+    """50 employés jamais prédits dans une base SQLite."""
+    SessionLocal = sessionmaker(bind=sqlite_engine)
+    with SessionLocal() as db:
+        upsert_employees(db, [{**record, "id_employee": 1000 + i} for i, record in enumerate(synthetic_records(50))])
+        db.commit()
+    return SessionLocal
+
+
+def prediction_count(SessionLocal) -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(Prediction))
+
+
+class TestRescore:
+    def test_first_run_scores_everyone_in_chunks(self, population, sqlite_engine):
+        summary = rescore(chunk_size=20, bind=sqlite_engine)
+        assert summary["rescored"] == {"all": 50}
+        assert summary["chunks"] == 3
+        with population() as db:
+            assert db.scalar(select(func.count()).select_from(CurrentRisk)) == 50
+
+    def test_nothing_to_do_when_fresh(self, population, sqlite_engine):
+        rescore(bind=sqlite_engine)
+        summary = rescore(bind=sqlite_engine)
+        assert summary["rescored"] == {"changed": 0, "model_version": 0}
+        assert prediction_count(population) == 50
+
+    def test_only_changed_employees_are_rescored(self, population, sqlite_engine):
+        rescore(bind=sqlite_engine)
+        records = [{**record, "id_employee": 1000 + i} for i, record in enumerate(synthetic_records(50))]
+        with population() as db:
+            # Deux changements réels et un envoi identique (sans effet sur updated_at)
+            upsert_employees(db, [
+                {**records[3], "revenu_mensuel": 9999.0},
+                {**records[7], "age": 50},
+                records[9],
+            ])
+            db.commit()
+
+        summary = rescore(bind=sqlite_engine)
+        assert summary["rescored"] == {"changed": 2, "model_version": 0}
+        assert prediction_count(population) == 52
+
+    def test_new_model_version_rescores_everyone(self, population, sqlite_engine, monkeypatch):
+        rescore(bind=sqlite_engine)
+        monkeypatch.setattr("app.rescore.RESCORE_OVERLAP_SECONDS", 0)
+        monkeypatch.setattr(model_manager, "version", "2.0.0")
+        summary = rescore(chunk_size=30, bind=sqlite_engine)
+        assert summary["rescored"] == {"changed": 0, "model_version": 50}
+        with population() as db:
+            assert set(db.scalars(select(CurrentRisk.model_version))) == {"2.0.0"}
+
+    def test_fast_tier_predictions_are_rescored(self, population, sqlite_engine, monkeypatch):
+        rescore(bind=sqlite_engine)
+        monkeypatch.setattr("app.rescore.RESCORE_OVERLAP_SECONDS", 0)
+        with population() as db:
+            db.execute(update(CurrentRisk).where(CurrentRisk.id_employee.in_([1002, 1004]))
+                       .values(model_version=model_manager.version_for("fast")))
+            db.commit()
+        assert rescore(bind=sqlite_engine)["rescored"] == {"changed": 0, "model_version": 2}
+        with population() as db:
+            assert set(db.scalars(select(CurrentRisk.model_version))) == {model_manager.version}
+
+    def test_overlap_catches_changes_during_previous_run(self, population, sqlite_engine):
+        rescore(bind=sqlite_engine)
+        with population() as db:
+            watermark = db.scalar(select(JobWatermark.watermark))
+            # Écriture horodatée avant le départ du passage précédent mais validée après
+            # sa lecture : sa prédiction courante est plus ancienne que la modification
+            db.execute(update(CurrentRisk).where(CurrentRisk.id_employee == 1001)
+                       .values(created_at=watermark - timedelta(seconds=20)))
+            db.execute(update(Employee).where(Employee.id_employee == 1001)
+                       .values(updated_at=watermark - timedelta(seconds=10)))
+            db.commit()
+        assert rescore(bind=sqlite_engine)["rescored"]["changed"] == 1
+
+    def test_dry_run_counts_without_writing(self, population, sqlite_engine):
+        summary = rescore(dry_run=True, bind=sqlite_engine)
+        assert summary["rescored"] == {"all": 50}
+        assert prediction_count(population) == 0
+        # Le dry-run n'avance pas la position : le passage suivant reste complet
+        assert rescore(bind=sqlite_engine)["rescored"] == {"all": 50}
+
+
+class TestStaleQueries:
+    def test_incremental_queries_use_indexes(self):
+        """PostgreSQL : les recherches incrémentales passent par les index, sans parcours complet d'employees."""
+        from sqlalchemy import text
+        from test.conftest import engine
+        queries = stale_employees_queries("1.0.0", datetime.utcnow())
+        with engine.connect() as conn:
+            conn.execute(text("SET enable_seqscan = off"))
+            for query in queries.values():
+                plan = "\n".join(conn.execute(text(
+                    "EXPLAIN " + str(query.compile(engine, compile_kwargs={"literal_binds": True}))
+                )).scalars())
+                assert "Seq Scan on employees" not in plan
@@ -0,0 +1,65 @@
+"""Tests pour le module retention.py"""
+import pytest
+from datetime import date, datetime
+from sqlalchemy import text
+from app.models import Employee, Prediction, PredictionDailyRollup
+
+
+@pytest.fixture
+def old_partition(db_session):
+    """Une partition de mars 2001 contenant trois prédictions d'un employé de test."""
+    from app.migrate import migrate_database, create_month_partition
+    migrate_database()
+    create_month_partition(db_session.connection(), date(2001, 3, 1))
+    db_session.commit()
+
+    db_session.add(Employee(id_employee=7900, age=30, genre="F", departement="Test Retention", revenu_mensuel=4000.0))
+    for day, prediction in [(1, 1), (1, 0), (2, 1)]:
+        db_session.add(Prediction(
+            id_employee=7900, prediction=prediction, confidence=0.8,
+            probability_quitte=0.8 if prediction else 0.2,
+            risk_level="Haut" if prediction else "Normal", model_version="1.0.0",
+            created_at=datetime(2001, 3, day, 12)
+        ))
+    db_session.commit()
+    yield
+    db_session.execute(text("DROP TABLE IF EXISTS predictions_2001_03"))
+    db_session.query(PredictionDailyRollup).filter_by(departement="Test Retention").delete()
+    db_session.commit()
+
+
+class TestRetention:
+    """Tests pour apply_retention."""
+    
+    def test_rollup_and_detach(self, db_session, old_partition):
+        """La partition ancienne est agrégée par jour puis supprimée."""
+        from app.retention import apply_retention
+        processed = apply_retention(keep_months=2, today=date(2001, 6, 15))
+        assert [p["partition"] for p in processed] == ["predictions_2001_03"]
+        
+        rollups = (
+            db_session.query(PredictionDailyRollup)
+            .filter_by(departement="Test Retention")
+            .order_by(PredictionDailyRollup.day)
+            .all()
+        )
+        assert [(r.day, r.predictions, r.departures, r.high_risk) for r in rollups] == [
+            (date(2001, 3, 1), 2, 1, 1),
+            (date(2001, 3, 2), 1, 1, 1),
+        ]
+        assert rollups[0].sum_probability_quitte == pytest.approx(1.0)
+        assert db_session.execute(text("SELECT to_regclass('predictions_2001_03')")).scalar() is None
+    
+    def test_recent_partitions_kept(self, db_session, old_partition):
+        """Les partitions dans la période de rétention ne sont pas touchées."""
+        from app.retention import apply_retention
+        assert apply_retention(keep_months=2, today=date(2001, 4, 15)) == []
+        assert db_session.query(Prediction).filter_by(id_employee=7900).count() == 3
+    
+    def test_keep_detached(self, db_session, old_partition):
+        """Avec keep_detached, la table détachée reste disponible pour archivage."""
+        from app.retention import apply_retention
+        apply_retention(keep_months=2, keep_detached=True, today=date(2001, 6, 15))
+        assert db_session.query(Prediction).filter_by(id_employee=7900).count() == 0
+        count = db_session.execute(text("SELECT count(*) FROM predictions_2001_03")).scalar()
+        assert count == 3
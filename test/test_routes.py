@@ -1,7 +1,9 @@
 """Tests pour le module routes.py"""
 import pytest
+from sqlalchemy import text
 from app.routes import prepare_features, save_prediction
-from app.models import Employee, Prediction
+from app.hashing import employee_content_hash
+from app.models import Employee, Prediction, CurrentRisk
 
 
 class TestPrepareFeatures:
@@ -186,6 +188,68 @@ class TestSavePrediction:
         assert prediction.model_version == "1.0.0"
 
 
+class TestSingleTransactionWrite:
+    """Upsert de l'employé et enregistrement de la prédiction en une seule transaction."""
+
+    def employee_row_version(self, db_session, id_employee):
+        # xmin change à chaque réécriture physique de la ligne
+        return db_session.execute(
+            text("SELECT xmin::text FROM employees WHERE id_employee = :id"), {"id": id_employee}
+        ).scalar()
+
+    def test_save_prediction_with_employee_single_commit(self, db_session, employee_data, monkeypatch):
+        """L'employé, la prédiction et current_risk sont écrits avec un seul commit."""
+        commits = []
+        original_commit = db_session.commit
+        monkeypatch.setattr(db_session, "commit", lambda: (commits.append(1), original_commit()))
+
+        confidence = save_prediction(db_session, 9999, 1, [0.2, 0.8], employee=employee_data)
+
+        assert confidence == 0.8
+        assert len(commits) == 1
+        employee = db_session.get(Employee, 9999)
+        assert employee.content_hash == employee_content_hash(employee_data)
+        assert db_session.query(Prediction).filter_by(id_employee=9999).count() == 1
+        current = db_session.get(CurrentRisk, 9999)
+        assert current.departement == "R&D"
+        assert current.risk_level == "Haut"
+
+    def test_unchanged_employee_not_rewritten(self, db_session, employee_data):
+        """Un employé identique n'est pas réécrit ; un employé modifié l'est."""
+        save_prediction(db_session, 9999, 1, [0.2, 0.8], employee=employee_data)
+        version = self.employee_row_version(db_session, 9999)
+
+        save_prediction(db_session, 9999, 1, [0.2, 0.8], employee=dict(employee_data))
+        assert self.employee_row_version(db_session, 9999) == version
+        assert db_session.query(Prediction).filter_by(id_employee=9999).count() == 2
+
+        save_prediction(db_session, 9999, 0, [0.9, 0.1], employee={**employee_data, "departement": "Sales"})
+        assert self.employee_row_version(db_session, 9999) != version
+        db_session.expire_all()
+        assert db_session.get(Employee, 9999).departement == "Sales"
+        assert db_session.get(CurrentRisk, 9999).departement == "Sales"
+
+    def test_save_prediction_sqlite(self, sqlite_engine, employee_data):
+        """SQLite : employé, prédiction et current_risk écrits ; un employé modifié est mis à jour."""
+        from sqlalchemy.orm import Session
+        with Session(sqlite_engine) as db:
+            assert save_prediction(db, 9999, 1, [0.2, 0.8], employee=employee_data) == 0.8
+            save_prediction(db, 9999, 0, [0.9, 0.1], employee={**employee_data, "departement": "Sales"})
+            
+            assert db.query(Prediction).filter_by(id_employee=9999).count() == 2
+            assert db.get(Employee, 9999).departement == "Sales"
+            current = db.get(CurrentRisk, 9999)
+            assert current.departement == "Sales"
+            assert current.risk_level == "Normal"
+            assert current.prediction_id == db.query(Prediction.id).order_by(Prediction.id.desc()).first()[0]
+
+    def test_content_hash_ignores_key_order(self, employee_data):
+        """L'empreinte ne dépend pas de l'ordre des champs."""
+        reordered = dict(reversed(list(employee_data.items())))
+        assert employee_content_hash(reordered) == employee_content_hash(employee_data)
+        assert employee_content_hash({**employee_data, "age": 36}) != employee_content_hash(employee_data)
+
+
 class TestPredictByIdEdgeCases:
     """Tests pour les cas limites de predict_by_id."""
     
@@ -213,3 +277,155 @@ class TestPredictByIdEdgeCases:
         
         response = client.post("/predict_employee", json=boundary_data)
         assert response.status_code == 200
+
+
+class TestPredictionHistory:
+    """Tests pour l'historique paginé des prédictions."""
+    
+    @pytest.fixture
+    def history(self, db_session):
+        """Crée un employé avec 5 prédictions datées."""
+        from datetime import datetime, timedelta
+        
+        db_session.add(Employee(id_employee=7766, age=30, genre="F", departement="IT", revenu_mensuel=4000.0))
+        db_session.commit()
+        
+        base = datetime(2025, 1, 1)
+        for i in range(5):
+            db_session.add(Prediction(
+                id_employee=7766,
+                prediction=i % 2,
+                confidence=0.8,
+                probability_reste=0.2,
+                probability_quitte=0.8,
+                risk_level="Haut" if i % 2 else "Normal",
+                model_version="1.0.0",
+                created_at=base + timedelta(days=i)
+            ))
+        db_session.commit()
+        return base
+    
+    def test_keyset_pagination(self, client, history):
+        """Parcourt toutes les pages sans doublon ni trou."""
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/employees/7766/predictions", params=params)
+            assert response.status_code == 200
+            page = response.json()
+            seen.extend(item["created_at"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        
+        assert len(seen) == 5
+        assert seen == sorted(seen, reverse=True)
+    
+    def test_filters(self, client, history):
+        """Teste les filtres risk_level et plage de dates."""
+        response = client.get("/predictions", params={"id_employee": 7766, "risk_level": "Haut"})
+        assert response.status_code == 200
+        assert len(response.json()["items"]) == 2
+        
+        response = client.get("/predictions", params={
+            "id_employee": 7766,
+            "since": "2025-01-02T00:00:00",
+            "until": "2025-01-04T00:00:00"
+        })
+        assert len(response.json()["items"]) == 2
+    
+    def test_ndjson_stream(self, client, history):
+        """Teste le mode streaming NDJSON."""
+        import json
+        response = client.get("/employees/7766/predictions", params={"format": "ndjson"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert len(lines) == 5
+        assert all(line["id_employee"] == 7766 for line in lines)
+    
+    @pytest.mark.parametrize("format", ["parquet", "arrow"])
+    def test_export_columnar(self, client, history, format):
+        """Teste l'export typé Parquet/Arrow de l'historique."""
+        import io
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        response = client.get("/predictions/export", params={"format": format, "id_employee": 7766})
+        assert response.status_code == 200
+        data = io.BytesIO(response.content)
+        table = pq.read_table(data) if format == "parquet" else pa.ipc.open_stream(data).read_all()
+        assert table.num_rows == 5
+        assert table.schema.field("created_at").type == pa.timestamp("us")
+        assert set(table.column("id_employee").to_pylist()) == {7766}
+    
+    def test_invalid_cursor(self, client):
+        """Teste qu'un curseur invalide renvoie 400."""
+        response = client.get("/predictions", params={"cursor": "pas-un-curseur"})
+        assert response.status_code == 400
+    
+    def test_unknown_employee(self, client):
+        """Teste l'historique d'un employé inexistant."""
+        response = client.get("/employees/99999/predictions")
+        assert response.status_code == 404
+
+
+class TestEmployeesAtRisk:
+    """Tests pour GET /employees/at-risk (table current_risk)."""
+    
+    @pytest.fixture
+    def scored(self, client, employee_data):
+        """Prédit trois employés d'un département dédié aux tests."""
+        profiles = [
+            {"heure_supplementaires": "Non", "satisfaction_employee_environnement": 4},
+            {"heure_supplementaires": "Oui", "satisfaction_employee_environnement": 1},
+            {"heure_supplementaires": "Oui", "satisfaction_employee_environnement": 4},
+        ]
+        for i, profile in enumerate(profiles):
+            data = {**employee_data, **profile, "id_employee": 7800 + i, "departement": "Test Risque"}
+            assert client.post("/predict_employee", json=data).status_code == 200
+        return [7800, 7801, 7802]
+    
+    def test_top_k_sorted(self, client, scored):
+        """Les employés sont triés par probabilité de départ décroissante."""
+        response = client.get("/employees/at-risk", params={"departement": "Test Risque", "k": 10})
+        assert response.status_code == 200
+        items = response.json()
+        assert sorted(item["id_employee"] for item in items) == scored
+        probabilities = [item["probability_quitte"] for item in items]
+        assert probabilities == sorted(probabilities, reverse=True)
+        assert all(item["departement"] == "Test Risque" for item in items)
+    
+    def test_k_limit(self, client, scored):
+        """Le paramètre k limite le nombre de résultats."""
+        response = client.get("/employees/at-risk", params={"departement": "Test Risque", "k": 2})
+        assert len(response.json()) == 2
+    
+    def test_one_row_per_employee(self, client, db_session, scored):
+        """Une nouvelle prédiction remplace la précédente dans current_risk."""
+        from app.models import CurrentRisk
+        client.get("/predict_employee/7800")
+        rows = db_session.query(CurrentRisk).filter(CurrentRisk.id_employee == 7800).all()
+        assert len(rows) == 1
+        latest = (
+            db_session.query(Prediction)
+            .filter(Prediction.id_employee == 7800)
+            .order_by(Prediction.id.desc())
+            .first()
+        )
+        assert rows[0].prediction_id == latest.id
+    
+    def test_batch_scoring_updates_current_risk(self, client, db_session, employee_data):
+        """Le scoring en masse (persist=true) alimente aussi current_risk."""
+        from app.models import CurrentRisk
+        from test.test_scoring import to_csv
+        rows = [{**employee_data, "id_employee": 7810 + i, "departement": "Test Lot"} for i in range(2)]
+        client.post("/score/csv?persist=true", content=to_csv(rows))
+        assert db_session.query(CurrentRisk).filter(CurrentRisk.departement == "Test Lot").count() == 2
+    
+    def test_invalid_k(self, client):
+        """k doit être strictement positif."""
+        response = client.get("/employees/at-risk", params={"k": 0})
+        assert response.status_code == 422
@@ -0,0 +1,116 @@
+"""Tests pour la validation par lots de schemas.py"""
+import json
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from app.schemas import EmployeeInput, validate_employees, validate_employee_columns
+
+
+@pytest.fixture
+def rows(employee_data):
+    """Trois employés dont le deuxième est invalide (âge hors bornes)."""
+    return [
+        {**employee_data, "id_employee": 1},
+        {**employee_data, "id_employee": 2, "age": 12},
+        {**employee_data, "id_employee": 3, "genre": None},
+        {**employee_data, "id_employee": 4},
+    ]
+
+
+class TestValidateEmployees:
+    """Tests de la validation d'une liste d'employés."""
+    
+    def test_all_valid(self, employee_data):
+        employees, indices, errors = validate_employees([employee_data, employee_data])
+        assert indices == [0, 1]
+        assert errors == {}
+        assert all(isinstance(employee, EmployeeInput) for employee in employees)
+    
+    def test_errors_by_row(self, rows):
+        employees, indices, errors = validate_employees(rows)
+        assert [employee.id_employee for employee in employees] == [1, 4]
+        assert indices == [0, 3]
+        assert set(errors) == {1, 2}
+        assert errors[1][0]["loc"] == ("age",)
+        assert errors[1][0]["type"] == "greater_than_equal"
+        assert errors[2][0]["loc"] == ("genre",)
+    
+    def test_json_array(self, rows):
+        employees, indices, errors = validate_employees(json.dumps(rows).encode())
+        assert indices == [0, 3]
+        assert set(errors) == {1, 2}
+    
+    def test_json_not_an_array(self):
+        with pytest.raises(ValidationError):
+            validate_employees(b'{"id_employee": 1}')
+    
+    def test_same_result_as_model(self, rows):
+        """Mêmes lignes acceptées et mêmes valeurs que EmployeeInput(**row)."""
+        employees, indices, _ = validate_employees(rows)
+        assert [EmployeeInput(**rows[i]) for i in indices] == employees
+
+
+class TestValidateEmployeeColumns:
+    """Tests de la validation au format colonnaire."""
+    
+    def to_columns(self, rows):
+        return {name: [row.get(name) for row in rows] for name in rows[0]}
+    
+    def test_same_rows_as_model(self, rows):
+        columns, indices, errors = validate_employee_columns(self.to_columns(rows))
+        assert indices.tolist() == [0, 3]
+        assert errors[1] == [{"loc": ("age",), "msg": "Input should be greater than or equal to 18", "type": "greater_than_equal"}]
+        assert errors[2][0]["loc"] == ("genre",)
+        assert columns["id_employee"].tolist() == [1, 4]
+        assert columns["age"].dtype == np.int64
+    
+    def test_numpy_columns(self, employee_data):
+        columns = {name: np.array([value] * 3) for name, value in employee_data.items()}
+        columns["note_evaluation_actuelle"] = np.array([3.8, 11.0, np.nan])
+        columns["niveau_hierarchique_poste"] = np.array([2.0, 2.5, 2.0])
+        _, indices, errors = validate_employee_columns(columns)
+        assert indices.tolist() == [0]
+        assert {err["type"] for err in errors[1]} == {"less_than_equal", "int_from_float"}
+        assert errors[2][0]["type"] == "less_than_equal"  # NaN : hors bornes, comme EmployeeInput
+    
+    @pytest.mark.parametrize("name", [
+        "age", "niveau_education", "revenu_mensuel", "augementation_salaire_precedente",
+        "ayant_enfants", "genre", "a_quitte_l_entreprise",
+    ])
+    def test_same_rules_as_model(self, employee_data, name):
+        """Mêmes valeurs acceptées, converties et rejetées que EmployeeInput, ligne à ligne."""
+        values = ["1", "1.0", "1.5", " 2 ", "1e2", 1.0, 1.5, 35, True, False, "oui", "yes", " yes ", "Y",
+                  None, float("nan"), float("inf"), "", "M", 10**20]
+        columns = {name_: [value] * len(values) for name_, value in employee_data.items()}
+        columns[name] = values
+        converted, indices, errors = validate_employee_columns(columns)
+        accepted = dict(zip(indices.tolist(), converted[name].tolist()))
+        for i, value in enumerate(values):
+            try:
+                expected = getattr(EmployeeInput(**{**employee_data, name: value}), name)
+            except ValidationError as e:
+                assert i in errors and errors[i][0]["type"] == e.errors()[0]["type"], (name, value)
+                continue
+            assert i in accepted, (name, value)
+            assert accepted[i] == expected or (expected != expected and accepted[i] != accepted[i]), (name, value)
+            assert type(accepted[i]) is type(expected), (name, value)
+    
+    def test_booleans(self, employee_data):
+        columns = {name: [value] * 4 for name, value in employee_data.items()}
+        columns["ayant_enfants"] = [True, "no", "Y", "peut-être"]
+        columns, indices, errors = validate_employee_columns(columns)
+        assert indices.tolist() == [0, 1, 2]
+        assert columns["ayant_enfants"].tolist() == [True, False, True]
+        assert errors[3][0]["type"] == "bool_parsing"
+    
+    def test_missing_column(self, employee_data):
+        columns = {name: [value] for name, value in employee_data.items() if name != "age"}
+        _, indices, errors = validate_employee_columns(columns)
+        assert indices.tolist() == []
+        assert errors[0][0]["type"] == "missing"
+    
+    def test_length_mismatch(self, employee_data):
+        columns = {name: [value] for name, value in employee_data.items()}
+        columns["age"] = [35, 36]
+        with pytest.raises(ValueError):
+            validate_employee_columns(columns)
@@ -0,0 +1,223 @@
+"""Tests pour le module scoring.py"""
+import csv
+import io
+import json
+import pytest
+from app.models import Employee, Prediction
+
+
+def to_csv(rows):
+    """Sérialise des lignes au format data_merge.csv (Y/N, pourcentages)."""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=list(rows[0].keys()))
+    writer.writeheader()
+    for row in rows:
+        row = row.copy()
+        row["ayant_enfants"] = "Y" if row["ayant_enfants"] else "N"
+        row["augementation_salaire_precedente"] = f"{row['augementation_salaire_precedente']} %"
+        writer.writerow(row)
+    return output.getvalue().encode()
+
+
+@pytest.fixture
+def csv_rows(employee_data):
+    rows = []
+    for i in range(3):
+        row = employee_data.copy()
+        row["id_employee"] = 7600 + i
+        rows.append(row)
+    return rows
+
+
+class TestScoreCsv:
+    """Tests pour POST /score/csv."""
+
+    def test_score_csv_ndjson(self, client, csv_rows):
+        """Chaque ligne du CSV produit un résultat NDJSON."""
+        response = client.post("/score/csv", content=to_csv(csv_rows), headers={"Content-Type": "text/csv"})
+        assert response.status_code == 200
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["id_employee"] for r in results] == [7600, 7601, 7602]
+        assert [r["line"] for r in results] == [1, 2, 3]
+        assert all(r["prediction"] in [0, 1] for r in results)
+
+    def test_score_csv_output_csv(self, client, csv_rows):
+        """Le format CSV est négocié via le paramètre format."""
+        response = client.post("/score/csv?format=csv", content=to_csv(csv_rows))
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 3
+        assert rows[0]["id_employee"] == "7600"
+
+    def test_score_csv_small_chunks(self, client, csv_rows):
+        """Le découpage en lots ne change pas les résultats."""
+        body = to_csv(csv_rows)
+        full = client.post("/score/csv", content=body).text
+        chunked = client.post("/score/csv?chunk_size=1", content=body).text
+        assert full == chunked
+
+    def test_score_csv_invalid_row(self, client, csv_rows):
+        """Une ligne invalide est signalée sans interrompre le lot."""
+        csv_rows[1]["age"] = 150
+        response = client.post("/score/csv", content=to_csv(csv_rows))
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert len(results) == 3
+        assert "error" in results[1] and "age" in results[1]["error"]
+        assert "prediction" in results[2]
+
+    def test_score_csv_no_persist_by_default(self, client, db_session, csv_rows):
+        """Sans persist, rien n'est écrit en base."""
+        client.post("/score/csv", content=to_csv(csv_rows))
+        assert db_session.query(Employee).filter_by(id_employee=7600).first() is None
+
+    def test_score_csv_persist(self, client, db_session, csv_rows):
+        """Avec persist=true, employés et prédictions sont enregistrés."""
+        response = client.post("/score/csv?persist=true", content=to_csv(csv_rows))
+        assert response.status_code == 200
+
+        employee = db_session.query(Employee).filter_by(id_employee=7601).first()
+        assert employee is not None
+        assert employee.ayant_enfants is True
+        assert employee.augementation_salaire_precedente == 2.5
+        assert db_session.query(Prediction).filter(Prediction.id_employee.in_([7600, 7601, 7602])).count() == 3
+
+    def test_score_csv_db_error_mid_stream(self, client, db_session, csv_rows, monkeypatch):
+        """Une écriture en échec au milieu du flux : lignes du lot en erreur, la suite est traitée."""
+        from sqlalchemy.exc import OperationalError
+        from app import scoring
+        save = scoring.save_predictions_batch
+        calls = []
+
+        def failing_save(db, ids, *args, **kwargs):
+            calls.append(ids)
+            if len(calls) == 2:
+                raise OperationalError("INSERT", {}, Exception("connexion perdue"))
+            return save(db, ids, *args, **kwargs)
+
+        monkeypatch.setattr(scoring, "save_predictions_batch", failing_save)
+        response = client.post("/score/csv?persist=true&chunk_size=1", content=to_csv(csv_rows))
+        assert response.status_code == 200
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["line"] for r in results] == [1, 2, 3]
+        assert "error" not in results[0] and "error" not in results[2]
+        assert "connexion perdue" in results[1]["error"]
+        saved = {p.id_employee for p in db_session.query(Prediction).filter(Prediction.id_employee.in_([7600, 7601, 7602]))}
+        assert saved == {7600, 7602}
+
+    def test_score_csv_fast_tier(self, client, db_session, csv_rows):
+        """Un job par lot peut choisir le palier rapide : version suffixée en base."""
+        response = client.post("/score/csv?persist=true&tier=fast", content=to_csv(csv_rows))
+        assert response.status_code == 200
+        versions = {p.model_version for p in db_session.query(Prediction).filter(Prediction.id_employee.in_([7600, 7601, 7602]))}
+        assert versions == {"1.0.0+fast"}
+
+    def test_score_csv_matches_single_prediction(self, client, csv_rows, employee_data):
+        """Le scoring par lot donne la même probabilité que POST /predict_employee."""
+        batch = json.loads(client.post("/score/csv", content=to_csv(csv_rows)).text.splitlines()[0])
+
+        single_data = employee_data.copy()
+        single_data["id_employee"] = 7600
+        single = client.post("/predict_employee", json=single_data).json()
+
+        assert batch["prediction"] == single["prediction"]
+        assert batch["confidence"] == pytest.approx(single["confidence"])
+
+    def test_score_csv_empty(self, client):
+        """Un corps vide renvoie une erreur dans le flux."""
+        response = client.post("/score/csv", content=b"")
+        assert json.loads(response.text)["error"] == "CSV vide"
+
+    def test_score_csv_rejects_multipart(self, client, csv_rows):
+        """Les uploads multipart sont refusés."""
+        response = client.post("/score/csv", files={"file": ("data.csv", to_csv(csv_rows), "text/csv")})
+        assert response.status_code == 415
+
+
+class TestScoreColumnar:
+    """Tests pour POST /score/columnar."""
+
+    @pytest.fixture
+    def table(self, csv_rows):
+        import pyarrow as pa
+        return pa.Table.from_pylist(csv_rows)
+
+    def test_score_parquet(self, client, table):
+        """Un fichier Parquet typé est prédit ligne à ligne."""
+        import pyarrow.parquet as pq
+        sink = io.BytesIO()
+        pq.write_table(table, sink)
+        response = client.post(
+            "/score/columnar", content=sink.getvalue(),
+            headers={"Content-Type": "application/vnd.apache.parquet"}
+        )
+        assert response.status_code == 200
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["id_employee"] for r in results] == [7600, 7601, 7602]
+
+    def test_score_arrow_to_parquet(self, client, table):
+        """Un flux Arrow IPC en entrée, des résultats Parquet en sortie."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        response = client.post(
+            "/score/columnar?format=parquet", content=sink.getvalue(),
+            headers={"Content-Type": "application/vnd.apache.arrow.stream"}
+        )
+        assert response.status_code == 200
+        results = pq.read_table(io.BytesIO(response.content))
+        assert results.column("id_employee").to_pylist() == [7600, 7601, 7602]
+        assert set(results.column("prediction").to_pylist()) <= {0, 1}
+
+    def test_score_columnar_matches_csv(self, client, table, csv_rows):
+        """Même résultat que le chemin CSV."""
+        import pyarrow.parquet as pq
+        sink = io.BytesIO()
+        pq.write_table(table, sink)
+        columnar = client.post(
+            "/score/columnar", content=sink.getvalue(),
+            headers={"Content-Type": "application/vnd.apache.parquet"}
+        ).text
+        assert columnar == client.post("/score/csv", content=to_csv(csv_rows)).text
+
+    def test_score_columnar_rejects_unknown_type(self, client):
+        """Un Content-Type non colonnaire est refusé."""
+        response = client.post("/score/columnar", content=b"{}", headers={"Content-Type": "application/json"})
+        assert response.status_code == 415
+
+    def test_score_parquet_too_large(self, client, table, monkeypatch):
+        """Un fichier Parquet au-delà de SCORE_MAX_UPLOAD_BYTES est refusé."""
+        import pyarrow.parquet as pq
+        from app import scoring
+        sink = io.BytesIO()
+        pq.write_table(table, sink)
+        monkeypatch.setattr(scoring, "SCORE_MAX_UPLOAD_BYTES", len(sink.getvalue()) - 1)
+        response = client.post(
+            "/score/columnar", content=sink.getvalue(),
+            headers={"Content-Type": "application/vnd.apache.parquet"}
+        )
+        assert response.status_code == 413
+
+    def test_score_parquet_closes_buffer(self, client, table, monkeypatch):
+        """Le tampon de l'upload est fermé une fois les résultats envoyés."""
+        import tempfile
+        import pyarrow.parquet as pq
+        from app import scoring
+        buffers = []
+        spooled_temporary_file = tempfile.SpooledTemporaryFile
+
+        def spooled_file(*args, **kwargs):
+            buffers.append(spooled_temporary_file(*args, **kwargs))
+            return buffers[-1]
+
+        monkeypatch.setattr(scoring.tempfile, "SpooledTemporaryFile", spooled_file)
+        sink = io.BytesIO()
+        pq.write_table(table, sink)
+        response = client.post(
+            "/score/columnar", content=sink.getvalue(),
+            headers={"Content-Type": "application/vnd.apache.parquet"}
+        )
+        assert response.status_code == 200
+        assert len(buffers) == 1 and buffers[0].closed
@@ -31,3 +31,10 @@ class TestEmployeeSeeder:
         assert hasattr(seeder, 'batch_size')
         assert seeder.batch_size > 0
 
+    def test_seed_does_not_import_the_api(self):
+        """Le seeder (CLI) ne charge pas les routes de l'API ni ce qu'elles importent."""
+        import subprocess
+        import sys
+        code = "import sys, app.seed; print(sorted({'app.routes', 'app.coalescing', 'app.drift', 'app.feature_store'} & set(sys.modules)))"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        assert output.strip() == "[]"
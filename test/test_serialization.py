@@ -0,0 +1,94 @@
+"""Tests pour le module serialization.py"""
+import gzip
+import json
+import msgpack
+import numpy as np
+import pytest
+import zstandard
+from starlette.requests import Request
+from app.serialization import (
+    compress_stream, dumps, fast_response, negotiate_encoding, negotiate_media_type,
+    JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+)
+
+
+def make_request(**headers):
+    """Requête minimale portant les en-têtes donnés."""
+    raw = [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+class TestNegotiation:
+    """Tests de la négociation du format et de la compression."""
+    
+    def test_media_type(self):
+        assert negotiate_media_type(make_request()) == JSON_MEDIA_TYPE
+        assert negotiate_media_type(make_request(accept="application/msgpack")) == MSGPACK_MEDIA_TYPE
+        assert negotiate_media_type(make_request(accept="application/x-msgpack, */*")) == MSGPACK_MEDIA_TYPE
+    
+    @pytest.mark.parametrize("header, expected", [
+        ("", None),
+        ("gzip, deflate", "gzip"),
+        ("gzip, zstd", "zstd"),
+        ("zstd;q=0, gzip", "gzip"),
+        ("br", None),
+        ("*", "zstd"),
+    ])
+    def test_encoding(self, header, expected):
+        assert negotiate_encoding(make_request(accept_encoding=header)) == expected
+
+
+class TestDumps:
+    """Tests de la sérialisation des tableaux NumPy."""
+    
+    def test_json_from_numpy(self):
+        content = {"predictions": np.array([0, 1]), "probabilities": np.array([0.25, 0.75]), "n": np.int64(2)}
+        assert json.loads(dumps(content)) == {"predictions": [0, 1], "probabilities": [0.25, 0.75], "n": 2}
+    
+    def test_msgpack_from_numpy(self):
+        content = {"predictions": np.array([0, 1]), "n": np.int64(2)}
+        assert msgpack.unpackb(dumps(content, MSGPACK_MEDIA_TYPE)) == {"predictions": [0, 1], "n": 2}
+    
+    def test_large_batch(self):
+        """100 000 prédictions se sérialisent sans passer par des objets Python par ligne."""
+        probabilities = np.random.default_rng(0).random((100_000, 2))
+        body = dumps({"probabilities_quitte": probabilities[:, 1]})
+        assert len(json.loads(body)["probabilities_quitte"]) == 100_000
+
+
+class TestCompression:
+    """Tests de la compression des réponses."""
+    
+    def test_small_payload_not_compressed(self):
+        response = fast_response(make_request(accept_encoding="gzip"), {"a": 1})
+        assert "content-encoding" not in response.headers
+    
+    @pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+    def test_large_payload_compressed(self, encoding):
+        content = {"values": np.arange(10_000)}
+        response = fast_response(make_request(accept_encoding=encoding), content)
+        assert response.headers["content-encoding"] == encoding
+        decompress = gzip.decompress if encoding == "gzip" else zstandard.ZstdDecompressor().decompressobj().decompress
+        assert json.loads(decompress(response.body))["values"][-1] == 9_999
+    
+    @pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+    def test_stream_round_trip(self, encoding):
+        chunks = [b'{"a": 1}\n', b'{"a": 2}\n']
+        data = b"".join(compress_stream(iter(chunks), encoding))
+        decompress = gzip.decompress if encoding == "gzip" else zstandard.ZstdDecompressor().decompressobj().decompress
+        assert decompress(data) == b"".join(chunks)
+
+
+class TestEndpoints:
+    """Tests de la négociation sur les endpoints."""
+    
+    def test_predictions_page_msgpack(self, client):
+        response = client.get("/predictions", params={"limit": 1}, headers={"Accept": "application/msgpack"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE
+        assert set(msgpack.unpackb(response.content)) == {"items", "next_cursor"}
+    
+    def test_predictions_ndjson_compressed(self, client):
+        response = client.get("/predictions", params={"format": "ndjson"}, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
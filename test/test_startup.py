@@ -0,0 +1,36 @@
+"""Tests pour les imports différés et le module startup.py"""
+import subprocess
+import sys
+from app.startup import import_report, import_times
+
+
+def loaded_modules(code: str) -> set[str]:
+    """Modules lourds réellement chargés après `code`, dans un nouvel interpréteur."""
+    heavy = ["pandas.core.frame", "joblib", "huggingface_hub", "sklearn", "xgboost"]
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys; {code}; print(' '.join(m for m in {heavy!r} if m in sys.modules))"],
+        capture_output=True, text=True, check=True,
+    )
+    return set(result.stdout.split())
+
+
+class TestLazyImports:
+    """L'import de l'application ne charge pas les dépendances lourdes."""
+    
+    def test_app_main_import_is_light(self):
+        assert loaded_modules("import app.main") == set()
+    
+    def test_pandas_loaded_on_first_use(self):
+        assert "pandas.core.frame" in loaded_modules("import app.routes; app.routes.pd.DataFrame")
+
+
+class TestImportReport:
+    """Tests du rapport des temps d'import."""
+    
+    def test_report(self):
+        times = import_times("app.lazy")
+        assert any(entry["module"] == "app.lazy" for entry in times)
+        report = import_report(times, top=3)
+        assert len(report["modules"]) <= 3
+        assert report["total"] > 0
+        assert report["modules"][0]["cumulative"] >= report["modules"][-1]["cumulative"]
@@ -0,0 +1,101 @@
+"""Tests pour le module whatif.py"""
+import pytest
+
+
+@pytest.fixture
+def employee(client, employee_data):
+    """Employé enregistré (heures supplémentaires, augmentation de 2.5 %)."""
+    data = {**employee_data, "id_employee": 7720}
+    assert client.post("/predict_employee", json=data).status_code == 200
+    return data
+
+
+class TestWhatIf:
+    """Tests pour POST /predict_employee/{id}/what-if."""
+    
+    def test_grid_is_fully_evaluated(self, client, employee):
+        """Toutes les combinaisons de la grille sont prédites."""
+        response = client.post("/predict_employee/7720/what-if", json={
+            "grid": {
+                "heure_supplementaires": ["Oui", "Non"],
+                "augementation_salaire_precedente": {"start": 0, "stop": 20, "step": 2.5},
+                "niveau_hierarchique_poste": [2, 3, 4],
+            }
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert data["scenarios_evaluated"] == 2 * 9 * 3
+        assert data["probability_quitte"] == pytest.approx(
+            1 - client.get("/predict_employee/7720").json()["confidence"]
+        )
+    
+    def test_cheapest_change_first(self, client, employee):
+        """Les scénarios sous le seuil sont triés par coût croissant."""
+        response = client.post("/predict_employee/7720/what-if", json={
+            "grid": {
+                "heure_supplementaires": ["Oui", "Non"],
+                "augementation_salaire_precedente": [2.5, 5.0, 10.0],
+            },
+            "threshold": 0.05,
+        })
+        data = response.json()
+        assert data["scenarios"][0]["changes"] == {"heure_supplementaires": "Non"}
+        assert data["scenarios"][0]["cost"] == 2.0
+        costs = [scenario["cost"] for scenario in data["scenarios"]]
+        assert costs == sorted(costs)
+        assert all(scenario["probability_quitte"] < 0.05 for scenario in data["scenarios"])
+    
+    def test_custom_costs(self, client, employee):
+        """Les coûts unitaires peuvent être remplacés."""
+        response = client.post("/predict_employee/7720/what-if", json={
+            "grid": {"heure_supplementaires": ["Non"]},
+            "costs": {"heure_supplementaires": 7.5},
+            "threshold": 0.9,
+        })
+        assert response.json()["scenarios"][0]["cost"] == 7.5
+    
+    def test_non_actionable_field(self, client, employee):
+        """Seuls les champs modifiables sont acceptés."""
+        response = client.post("/predict_employee/7720/what-if", json={"grid": {"age": [30]}})
+        assert response.status_code == 422
+    
+    def test_invalid_value(self, client, employee):
+        """Les valeurs candidates respectent les contraintes de EmployeeInput."""
+        response = client.post("/predict_employee/7720/what-if", json={
+            "grid": {"satisfaction_employee_environnement": [6]}
+        })
+        assert response.status_code == 422
+    
+    def test_reversed_range(self, client, employee):
+        """Une plage dont la fin précède le début est refusée."""
+        response = client.post("/predict_employee/7720/what-if", json={
+            "grid": {"revenu_mensuel": {"start": 5000, "stop": 3000, "step": 500}}
+        })
+        assert response.status_code == 422
+    
+    def test_unknown_current_value(self, client, db_session, employee_data):
+        """Valeur actuelle NULL en base : chaque valeur candidate est un changement au coût forfaitaire."""
+        from app.models import Employee
+        db_session.add(Employee(**{**employee_data, "id_employee": 7721, "revenu_mensuel": None}))
+        db_session.commit()
+        response = client.post("/predict_employee/7721/what-if", json={
+            "grid": {"revenu_mensuel": {"start": 3000, "stop": 5000, "step": 1000}},
+            "threshold": 0.99,
+        })
+        assert response.status_code == 200
+        assert [scenario["cost"] for scenario in response.json()["scenarios"]] == pytest.approx([0.01] * 3)
+    
+    def test_too_many_scenarios(self, client, employee):
+        """La taille de la grille est bornée."""
+        response = client.post("/predict_employee/7720/what-if", json={
+            "grid": {
+                "revenu_mensuel": {"start": 0, "stop": 100000, "step": 1},
+                "heure_supplementaires": ["Oui", "Non"],
+            }
+        })
+        assert response.status_code == 422
+    
+    def test_unknown_employee(self, client):
+        """Un employé inexistant renvoie 404."""
+        response = client.post("/predict_employee/99999/what-if", json={"grid": {"heure_supplementaires": ["Non"]}})
+        assert response.status_code == 404